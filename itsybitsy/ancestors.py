@@ -0,0 +1,81 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+The path of service names from a seed down to the parent of the nodes being crawled.  Rather than a list copied for
+every level of recursion and scanned for cycle detection, it is a chain of parent pointers shared between siblings
+(and their subtrees), with a hashed set of its members for O(1) cycle checks.
+"""
+from collections.abc import Sequence
+from typing import FrozenSet, Iterator, List, Optional
+
+
+class Ancestors(Sequence):
+    __slots__ = ('parent', 'service_name', '_len', '_seed', '_members')
+
+    def __init__(self, parent: Optional['Ancestors'] = None, service_name: Optional[str] = None):
+        """
+        Use Ancestors() for the ancestors of seeds (i.e. none), and push() to descend
+
+        :param parent: ancestors of the parent, None for the ancestors of seeds
+        :param service_name: service name of the parent
+        """
+        self.parent = parent
+        self.service_name = service_name
+        if parent is None:
+            self._len = 0
+            self._seed: Optional[str] = None
+            self._members: FrozenSet[str] = frozenset()
+        else:
+            self._len = parent._len + 1
+            self._seed = parent._seed if parent._len else service_name
+            self._members = parent._members | {service_name}  # built once, shared by every child of the parent
+
+    @classmethod
+    def of(cls, service_names: Sequence) -> 'Ancestors':
+        """Ancestors from a list of service names, seed first.  Ancestors are returned as is"""
+        if isinstance(service_names, Ancestors):
+            return service_names
+        ancestors = cls()
+        for service_name in service_names:
+            ancestors = ancestors.push(service_name)
+        return ancestors
+
+    def push(self, service_name: str) -> 'Ancestors':
+        """The ancestors of the children of `service_name`, whose ancestors are `self`"""
+        return Ancestors(self, service_name)
+
+    def __contains__(self, service_name) -> bool:
+        return service_name in self._members
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('Ancestors index out of range')
+        if 0 == index:
+            return self._seed
+        ancestors = self
+        for _ in range(self._len - 1 - index):
+            ancestors = ancestors.parent
+        return ancestors.service_name
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._path())
+
+    def __reversed__(self) -> Iterator[str]:
+        ancestors = self
+        while ancestors.parent is not None:
+            yield ancestors.service_name
+            ancestors = ancestors.parent
+
+    def __repr__(self) -> str:
+        return f"Ancestors({self._path()})"
+
+    def _path(self) -> List[str]:
+        return list(reversed(self))[::-1]
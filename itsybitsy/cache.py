@@ -0,0 +1,230 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Persistent, on disk, cache of crawl results (address -> service name, service name -> children) which survives
+across runs of the spider.  Entries expire according to per protocol TTLs.  Failed name lookups are cached too
+(negative caching), with their own TTL.
+
+Also, ChildCache: the in memory cache of children for the duration of a crawl, bounded by a memory budget.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from . import constants, logs
+from .node import Node
+from .plugins import render_json
+
+MODE_OFF = 'off'
+MODE_READ = 'read'
+MODE_READ_WRITE = 'read-write'
+MODE_REFRESH = 'refresh'
+MODES = [MODE_OFF, MODE_READ, MODE_READ_WRITE, MODE_REFRESH]
+BUSY_TIMEOUT = 60  # seconds a write waits for the lock held by another process, e.g. another --workers process
+
+
+class DiskStore:
+    """A key/value store of strings with per entry expiry, persisted in a sqlite table"""
+    def __init__(self, path: str, table: str):
+        self._table = table
+        # autocommit, so that every write is durable
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+
+    def get(self, key: str) -> Optional[str]:
+        """:return: the value, or None if absent or expired"""
+        row = self._db.execute(f"SELECT value, expires_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def put(self, key: str, value: str, ttl: float) -> None:
+        self._db.execute(f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, time.time() + ttl))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_names: Optional[DiskStore] = None  # {address: json(service_name)}
+_children: Optional[DiskStore] = None  # {service_name: json({node_ref: Node})}
+_readable = False
+_writable = False
+
+
+def init(path: str = constants.CRAWL_CACHE_FILE) -> None:
+    """Open the persistent cache according to --cache-mode"""
+    global _names, _children, _readable, _writable
+    mode = constants.ARGS.cache_mode
+    if MODE_OFF == mode:
+        return
+    _readable = mode in [MODE_READ, MODE_READ_WRITE]
+    _writable = mode in [MODE_READ_WRITE, MODE_REFRESH]
+    _names = DiskStore(path, 'names')
+    _children = DiskStore(path, 'children')
+    logs.logger.debug(f"Opened crawl cache: {path}, mode: {mode}")
+
+
+def close() -> None:
+    global _names, _children, _readable, _writable
+    for store in [_names, _children]:
+        if store:
+            store.close()
+    _names, _children, _readable, _writable = None, None, False, False
+
+
+def get_name(address: str) -> Tuple[bool, Optional[str]]:
+    """
+    :param address:
+    :return: (hit, service_name) - service_name may be None on a hit, for a cached failed name lookup
+    """
+    if not _readable or not address:
+        return False, None
+    value = _names.get(address)
+    if value is None:
+        return False, None
+    return True, json.loads(value)
+
+
+def put_name(address: str, service_name: Optional[str], protocol_ref: str) -> None:
+    """
+    :param address:
+    :param service_name: None for a failed name lookup, which is cached with the --cache-negative-ttl
+    :param protocol_ref: protocol on which the address was discovered, determines the TTL
+    """
+    if not _writable or not address:
+        return
+    ttl = _protocol_ttl(protocol_ref) if service_name else constants.ARGS.cache_negative_ttl
+    _names.put(address, json.dumps(service_name), ttl)
+
+
+def get_children(service_name: str) -> Tuple[bool, Optional[Dict[str, Node]]]:
+    """
+    :param service_name:
+    :return: (hit, children)
+    """
+    if not _readable or not service_name:
+        return False, None
+    value = _children.get(service_name)
+    if value is None:
+        return False, None
+    return True, render_json.loads(value)
+
+
+def put_children(service_name: str, children: Dict[str, Node]) -> None:
+    """The children are cached with the shortest TTL of any of their protocols"""
+    if not _writable or not service_name:
+        return
+    ttl = min([_protocol_ttl(child.protocol.ref) for child in children.values()] or [constants.ARGS.cache_ttl])
+    _children.put(service_name, render_json.dumps(children), ttl)
+
+
+def _protocol_ttl(protocol_ref: str) -> float:
+    for protocol_ttl in constants.ARGS.cache_protocol_ttls:
+        ref, ttl = protocol_ttl.split('=')
+        if ref == protocol_ref:
+            return float(ttl)
+    return constants.ARGS.cache_ttl
+
+
+class ChildCache(MutableMapping):
+    """
+    LRU cache of {service_name: {node_ref: Node}} held within a memory budget.  The least recently used entries beyond
+    the budget spill to a temporary on disk store, and are paged back in when a later parent reaches the service.  The
+    memory used by an entry is approximated by its serialized size.
+    """
+    def __init__(self, budget_mb: float = 0):
+        """
+        :param budget_mb: 0 for unbounded
+        """
+        self._memory: Dict[str, Tuple[Dict[str, Node], int]] = OrderedDict()  # {service_name: (children, size)}
+        self._memory_size = 0
+        self._budget = 0
+        self._spilled: Optional[DiskStore] = None
+        self._spilled_keys: Set[str] = set()
+        self._spill_path: Optional[str] = None
+        self.set_budget(budget_mb)
+
+    def set_budget(self, budget_mb: float) -> None:
+        self._budget = budget_mb * 2 ** 20
+        self._evict()
+
+    def close(self) -> None:
+        """Remove the on disk store"""
+        if self._spilled:
+            self._spilled.close()
+            os.remove(self._spill_path)
+        self._spilled, self._spill_path = None, None
+        self._spilled_keys.clear()
+        self._memory.clear()
+        self._memory_size = 0
+
+    def __getitem__(self, service_name: str) -> Dict[str, Node]:
+        if service_name in self._memory:
+            self._memory.move_to_end(service_name)
+            return self._memory[service_name][0]
+        if service_name in self._spilled_keys:
+            logs.logger.debug(f"Paging children back in from disk for: {service_name}")
+            serialized = self._spilled.get(service_name)
+            children = render_json.loads(serialized)
+            self._insert(service_name, children, len(serialized))
+            return children
+        raise KeyError(service_name)
+
+    def __setitem__(self, service_name: str, children: Dict[str, Node]) -> None:
+        self._spilled_keys.discard(service_name)
+        self._discard_from_memory(service_name)
+        self._insert(service_name, children, len(render_json.dumps(children)) if self._budget else 0)
+
+    def __delitem__(self, service_name: str) -> None:
+        if service_name not in self:
+            raise KeyError(service_name)
+        self._spilled_keys.discard(service_name)
+        self._discard_from_memory(service_name)
+
+    def __contains__(self, service_name) -> bool:
+        return service_name in self._memory or service_name in self._spilled_keys
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._memory)
+        yield from [key for key in self._spilled_keys if key not in self._memory]
+
+    def __len__(self) -> int:
+        return len(self._memory) + len(self._spilled_keys - self._memory.keys())
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._memory_size = 0
+        self._spilled_keys.clear()
+
+    def _insert(self, service_name: str, children: Dict[str, Node], size: int) -> None:
+        self._memory[service_name] = (children, size)
+        self._memory_size += size
+        self._evict()
+
+    def _discard_from_memory(self, service_name: str) -> None:
+        if service_name in self._memory:
+            self._memory_size -= self._memory.pop(service_name)[1]
+
+    def _evict(self) -> None:
+        while self._budget and self._memory_size > self._budget and len(self._memory) > 1:
+            service_name, (children, size) = self._memory.popitem(last=False)
+            self._memory_size -= size
+            if service_name not in self._spilled_keys:
+                self._spill(service_name, children)
+
+    def _spill(self, service_name: str, children: Dict[str, Node]) -> None:
+        if not self._spilled:
+            fd, self._spill_path = tempfile.mkstemp(prefix='itsybitsy-child-cache-', suffix='.sqlite')
+            os.close(fd)
+            self._spilled = DiskStore(self._spill_path, 'children')
+            logs.logger.debug(f"Spilling child cache to: {self._spill_path}")
+        self._spilled.put(service_name, render_json.dumps(children), float('inf'))
+        self._spilled_keys.add(service_name)
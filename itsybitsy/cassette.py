@@ -0,0 +1,222 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Record/replay of provider calls.  With --record DIR the outcome of every provider call made by crawling (connection
+opened, name, children, hint taken...) is written to a cassette in DIR.  With --replay DIR the recorded providers are
+stood in for by ReplayProviders which serve the calls from the cassette, optionally with the recorded latencies, so
+that a production shaped crawl can be repeated offline - e.g. to profile and tune the crawl engine and renderers.
+
+Connections themselves can not be recorded, only whether opening them succeeded: replayed connections are None.
+"""
+import asyncio
+import glob
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TextIO, Tuple, Type
+
+from . import constants, logs
+from .charlotte_web import Hint
+from .node import NodeTransport
+from .providers import ProviderInterface, TimeoutException, get_provider_by_ref, get_registered_provider_refs, \
+    register_provider
+
+CASSETTE_FILE = 'cassette.jsonl'
+INVENTORY_CASSETTE_FILE = 'cassette.inventory.jsonl'  # of the --seed-from-inventory, before crawling
+ENTRY_PROVIDER = 'provider'
+ENTRY_CALL = 'call'
+
+_cassette: Optional[TextIO] = None  # being recorded
+_recordings: Dict[Tuple[str, str, str], List[dict]] = {}  # {(provider_ref, method, request): [outcome]}
+_replays: Counter = Counter()  # {(provider_ref, method, request): number of times replayed}
+_exception_classes: Dict[Tuple[str, bool], Type[Exception]] = {}
+
+
+class CassetteMissException(Exception):
+    """The call was not recorded"""
+
+
+class ReplayedException(Exception):
+    """An exception raised by the recorded call"""
+
+
+class ReplayedRetryableException(ReplayedException):
+    """An exception raised by the recorded call, which the recorded provider announced as retryable"""
+
+
+class ReplayProvider:
+    """
+    Stands in for a recorded provider, serving its calls from the cassette.  Not a ProviderInterface, which would be
+    discovered and registered as a provider of its own - its default implementations are borrowed instead.
+    """
+    close_connection = ProviderInterface.close_connection
+    prefetch = ProviderInterface.prefetch
+    lookup_names = ProviderInterface.lookup_names
+    take_hints = ProviderInterface.take_hints
+    crawl_downstream_many = ProviderInterface.crawl_downstream_many
+
+    def __init__(self, ref: str, container_platform: bool):
+        """
+        :param ref: of the recorded provider
+        :param container_platform: as announced by the recorded provider
+        """
+        self._ref = ref
+        self._container_platform = container_platform
+
+    def ref(self) -> str:
+        return self._ref
+
+    def is_container_platform(self) -> bool:
+        return self._container_platform
+
+    @staticmethod
+    def retryable_exceptions() -> Tuple[Type[Exception], ...]:
+        return (ReplayedRetryableException,)
+
+    async def open_connection(self, address: str) -> None:
+        return await self._replay('open_connection', address)
+
+    async def lookup_name(self, address: str, connection: None) -> Optional[str]:
+        return await self._replay('lookup_name', address, connection)
+
+    async def lookup_instances(self, service_name: str, address: str, count: int) -> List[str]:
+        return await self._replay('lookup_instances', service_name, address, count)
+
+    async def inventory(self) -> List[NodeTransport]:
+        return await self._replay('inventory')
+
+    async def take_a_hint(self, hint: Hint) -> List[NodeTransport]:
+        return await self._replay('take_a_hint', hint)
+
+    async def crawl_downstream(self, address: str, connection: None, **kwargs) -> List[NodeTransport]:
+        return await self._replay('crawl_downstream', address, connection, **kwargs)
+
+    async def _replay(self, method: str, *args, **kwargs) -> Any:
+        key = (self.ref(), method, _request(method, args, kwargs))
+        if key not in _recordings:
+            raise CassetteMissException(f"No recording of {self.ref()}.{method}({args[0] if args else ''})")
+        outcomes = _recordings[key]
+        outcome = outcomes[min(_replays[key], len(outcomes) - 1)]  # in the recorded order, e.g. of retries
+        _replays[key] += 1
+        if constants.ARGS.replay_latency_scale:
+            await asyncio.sleep(outcome['latency'] * constants.ARGS.replay_latency_scale)
+        if 'exception' in outcome:
+            raise _exception(outcome['exception'])
+        return _deserialize(method, outcome['response'])
+
+
+def init(file_name: str = CASSETTE_FILE) -> None:
+    """Start recording a cassette, if --record is specified.  The registered providers are recorded first
+
+    :param file_name: of the cassette within the --record directory
+    """
+    global _cassette
+    if not constants.ARGS.record:
+        return
+    os.makedirs(constants.ARGS.record, exist_ok=True)
+    path = os.path.join(constants.ARGS.record, file_name)
+    _cassette = open(path, 'w')
+    for provider in [get_provider_by_ref(ref) for ref in get_registered_provider_refs()]:
+        _append({'type': ENTRY_PROVIDER, 'ref': provider.ref(), 'container_platform': provider.is_container_platform()})
+    logs.logger.debug(f"Recording provider calls to: {path}")
+
+
+def close() -> None:
+    global _cassette
+    if _cassette:
+        _cassette.close()
+    _cassette = None
+    _replays.clear()
+
+
+def register_replay_providers(directory: str) -> None:
+    """Load the cassettes of the directory (one per --workers process, and one of the --seed-from-inventory), and
+    register a ReplayProvider for each of the providers recorded in them"""
+    _recordings.clear()
+    container_platforms = {}
+    for path in sorted(glob.glob(os.path.join(directory, f"{os.path.splitext(CASSETTE_FILE)[0]}*.jsonl"))):
+        logs.logger.debug(f"Loading cassette: {path}")
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if ENTRY_PROVIDER == entry['type']:
+                    container_platforms[entry['ref']] = entry['container_platform']
+                else:
+                    _recordings.setdefault((entry['provider'], entry['method'], entry['request']), []).append(entry)
+    for ref, container_platform in container_platforms.items():
+        register_provider(ReplayProvider(ref, container_platform))
+
+
+async def record(provider: ProviderInterface, method: str, args: tuple, kwargs: dict,
+                 attempt: Callable[[], Awaitable]) -> Any:
+    """
+    Await the attempt of a provider call, recording its outcome if --record is specified
+
+    :param provider:
+    :param method: the method of the provider which is called
+    :param args: the args of the call
+    :param kwargs: the kwargs of the call
+    :param attempt: the call
+    :return: the result of the call
+    """
+    if not _cassette:
+        return await attempt()
+    entry = {'type': ENTRY_CALL, 'provider': provider.ref(), 'method': method,
+             'request': _request(method, args, kwargs)}
+    start = time.monotonic()
+    try:
+        response = await attempt()
+        entry['response'] = _serialize(method, response)
+        return response
+    except Exception as e:
+        entry['exception'] = {'class': e.__class__.__name__, 'message': str(e),
+                              'retryable': isinstance(e, tuple(provider.retryable_exceptions()))}
+        raise
+    finally:
+        if 'response' in entry or 'exception' in entry:  # not cancelled
+            entry['latency'] = time.monotonic() - start
+            _append(entry)
+
+
+def _request(method: str, args: tuple, kwargs: dict) -> str:
+    """The arguments which identify the call, serialized"""
+    if method in ['lookup_name', 'crawl_downstream']:
+        args = args[:1]  # not the connection
+    elif 'take_a_hint' == method:
+        args = (args[0].service_name, args[0].protocol.ref, args[0].protocol_mux)
+    return json.dumps([args, kwargs], sort_keys=True, default=repr)
+
+
+def _serialize(method: str, response: Any) -> Any:
+    if 'open_connection' == method:
+        return None
+    if method in ['crawl_downstream', 'take_a_hint', 'inventory']:
+        return [asdict(node_transport) for node_transport in response]
+    return response
+
+
+def _deserialize(method: str, response: Any) -> Any:
+    if method in ['crawl_downstream', 'take_a_hint', 'inventory']:
+        return [NodeTransport(**node_transport) for node_transport in response]
+    return response
+
+
+def _exception(recorded: dict) -> Exception:
+    """Recreate the recorded exception: timeouts as such, others as ReplayedExceptions named like the original"""
+    if 'TimeoutError' == recorded['class']:
+        return asyncio.TimeoutError(recorded['message'])
+    if TimeoutException.__name__ == recorded['class']:
+        return TimeoutException(recorded['message'])
+    key = (recorded['class'], recorded['retryable'])
+    if key not in _exception_classes:
+        base = ReplayedRetryableException if recorded['retryable'] else ReplayedException
+        _exception_classes[key] = type(recorded['class'], (base,), {})  # e.g. for --retry-on
+    return _exception_classes[key](recorded['message'])
+
+
+def _append(entry: dict) -> None:
+    _cassette.write(json.dumps(entry) + "\n")
+    _cassette.flush()
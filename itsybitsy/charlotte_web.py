@@ -109,6 +109,10 @@ def hints(service_name: str) -> List[Hint]:
     return _hints.get(service_name) or []
 
 
+def all_hints() -> List[Hint]:
+    return [hint for service_hints in _hints.values() for hint in service_hints]
+
+
 def get_protocol(ref: str) -> Protocol:
     try:
         return _protocols[ref]
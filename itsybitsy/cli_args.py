@@ -3,6 +3,7 @@ from typing import List, Optional
 
 import configargparse
 
+from . import cache, provider_cache, scheduler
 
 command_spider = 'spider'
 command_render = 'render'
@@ -54,11 +55,47 @@ def parse_args(registered_renderer_refs: List[str]) -> (configargparse.Namespace
         sub_p.add_argument('--debug', action='store_true', help='Log debug output to stderr')
 
     # spider command args
-    spider_p.add_argument('-s', '--seeds', required=True, nargs='+', metavar='SEED',
+    spider_p.add_argument('-s', '--seeds', nargs='+', default=[], metavar='SEED',
                           help='Seed host(s) to begin crawling viz. an IP address or hostname.  Must be in the format: '
-                               '"provider:address".  e.g. "ssh:10.0.0.42" or "k8s:widget-machine-5b5bc8f67f-2qmkp')
+                               '"provider:address".  e.g. "ssh:10.0.0.42" or "k8s:widget-machine-5b5bc8f67f-2qmkp.  '
+                               'Required unless --seed-from-inventory is specified')
+    spider_p.add_argument('--seed-from-inventory', metavar='PROVIDER',
+                          help='Crawl the whole estate: seed from one instance of every service in the inventory of '
+                               'PROVIDER, e.g. all pods matching the k8s label selectors, or all EC2 instances with '
+                               'the --aws-service-name-tag')
+    spider_p.add_argument('--inventory-seed-provider', metavar='PROVIDER',
+                          help='Provider with which to crawl the seeds from --seed-from-inventory, e.g. "ssh" for an '
+                               '"aws" inventory.  Defaults to the inventory provider')
     spider_p.add_argument('-t', '--timeout', type=int, default=60, metavar='TIMEOUT',
                           help='Timeout when crawling a node')
+    spider_p.add_argument('--retry-attempts', type=int, default=1, metavar='ATTEMPTS',
+                          help='Max attempts of each provider call which fails with a retryable exception (e.g. a '
+                               'timeout), before the node is marked with an error.  Each timed out attempt costs up '
+                               'to --timeout, so unreachable hosts cost ATTEMPTS times as much (1 for no retries)')
+    spider_p.add_argument('--retry-backoff', type=float, default=.5, metavar='SECONDS',
+                          help='Base delay before retrying a provider call, doubled on each retry and jittered')
+    spider_p.add_argument('--retry-backoff-max', type=float, default=10, metavar='SECONDS',
+                          help='Max delay before retrying a provider call')
+    spider_p.add_argument('--retry-on', nargs='+', default=[], metavar='EXCEPTION',
+                          help='Names of further exception classes which are retried, e.g. ConnectionResetError')
+    spider_p.add_argument('--deadline', type=float, default=None, metavar='SECONDS',
+                          help='Stop crawling after this long and output the partial graph crawled so far.  Nodes '
+                               'which were still being crawled are marked with a DEADLINE warning')
+    spider_p.add_argument('--instances-per-service', type=int, default=1, metavar='K',
+                          help='Crawl up to K instances of each service concurrently and union their children, '
+                               'recording on each child how many of the instances reported it.  Detects config drift '
+                               'between instances and downstreams only some instances talk to')
+    spider_p.add_argument('--instances-provider', metavar='PROVIDER',
+                          help='Provider used to look up the other instances of a service for '
+                               '--instances-per-service, e.g. "aws" when crawling with "ssh".  Defaults to the '
+                               'provider of the node')
+    spider_p.add_argument('--fan-out-limit', type=int, default=0, metavar='N',
+                          help='Max children of each node crawled per protocol.  Further children are folded into one '
+                               'aggregate child, which is not crawled (0 for unlimited)')
+    spider_p.add_argument('--fan-out-protocol-limits', nargs='+', default=[], metavar='PROTOCOL=N',
+                          help='Per protocol overrides of --fan-out-limit.  e.g. "NSQ=20 HAP=0"')
+    spider_p.add_argument('--expand-fan-out', nargs='+', default=[], metavar='SERVICE',
+                          help='Services whose children are never folded by --fan-out-limit')
     spider_p.add_argument('-d', '--max-depth', type=int, default=100, metavar='DEPTH', help='Max tree depth to crawl')
     spider_p.add_argument('-c', '--config-file', is_config_file=True, metavar='FILE', help='Specify a config file path')
     spider_p.add_argument('-X', '--disable-providers', nargs='+', default=[], metavar='PROVIDER',
@@ -76,9 +113,75 @@ def parse_args(registered_renderer_refs: List[str]) -> (configargparse.Namespace
                                "trusted organizations.")
     spider_p.add_argument('-q', '--quiet', action='store_true',
                           help='Do not render graph output to stdout while crawling')
+    _add_concurrency_args(spider_p)
+    _add_cache_args(spider_p)
+    spider_p.add_argument('--resume', action='store_true',
+                          help='Resume the previous crawl, e.g. one which crashed.  Results in its journal are '
+                               'replayed and only hosts without an entry in the journal are contacted')
 
     # render command args
     render_p.add_argument('-f', '--json-file', metavar='FILE',
                           help='Instead of crawling, load and render a json serialization of the tree')
 
-    return argparser.parse_known_args()
\ No newline at end of file
+    return argparser.parse_known_args()
+
+
+def _add_concurrency_args(spider_p: configargparse.ArgParser):
+    """Args which tune how much of the crawl happens at once"""
+    spider_p.add_argument('--workers', type=int, default=1, metavar='N',
+                          help='Shard the seeds across N worker processes, each crawling on its own event loop, and '
+                               'merge their trees.  Workers crawl quietly, and share names and children through the '
+                               'crawl cache: with --cache-mode off through a cache for this run only, with read-write '
+                               'through the persistent cache, and with read or refresh not at all')
+    spider_p.add_argument('--crawl-concurrency', type=int, default=50, metavar='WORKERS',
+                          help='Max number of nodes crawled concurrently')
+    spider_p.add_argument('--crawl-queue-size', type=int, default=1000, metavar='SIZE',
+                          help='Max number of nodes queued for crawling.  When full, crawling of further children '
+                               'waits for space in the queue (0 for unbounded)')
+    spider_p.add_argument('--crawl-order', choices=list(scheduler.ORDERINGS), default=scheduler.ORDER_BFS,
+                          help='Order in which queued nodes are crawled')
+    spider_p.add_argument('--provider-threads', type=int, default=10, metavar='THREADS',
+                          help='Size of the thread pool of each provider, on which its blocking calls (e.g. to the AWS '
+                               'and k8s SDKs) run, off the event loop')
+    spider_p.add_argument('--provider-threads-overrides', nargs='+', default=[], metavar='PROVIDER=THREADS',
+                          help='Per provider overrides of --provider-threads.  e.g. "k8s=20 aws=4"')
+    spider_p.add_argument('--batch-window', type=float, default=.005, metavar='SECONDS',
+                          help='For providers which implement batch calls: max time a call waits to be batched with '
+                               'further calls')
+    spider_p.add_argument('--batch-size', type=int, default=100, metavar='SIZE',
+                          help='For providers which implement batch calls: max calls in a batch (1 to disable '
+                               'batching)')
+    spider_p.add_argument('--warm-connections', type=int, default=0, metavar='MAX',
+                          help='Speculatively open connections to discovered nodes as soon as they are discovered, so '
+                               'that they are ready by the time the nodes are crawled.  At most MAX warmed connections '
+                               'are held waiting to be used (0 to disable)')
+
+
+def _add_cache_args(spider_p: configargparse.ArgParser):
+    """Args of the caches of crawl results and provider calls, and of recording/replaying provider calls"""
+    spider_p.add_argument('--provider-cache', choices=provider_cache.MODES, default=provider_cache.MODE_MEMORY,
+                          help='Cache of provider call results (e.g. AWS and k8s lookups), "disk" also persists them '
+                               'across runs')
+    spider_p.add_argument('--provider-cache-ttls', nargs='+', default=[], metavar='PROVIDER.METHOD=SECONDS',
+                          help='Overrides of the TTL of cached provider call results.  e.g. "k8s._get_pod=60"')
+    spider_p.add_argument('--cache-mode', choices=cache.MODES, default=cache.MODE_OFF,
+                          help='Persistent crawl cache (names and children) across runs.  "read" uses cached results, '
+                               '"read-write" also caches new results, "refresh" ignores but overwrites cached results')
+    spider_p.add_argument('--cache-ttl', type=float, default=86400, metavar='SECONDS',
+                          help='Time to live of entries in the persistent crawl cache')
+    spider_p.add_argument('--cache-protocol-ttls', nargs='+', default=[], metavar='PROTOCOL=SECONDS',
+                          help='Per protocol overrides of --cache-ttl.  e.g. "NSQ=3600 HAP=604800"')
+    spider_p.add_argument('--cache-negative-ttl', type=float, default=3600, metavar='SECONDS',
+                          help='Time to live of failed name lookups in the persistent crawl cache')
+    spider_p.add_argument('--child-cache-mb', type=float, default=0, metavar='MB',
+                          help='Memory budget for children cached during the crawl.  Beyond it, the least recently '
+                               'used entries spill to a temporary file on disk (0 for unbounded)')
+    record_replay = spider_p.add_mutually_exclusive_group()
+    record_replay.add_argument('--record', metavar='DIR',
+                               help='Record the outcome of every provider call to a cassette in DIR, for --replay')
+    record_replay.add_argument('--replay', metavar='DIR',
+                               help='Instead of calling the providers, replay their calls from the cassette(s) '
+                                    'recorded in DIR with --record.  No provider is contacted')
+    spider_p.add_argument('--replay-latency-scale', type=float, default=0, metavar='SCALE',
+                          help='With --replay, delay each call by its recorded latency times SCALE (0 for no delay, 1 '
+                               'for the recorded latencies)')
@@ -0,0 +1,149 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Coalescing of per node provider calls into batch calls, for providers which implement the batch methods of
+ProviderInterface (e.g. lookup_names() - one AWS describe_network_interfaces can filter on hundreds of IPs).  Requests
+are collected for a short window, or until a batch is full, then dispatched together.  Calls to providers which do
+not implement batching are not coalesced.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from . import logs
+from .providers import ProviderInterface
+
+# {per item method: batch method}
+BATCH_METHODS = {
+    'lookup_name': 'lookup_names',
+    'take_a_hint': 'take_hints',
+    'crawl_downstream': 'crawl_downstream_many'
+}
+
+
+def request(method: str, args: tuple, kwargs: dict) -> Any:
+    """The request, i.e. item of the batch, for a call of the per item `method`"""
+    if 'take_a_hint' == method:
+        return args[0]
+    if 'crawl_downstream' == method:
+        return args[0], args[1], kwargs
+    return tuple(args)
+
+
+class Coalescer:
+    def __init__(self, dispatch: Callable[[List], Awaitable[List]], window: float, max_size: int):
+        """
+        :param dispatch: the batch call, takes a list of requests and returns a list of results (or exceptions) in
+                         the same order
+        :param window: max seconds a request waits for further requests to batch it with
+        :param max_size: max number of requests in a batch
+        """
+        self._dispatch = dispatch
+        self._window = window
+        self._max_size = max_size
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Future] = set()
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Submit a request to the next batch
+
+        :param item: the request
+        :return: the result of the request
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self._max_size:
+            self.flush()
+        elif not self._timer:
+            self._timer = asyncio.get_event_loop().call_later(self._window, self.flush)
+
+        return await asyncio.shield(future)  # one caller giving up does not cancel the batch for the others
+
+    def flush(self) -> None:
+        """Dispatch the pending requests now"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._dispatch_batch(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def close(self) -> None:
+        """Cancel the pending requests and the batches in flight"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+        for task in list(self._batches):
+            task.cancel()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    async def _dispatch_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        logs.logger.debug(f"Dispatching batch of {len(batch)} requests")
+        try:
+            results = await self._dispatch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} requests returned {len(results)} results")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                future.add_done_callback(_mark_exception_retrieved)
+            else:
+                future.set_result(result)
+
+
+class CoalescerRegistry:
+    """Crawl scoped coalescers, one per (provider, method)"""
+    def __init__(self, window: float, max_size: int):
+        """
+        :param window: see Coalescer
+        :param max_size: see Coalescer
+        """
+        self._window = window
+        self._max_size = max_size
+        self._coalescers: Dict[Tuple[str, str], Optional[Coalescer]] = {}
+
+    def get(self, provider: ProviderInterface, method: str) -> Optional[Coalescer]:
+        """
+        :param provider:
+        :param method: the per item method, e.g. 'lookup_name'
+        :return: the coalescer of calls to `method`, None if they are not to be coalesced
+        """
+        key = (provider.ref(), method)
+        if key not in self._coalescers:
+            batch_method = BATCH_METHODS.get(method)
+            self._coalescers[key] = Coalescer(getattr(provider, batch_method), self._window, self._max_size) \
+                if batch_method and self._max_size > 1 and implements_batching(provider, batch_method) else None
+        return self._coalescers[key]
+
+    async def close(self) -> None:
+        for coalescer in self._coalescers.values():
+            if coalescer:
+                await coalescer.close()
+
+
+def implements_batching(provider: ProviderInterface, batch_method: str) -> bool:
+    """Whether the provider overrides the default (per item) implementation of the batch method"""
+    implementation = getattr(type(provider), batch_method, None)
+    return callable(implementation) and implementation is not getattr(ProviderInterface, batch_method)
+
+
+def _mark_exception_retrieved(future: asyncio.Future) -> None:
+    """The caller may have given up on the request already"""
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,115 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Crawl scoped registry of open provider connections.  The same host is often discovered by several nodes (e.g. on
+different ports/protocols) - they all share one connection, which is closed when the last of them is done with it.
+
+Connections may also be warmed: opened speculatively as soon as a node is discovered, so that the connection is
+(usually) ready by the time the node is crawled.  A warmed connection is held for the next node to use it.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Set, Tuple
+
+from . import logs
+from .providers import ProviderInterface
+
+
+class ConnectionRegistry:
+    def __init__(self, max_warm: int = 0):
+        """
+        :param max_warm: max number of warmed connections held, waiting to be used, at once
+        """
+        self._connections: Dict[Tuple[str, str], asyncio.Future] = {}  # {(provider_ref, address): Future[connection]}
+        self._users: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._providers: Dict[str, ProviderInterface] = {}
+        self._max_warm = max_warm
+        self._warm: Set[Tuple[str, str]] = set()  # connections held for the next user
+
+    @asynccontextmanager
+    async def connection(self, provider: ProviderInterface, address: str,
+                         open_connection: Callable[[], Awaitable]) -> AsyncIterator[Any]:
+        """
+        Use the connection to `address` in `provider`, opening it with `open_connection()` if it is not already open
+        (or opening).  The connection is closed on exiting the context, unless it is still in use by another node.
+
+        :param provider:
+        :param address:
+        :param open_connection: called with no arguments, returns the awaitable which opens the connection
+        :return: the connection
+        """
+        key = (provider.ref(), address)
+        if key not in self._connections:
+            self._open(key, provider, open_connection)
+        if key in self._warm:
+            logs.logger.debug(f"Using warmed connection: {key}")
+            self._warm.discard(key)  # take over the hold of the warm up
+        else:
+            self._users[key] += 1
+        try:
+            yield await asyncio.shield(self._connections[key])
+        finally:
+            await self._release(key)
+
+    def warm(self, provider: ProviderInterface, address: str, open_connection: Callable[[], Awaitable]) -> bool:
+        """
+        Start opening the connection to `address` in the background, holding it for the next connection() to it.
+        Nothing is done if the connection is already open (or opening), or if the max number of warmed connections
+        are already held.
+
+        :return: whether the connection is being warmed
+        """
+        key = (provider.ref(), address)
+        if key in self._connections or len(self._warm) >= self._max_warm:
+            return False
+        logs.logger.debug(f"Warming connection: {key}")
+        self._open(key, provider, open_connection)
+        self._users[key] += 1
+        self._warm.add(key)
+        return True
+
+    async def unwarm(self, provider: ProviderInterface, address: str) -> None:
+        """Give up the hold of a warmed connection which is not going to be used after all"""
+        key = (provider.ref(), address)
+        if key in self._warm:
+            self._warm.discard(key)
+            await self._release(key)
+
+    async def close(self) -> None:
+        """Close all connections, regardless of whether they are still in use"""
+        for key in list(self._connections):
+            await self._close(key)
+
+    def _open(self, key: Tuple[str, str], provider: ProviderInterface, open_connection: Callable[[], Awaitable]):
+        logs.logger.debug(f"Opening shared connection: {key}")
+        self._connections[key] = asyncio.ensure_future(open_connection())
+        self._connections[key].add_done_callback(_mark_exception_retrieved)
+        self._providers[provider.ref()] = provider
+
+    async def _release(self, key: Tuple[str, str]) -> None:
+        self._users[key] -= 1
+        if not self._users[key]:
+            await self._close(key)
+
+    async def _close(self, key: Tuple[str, str]) -> None:
+        del self._users[key]
+        self._warm.discard(key)
+        future = self._connections.pop(key)
+        if not future.done():
+            future.cancel()
+            return
+        if future.cancelled() or future.exception() or future.result() is None:
+            return
+        logs.logger.debug(f"Closing shared connection: {key}")
+        try:
+            await self._providers[key[0]].close_connection(future.result())
+        except Exception as e:
+            logs.logger.debug(f"Exception {e.__class__.__name__}({e}) closing connection: {key}")
+
+
+def _mark_exception_retrieved(future: asyncio.Future) -> None:
+    """Every node using the connection may have given up on it already"""
+    if not future.cancelled():
+        future.exception()
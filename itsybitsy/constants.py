@@ -21,3 +21,6 @@ PP = pprint.PrettyPrinter(indent=4)
 
 # dependent constants
 LASTRUN_FILE = f"{OUTPUTS_DIR}/.lastrun.json"
+CRAWL_CACHE_FILE = f"{OUTPUTS_DIR}/.crawl_cache.sqlite"
+PROVIDER_CACHE_FILE = f"{OUTPUTS_DIR}/.provider_cache.sqlite"
+JOURNAL_FILE = f"{OUTPUTS_DIR}/.journal.jsonl"
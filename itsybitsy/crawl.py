@@ -8,203 +8,413 @@ import asyncio
 import sys
 import traceback
 
-from dataclasses import replace
+from contextlib import asynccontextmanager, AsyncExitStack
+from contextvars import ContextVar
+
+from dataclasses import asdict, replace
 from termcolor import colored
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Coroutine, Dict, List, MutableMapping, Optional, Sequence
 
-from . import charlotte, charlotte_web, constants, logs, obfuscate, providers
+from . import cache, cassette, charlotte, charlotte_web, coalesce, constants, fan_out, journal, logs, obfuscate, \
+    providers, retry
+from .ancestors import Ancestors
 from .charlotte import CrawlStrategy
+from .connections import ConnectionRegistry
+from .graph import GraphStore, Vertex
 from .node import Node, NodeTransport
+from .scheduler import CrawlScheduler, WorkItem
 
 service_name_cache: Dict[str, Optional[str]] = {}  # {address: service_name}
-child_cache: Dict[str, Dict[str, Node]] = {}  # {service_name: {node_ref, Node}}
-
-
-async def crawl(tree: Dict[str, Node], ancestors: list):
+child_cache: MutableMapping[str, Dict[str, Node]] = cache.ChildCache()  # {service_name: {node_ref, Node}}
+_name_lookups_in_flight: Dict[str, asyncio.Future] = {}  # {address: Future[service_name]}
+_crawls_in_flight: Dict[str, asyncio.Future] = {}  # {service_name: Future[{node_ref, Node}]}
+_scheduler: ContextVar[Optional[CrawlScheduler]] = ContextVar('scheduler', default=None)  # set by the crawl root
+_connections: ContextVar[Optional[ConnectionRegistry]] = ContextVar('connections', default=None)  # set by the root
+_graph: ContextVar[Optional[GraphStore]] = ContextVar('graph', default=None)  # set by the crawl root
+_coalescers: ContextVar[Optional[coalesce.CoalescerRegistry]] = ContextVar('coalescers', default=None)  # ditto
+_interrupted: Optional[asyncio.Event] = None  # created by the crawl root, set by interrupt()
+
+
+async def crawl(tree: Dict[str, Node], ancestors: Sequence[str]):
+    """
+    Crawl the nodes of `tree` concurrently.  Each node moves through its own pipeline of
+    open_connection -> lookup_name -> rewrite/cycle detection -> crawl_downstream -> recursion so that a slow node
+    never holds up its siblings.
+
+    The outermost call is the crawl root: every descendant crawl is awaited beneath it, so it returns only once the
+    whole graph has been crawled, and an exception anywhere in the graph propagates up to it.  The root owns the
+    CrawlScheduler which executes the per-node work (everything but the recursion) for all descendants, the
+    ConnectionRegistry through which nodes share connections to the same host, the GraphStore through which nodes
+    of the same service share one crawl of its children (and subtree), and the coalescers which batch provider calls.
+
+    If the crawl is interrupted (by interrupt() or by reaching the --deadline) outstanding work is cancelled, nodes
+    which were not finished are marked with a DEADLINE warning and the root returns the partial tree.
+
+    :param tree: the nodes to crawl, keyed by node_ref
+    :param ancestors: service names of the ancestors of the nodes in `tree`, seed first.  A list, or Ancestors
+    """
+    ancestors = Ancestors.of(ancestors)
     depth = len(ancestors)
     logs.logger.debug(f"Found {str(len(tree))} nodes to crawl at depth: {depth}")
 
-    conns, tree = await _open_connections(tree, ancestors)
-    service_names, conns = await _lookup_service_names(tree, conns)
-    await _assign_names_and_detect_cycles(tree, service_names, ancestors)
-
-    if len(ancestors) > constants.ARGS.max_depth - 1:
-        logs.logger.debug(f"Reached --max-depth of {constants.ARGS.max_depth} at depth: {depth}")
+    if _scheduler.get():
+        await _crawl_nodes(tree, ancestors)
         return
 
-    nodes_with_conns = [(item[0], item[1], conn) for item, conn in zip(tree.items(), conns)]
-    crawlable_nodes = _filter_uncrawlable_nodes_and_add_warnings(nodes_with_conns, depth)
-    await _find_children_and_recursively_crawl(tree, crawlable_nodes, depth, ancestors)
-
-
-def _filter_uncrawlable_nodes_and_add_warnings(nodes_with_conns: List[Tuple[str, Node, type]],
-                                               depth: int) -> List[Tuple[str, Node, type]]:
-    crawlable_nodes = []
-    for ref, node, conn in nodes_with_conns:
-        if node.is_crawlable(depth):
-            crawlable_nodes.append((ref, node, conn))
-        else:
-            node.warnings['CRAWL_SKIPPED'] = True
-
-    return crawlable_nodes
-
-
-async def _find_children_and_recursively_crawl(tree: Dict[str, Node], crawlable_nodes: List[Tuple[str, Node, type]],
-                                               depth: int, ancestors: list):
-    crawl_tasks = [_crawl_with_hints(tree[ref].provider, ref, node.address, node.service_name, conn)
-                   for ref, node, conn in crawlable_nodes]
-    while len(crawl_tasks) > 0:
-        children_results, children_pending_tasks = await asyncio.wait(crawl_tasks, return_when=asyncio.FIRST_COMPLETED)
-        for future in children_results:
-            node_ref, children = _get_crawl_result_with_exception_handling(future)
-            child_depth = depth + 1
-            nonexcluded_children = {ref: child for ref, child in children.items() if not child.is_excluded(child_depth)}
-            tree[node_ref].children = nonexcluded_children
-            children_with_address = {ref: child for ref, child in nonexcluded_children.items() if child.address}
-            if children_with_address:
-                asyncio.ensure_future(crawl(children_with_address, ancestors + [tree[node_ref].service_name]))
-        crawl_tasks = children_pending_tasks
-
-
-async def _assign_names_and_detect_cycles(tree: Dict[str, Node], service_names: str, ancestors: list):
-    for node_ref, service_name in zip(list(tree), service_names):
-        if not service_name:
-            logs.logger.debug(f"Name lookup failed for {node_ref} with address: {tree[node_ref].address}")
-            service_name_cache[tree[node_ref].address] = None
-            tree[node_ref].errors['NAME_LOOKUP_FAILED'] = True
-            continue
-        service_name = tree[node_ref].crawl_strategy.rewrite_service_name(service_name, tree[node_ref])
-        if constants.ARGS.obfuscate:
-            service_name = obfuscate.obfuscate_service_name(service_name)
-        if service_name in ancestors:
-            tree[node_ref].warnings['CYCLE'] = True
-        tree[node_ref].service_name = service_name
-
-
-def _get_crawl_result_with_exception_handling(future: asyncio.Future) -> (str, Dict[str, Node]):
+    global _interrupted
+    scheduler = CrawlScheduler(constants.ARGS.crawl_concurrency, constants.ARGS.crawl_queue_size,
+                               constants.ARGS.crawl_order)
+    token = _scheduler.set(scheduler)
+    connections = ConnectionRegistry(constants.ARGS.warm_connections)
+    connections_token = _connections.set(connections)
+    graph_token = _graph.set(GraphStore())
+    coalescers = coalesce.CoalescerRegistry(constants.ARGS.batch_window, constants.ARGS.batch_size)
+    coalescers_token = _coalescers.set(coalescers)
+    _interrupted = asyncio.Event()
+    deadline = asyncio.get_event_loop().call_later(constants.ARGS.deadline, interrupt) \
+        if constants.ARGS.deadline else None
+    scheduler.start()
     try:
-        return future.result()
-    except TimeoutError:
-        sys.exit(1)
+        await _crawl_nodes_until_interrupted(tree, ancestors)
     except Exception as e:
         traceback.print_tb(e.__traceback__)
         sys.exit(1)
+    finally:
+        if deadline:
+            deadline.cancel()
+        await scheduler.stop()
+        await coalescers.close()
+        await connections.close()
+        _scheduler.reset(token)
+        _connections.reset(connections_token)
+        _graph.reset(graph_token)
+        _coalescers.reset(coalescers_token)
+        _interrupted = None
+
+
+def interrupt() -> None:
+    """Interrupt the running crawl, if any: crawl() stops all outstanding work and returns the partial tree"""
+    if _interrupted:
+        _interrupted.set()
+
+
+async def _crawl_nodes_until_interrupted(tree: Dict[str, Node], ancestors: Ancestors):
+    crawling = asyncio.ensure_future(_prefetch_and_crawl_nodes(tree, ancestors))
+    interrupted = asyncio.ensure_future(_interrupted.wait())
+    await asyncio.wait([crawling, interrupted], return_when=asyncio.FIRST_COMPLETED)
+    interrupted.cancel()
+    if crawling.done():
+        crawling.result()
+        return
 
+    print(colored('Crawl interrupted, outputting the partial graph crawled so far', 'yellow'), file=sys.stderr)
+    await _scheduler.get().stop()  # no new work is started, and work in progress is cancelled
+    for in_flight in [*_name_lookups_in_flight.values(), *_crawls_in_flight.values()]:
+        in_flight.cancel()
+    crawling.cancel()
+    await asyncio.gather(crawling, return_exceptions=True)
+    _mark_interrupted_nodes(tree, len(ancestors), set())
+
+
+async def _prefetch_and_crawl_nodes(tree: Dict[str, Node], ancestors: Ancestors):
+    await _prefetch(tree)
+    await _crawl_nodes(tree, ancestors)
+
+
+async def _prefetch(tree: Dict[str, Node]):
+    """Let every enabled provider warm up, concurrently, before the first level is crawled.  A failed prefetch only
+    costs its provider the head start, crawling then pays for the setup as usual."""
+    provider_refs = [ref for ref in providers.get_registered_provider_refs()
+                     if ref not in constants.ARGS.disable_providers]
+    hints = charlotte_web.all_hints()
+    results = await asyncio.gather(*[
+        providers.get_provider_by_ref(ref).prefetch([node.address for node in tree.values() if node.provider == ref],
+                                                    [hint for hint in hints if hint.instance_provider == ref])
+        for ref in provider_refs
+    ], return_exceptions=True)
+    for ref, result in zip(provider_refs, results):
+        if isinstance(result, Exception):
+            logs.logger.debug(f"Prefetch failed for provider {ref}: {result!r}")
+
+
+def _mark_interrupted_nodes(tree: Dict[str, Node], depth: int, seen: set):
+    """Nodes whose crawl never started were not reached by the cancellation, find them and mark them too"""
+    for node in tree.values():
+        if id(node) in seen:  # children are shared by all the nodes of a service
+            continue
+        seen.add(id(node))
+        if not node.crawl_complete(depth):
+            node.warnings['DEADLINE'] = True
+            node.signal_crawl_complete()
+        _mark_interrupted_nodes(node.children or {}, depth + 1, seen)
 
-async def _open_connections(tree: Dict[str, Node], ancestors: List[str]) -> (list, Dict[str, Node]):
-    connectable_tree = _filter_skipped_nodes_and_add_errors(tree)
-    conns = await _gather_connections(connectable_tree)
-    exceptions = [(ref, e) for ref, e in zip(list(connectable_tree), conns) if isinstance(e, Exception)]
-    _handle_connection_open_exceptions(exceptions, tree, ancestors)
-    clean_tree = {item[0]: item[1] for item, conn in zip(connectable_tree.items(), conns)
-                  if not isinstance(conn, Exception)}
-    clean_conns = [conn for conn in conns if not isinstance(conn, Exception)]
 
-    return clean_conns, clean_tree
+async def _crawl_nodes(tree: Dict[str, Node], ancestors: Ancestors):
+    await asyncio.gather(*[_crawl_node(ref, node, ancestors) for ref, node in tree.items()])
 
 
-def _filter_skipped_nodes_and_add_errors(tree: Dict[str, Node]) -> Dict[str, Node]:
-    connectable_tree = {}
-    for ref, node in tree.items():
-        if charlotte_web.skip_protocol_mux(node.protocol_mux):
-            node.errors['CONNECT_SKIPPED'] = True
-        else:
-            connectable_tree[ref] = node
-    return connectable_tree
+async def _crawl_node(node_ref: str, node: Node, ancestors: Ancestors):
+    work_item = WorkItem(len(ancestors), node.protocol, ancestors[0] if ancestors else None)
+    try:
+        children = await _scheduler.get().run(work_item, lambda: _crawl_node_pipeline(node_ref, node, ancestors))
+    except asyncio.CancelledError:
+        node.warnings['DEADLINE'] = True
+        raise
+    finally:
+        node.signal_crawl_complete()
+    if children:
+        await _scheduler.get().wait_for_space()  # backpressure: the subtree waits while the queue is full
+        await crawl(children, ancestors.push(node.service_name))
+
+
+async def _crawl_node_pipeline(node_ref: str, node: Node, ancestors: Ancestors) -> Dict[str, Node]:
+    """Returns the children of the node which are to be crawled next"""
+    depth = len(ancestors)
+    if charlotte_web.skip_protocol_mux(node.protocol_mux):
+        node.errors['CONNECT_SKIPPED'] = True
+        return {}
+
+    provider = providers.get_provider_by_ref(node.provider)
+    async with AsyncExitStack() as connection_scope:
+        try:
+            conn = await connection_scope.enter_async_context(_open_connection(node.address, provider))
+        except Exception as e:
+            _handle_connection_open_exception(e, node_ref, node, ancestors)
+            return {}
+
+        service_name = await _lookup_service_name_with_exception_handling(node_ref, node, provider, conn)
+        _assign_name_and_detect_cycle(node_ref, node, service_name, ancestors)
+        node.signal_name_lookup_complete()
+
+        if depth > constants.ARGS.max_depth - 1:
+            logs.logger.debug(f"Reached --max-depth of {constants.ARGS.max_depth} at depth: {depth}")
+            return {}
+
+        if not node.is_crawlable(depth):
+            node.warnings['CRAWL_SKIPPED'] = True
+            return {}
+
+        vertex, canonical = _graph.get().visit(node, depth, ancestors)
+        if not canonical:
+            await _share_children(node, vertex)
+            return {}  # the children are crawled by the canonical node of the vertex
+
+        try:
+            children = await _crawl_with_hints(node.provider, node_ref, node.address, node.service_name, conn)
+        except asyncio.CancelledError:
+            vertex.children.cancel()
+            raise
+        except Exception:
+            node.errors['CRAWL_FAILED'] = True
+            vertex.children.cancel()
+            return {}
+
+    return _assign_children(node, vertex, children, depth + 1)
+
+
+def _assign_children(node: Node, vertex: Vertex, children: Dict[str, Node], child_depth: int) -> Dict[str, Node]:
+    """Assign the nonexcluded, folded, children to the node and its vertex.  Returns those which are to be crawled"""
+    nonexcluded_children = {ref: child for ref, child in _copy_children(children).items()
+                            if not child.is_excluded(child_depth)}
+    nonexcluded_children = fan_out.fold(node.service_name, nonexcluded_children)
+    node.children = nonexcluded_children
+    vertex.children.set_result(nonexcluded_children)
+
+    children_to_crawl = {ref: child for ref, child in nonexcluded_children.items() if child.address}
+    if constants.ARGS.warm_connections:
+        for child in children_to_crawl.values():
+            _warm_connection(child)
+
+    return children_to_crawl
+
+
+async def _share_children(node: Node, vertex: Vertex):
+    logs.logger.debug(f"Sharing the children of {vertex.protocol_ref}:{vertex.service_name} crawled at depth: "
+                      f"{vertex.depth}")
+    await asyncio.wait([vertex.children])  # unlike await, does not raise if crawling the children is cancelled
+    if vertex.children.cancelled():
+        node.errors['CRAWL_FAILED'] = True
+        return
+    node.children = vertex.children.result()
 
 
-async def _gather_connections(tree: Dict[str, Node]):
-    return await asyncio.gather(
-        *[asyncio.wait_for(
-            _open_connection(node.address, providers.get_provider_by_ref(node.provider)), constants.ARGS.timeout
-        ) for node_ref, node in tree.items()],
-        return_exceptions=True
-    )
+def _assign_name_and_detect_cycle(node_ref: str, node: Node, service_name: Optional[str], ancestors: Ancestors):
+    if not service_name:
+        logs.logger.debug(f"Name lookup failed for {node_ref} with address: {node.address}")
+        service_name_cache[node.address] = None
+        node.errors['NAME_LOOKUP_FAILED'] = True
+        return
+    service_name = node.crawl_strategy.rewrite_service_name(service_name, node)
+    if constants.ARGS.obfuscate:
+        service_name = obfuscate.obfuscate_service_name(service_name)
+    _graph.get().add_edge(ancestors[-1] if ancestors else None, service_name)
+    if service_name in ancestors:
+        logs.logger.debug(f"Cycle detected: {' -> '.join(map(str, ancestors))} -> {service_name}")
+        node.warnings['CYCLE'] = True
+    node.service_name = service_name
+
+
+def _handle_connection_open_exception(e: Exception, node_ref: str, node: Node, ancestors: Ancestors):
+    if isinstance(e, (providers.TimeoutException, asyncio.TimeoutError)):
+        logs.logger.debug(f"Connection timeout when attempting to connect to {node_ref} with address: "
+                          f"{node.address}")
+        node.errors['TIMEOUT'] = True
+        journal.record_timeout(node.address)
+        return
+
+    child_of = f"child of {ancestors[-1]}" if ancestors else ''
+    print(colored(f"Exception {e.__class__.__name__} occurred opening connection for {node_ref}, "
+                  f"{node.address} {child_of}", 'red'))
+    node.errors['CONNECT_FAILED'] = True
+
 
+@asynccontextmanager
+async def _open_connection(address: str, provider: providers.ProviderInterface) -> AsyncIterator[Any]:
+    """The connection is shared with every other node with the same address, and closed after the last of them"""
+    if journal.timed_out(address):
+        await _connections.get().unwarm(provider, address)
+        raise providers.TimeoutException(f"Connection to {address} timed out in the resumed crawl")
+
+    if not _needs_connection(address):
+        await _connections.get().unwarm(provider, address)
+        yield None
+        return
 
-def _handle_connection_open_exceptions(exceptions: List[Tuple[str, Exception]], tree: Dict[str, Node],
-                                       ancestors: List[str]):
-    for node_ref, e in exceptions:
-        if isinstance(e, (providers.TimeoutException, asyncio.TimeoutError)):
-            logs.logger.debug(f"Connection timeout when attempting to connect to {node_ref} with address: "
-                              f"{tree[node_ref].address}")
-            tree[node_ref].errors['TIMEOUT'] = True
-        else:
-            child_of = f"child of {ancestors[len(ancestors)-1]}" if len(ancestors) > 0 else ''
-            print(colored(f"Exception {e.__class__.__name__} occurred opening connection for {node_ref}, "
-                          f"{tree[node_ref].address} {child_of}", 'red'))
-            traceback.print_tb(e.__traceback__)
-            sys.exit(1)
+    logs.logger.debug(f"Opening connection: {address}")
+    async with _connections.get().connection(provider, address,
+                                             lambda: _call_provider(provider, 'open_connection', address)) as conn:
+        yield conn
 
 
-async def _open_connection(address: str, provider: providers.ProviderInterface):
+def _needs_connection(address: str) -> bool:
+    """Whether crawling a node at `address` needs a connection, i.e. its name or children are not already known"""
+    _load_cached_name(address)
     if address in service_name_cache:
+        _load_cached_children(service_name_cache[address])
         if service_name_cache[address] is None:
             logs.logger.debug(f"Not opening connection: name is None ({address}")
-            return None
+            return False
         if charlotte_web.skip_service_name(service_name_cache[address]):
             logs.logger.debug(f"Not opening connection: skip ({service_name_cache[address]})")
-            return None
+            return False
         if service_name_cache[address] in child_cache:
             logs.logger.debug(f"Not opening connections: cached ({service_name_cache[address]})")
-            return None
+            return False
 
-    logs.logger.debug(f"Opening connection: {address}")
-    return await provider.open_connection(address)
+    return True
 
 
-async def _lookup_service_names(tree: Dict[str, Node], conns: list) -> (List[str], list):
-    # lookup_name / detect cycles
-    service_names = await asyncio.gather(
-        *[asyncio.wait_for(
-            _lookup_service_name(node.address, providers.get_provider_by_ref(node.provider), conn),
-            constants.ARGS.timeout) for node, conn in zip(tree.values(), conns)],
-        return_exceptions=True
-    )
+def _warm_connection(node: Node) -> None:
+    """Speculatively start opening the connection to a discovered node, so it is ready when the node is crawled"""
+    if charlotte_web.skip_protocol_mux(node.protocol_mux) or journal.timed_out(node.address) \
+            or not _needs_connection(node.address):
+        return
+    provider = providers.get_provider_by_ref(node.provider)
+    _connections.get().warm(provider, node.address,
+                            lambda: _call_provider(provider, 'open_connection', node.address))
 
-    # handle exceptions
-    exceptions = [(ref, e) for ref, e in zip(list(tree), service_names) if isinstance(e, Exception)]
-    for node_ref, e in exceptions:
-        if isinstance(e, asyncio.TimeoutError):
-            print(colored(f"Timeout during name lookup for {node_ref}:", 'red'))
-            print(colored({**vars(tree[node_ref]), 'crawl_strategy': tree[node_ref].crawl_strategy.name}, 'yellow'))
-            traceback.print_tb(e.__traceback__)
-            sys.exit(1)
-        else:
-            traceback.print_tb(e.__traceback__)
-            sys.exit(1)
 
-    return service_names, conns
+async def _lookup_service_name_with_exception_handling(node_ref: str, node: Node,
+                                                        provider: providers.ProviderInterface,
+                                                        connection: type) -> Optional[str]:
+    try:
+        return await _lookup_service_name(node.address, node.protocol.ref, provider, connection)
+    except Exception as e:
+        print(colored(f"Exception {e.__class__.__name__} occurred during name lookup for {node_ref}:", 'red'))
+        print(colored({**asdict(node), 'crawl_strategy': node.crawl_strategy.name}, 'yellow'))
+        return None
 
 
-async def _lookup_service_name(address: str, provider: providers.ProviderInterface,
+async def _lookup_service_name(address: str, protocol_ref: str, provider: providers.ProviderInterface,
                                connection: type) -> Optional[str]:
+    _load_cached_name(address)
     if address in service_name_cache:
         logs.logger.debug(f"Using cached service name ({service_name_cache[address]} for: {address}")
         return service_name_cache[address]
 
+    if address in _name_lookups_in_flight:
+        logs.logger.debug(f"Awaiting in-flight name lookup for address {address}")
+        return await asyncio.shield(_name_lookups_in_flight[address])
+
+    return await asyncio.shield(_start_in_flight(
+        _name_lookups_in_flight, address, _lookup_service_name_uncached(address, protocol_ref, provider, connection)
+    ))
+
+
+async def _lookup_service_name_uncached(address: str, protocol_ref: str, provider: providers.ProviderInterface,
+                                        connection: type) -> Optional[str]:
     logs.logger.debug(f"Getting service name for address {address}")
-    service_name = await provider.lookup_name(address, connection)
+    service_name = await _call_provider(provider, 'lookup_name', address, connection)
     logs.logger.debug(f"Discovered name: {service_name} for address {address}")
     service_name_cache[address] = service_name
+    journal.record_name(address, service_name)
+    cache.put_name(address, service_name, protocol_ref)
 
     return service_name
 
 
+def _load_cached_name(address: str) -> None:
+    """Load the service name from the resumed journal or the persistent crawl cache into service_name_cache"""
+    if address in service_name_cache:
+        return
+    for source, get_name in [('journal', journal.get_name), ('crawl cache', cache.get_name)]:
+        hit, service_name = get_name(address)
+        if hit:
+            logs.logger.debug(f"Loaded service name ({service_name}) from {source} for: {address}")
+            service_name_cache[address] = service_name
+            return
+
+
+def _load_cached_children(service_name: Optional[str]) -> None:
+    """Load children from the resumed journal or the persistent crawl cache into child_cache"""
+    if service_name in child_cache:
+        return
+    for source, get_children in [('journal', journal.get_children), ('crawl cache', cache.get_children)]:
+        hit, children = get_children(service_name)
+        if hit:
+            logs.logger.debug(f"Loaded {len(children)} children from {source} for: {service_name}")
+            child_cache[service_name] = children
+            return
+
+
 async def _crawl_with_hints(provider_ref: str, node_ref: str, address: str, service_name: str,
-                            connection: type) -> (str, Dict[str, Node]):
+                            connection: type) -> Dict[str, Node]:
+    _load_cached_children(service_name)
     if service_name in child_cache:
         logs.logger.debug(f"Found {len(child_cache[service_name])} children in cache for:{service_name}")
-        # we must to this copy to avoid various contention and infinite recursion bugs
-        return node_ref, {r: replace(n, children={}, warnings=n.warnings.copy(), errors=n.errors.copy())
-                          for r, n in child_cache[service_name].items()}
+        return child_cache[service_name]
 
-    logs.logger.debug(f"Crawling with charlotte/web for {node_ref}")
-    tasks, crawl_strategies = _compile_crawl_tasks_and_crawl_strategies(address, service_name,
-                                                                        providers.get_provider_by_ref(provider_ref), connection)
+    if service_name in _crawls_in_flight:
+        logs.logger.debug(f"Awaiting in-flight crawl for:{service_name}")
+        return await asyncio.shield(_crawls_in_flight[service_name])
+
+    return await asyncio.shield(_start_in_flight(
+        _crawls_in_flight, service_name,
+        _crawl_with_hints_uncached(provider_ref, node_ref, address, service_name, connection)
+    ))
+
+
+def _copy_children(children: Dict[str, Node]) -> Dict[str, Node]:
+    # the cached children are copied once per vertex (not per node) - crawling then mutates the copies
+    return {r: replace(n, children={}, warnings=n.warnings.copy(), errors=n.errors.copy())
+            for r, n in children.items()}
 
-    # if there are any timeouts or exceptions, panic and run away! we don't want an incomplete graph to look complete
-    crawl_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+async def _crawl_with_hints_uncached(provider_ref: str, node_ref: str, address: str, service_name: str,
+                                     connection: type) -> Dict[str, Node]:
+    logs.logger.debug(f"Crawling with charlotte/web for {node_ref}")
+    provider = providers.get_provider_by_ref(provider_ref)
+    charlotte_strategies = _charlotte_crawl_strategies(service_name, provider)
+    tasks, crawl_strategies = _compile_crawl_tasks_and_crawl_strategies(address, service_name, provider, connection,
+                                                                        charlotte_strategies)
+    sibling_addresses = (await _lookup_instances(service_name, address, provider))[1:]
+
+    # if there are any timeouts or exceptions (after retries) we don't want an incomplete graph to look complete
+    crawl_results, *sibling_results = await asyncio.gather(
+        asyncio.gather(*tasks, return_exceptions=True),
+        *[_crawl_sibling_instance(sibling, service_name, provider, charlotte_strategies)
+          for sibling in sibling_addresses]
+    )
     crawl_exceptions = [e for e in crawl_results if isinstance(e, Exception)]
     if crawl_exceptions:
         if isinstance(crawl_exceptions[0], asyncio.TimeoutError):
@@ -214,7 +424,81 @@ async def _crawl_with_hints(provider_ref: str, node_ref: str, address: str, serv
         print(f"{type(crawl_exceptions[0])}({crawl_exceptions[0]})")
         raise crawl_exceptions[0]
 
-    # parse returned NodeTransport objects to Node objects
+    children = _merge_children(crawl_results, sibling_results, crawl_strategies, len(charlotte_strategies))
+    logs.logger.debug(f"Found {len(children)} children for {service_name}")
+    child_cache[service_name] = children
+    journal.record_children(service_name, children)
+    cache.put_children(service_name, children)
+
+    return children
+
+
+def _merge_children(crawl_results: List[List[NodeTransport]],
+                    sibling_results: List[Optional[List[List[NodeTransport]]]],
+                    crawl_strategies: List[CrawlStrategy], num_charlotte: int) -> Dict[str, Node]:
+    """
+    Parse the returned NodeTransport objects to Node objects: those of the hints, and those of the charlotte crawl
+    strategies - unioned across the instances crawled per --instances-per-service
+
+    :param crawl_results: results of the charlotte crawl strategies, then of the hints
+    :param sibling_results: results of the charlotte crawl strategies for each further instance, None if it failed
+    :param crawl_strategies: the crawl strategy of each of `crawl_results`
+    :param num_charlotte: the number of charlotte crawl strategies
+    """
+    charlotte_strategies = crawl_strategies[:num_charlotte]
+    children = _create_children(crawl_results[num_charlotte:], crawl_strategies[num_charlotte:])
+    if constants.ARGS.instances_per_service > 1:
+        instances_children = [_create_children(results, charlotte_strategies)
+                              for results in [crawl_results[:num_charlotte]] + sibling_results if results is not None]
+        children.update(_union_instances_children(instances_children))
+    else:
+        children.update(_create_children(crawl_results[:num_charlotte], charlotte_strategies))
+
+    return children
+
+
+async def _lookup_instances(service_name: str, address: str, provider: providers.ProviderInterface) -> List[str]:
+    """Addresses of the instances of the service to crawl per --instances-per-service, starting with `address`"""
+    count = constants.ARGS.instances_per_service
+    if count <= 1:
+        return [address]
+    instances_provider = providers.get_provider_by_ref(constants.ARGS.instances_provider) \
+        if constants.ARGS.instances_provider else provider
+    try:
+        addresses = await _call_provider(instances_provider, 'lookup_instances', service_name, address, count)
+    except Exception as e:
+        logs.logger.debug(f"Exception {e.__class__.__name__}({e}) looking up instances of {service_name}, crawling "
+                          f"only {address}")
+        return [address]
+    logs.logger.debug(f"Crawling {len(addresses)} instances of {service_name}: {addresses}")
+
+    return [address] + [a for a in addresses if a != address][:count - 1]
+
+
+async def _crawl_sibling_instance(address: str, service_name: str, provider: providers.ProviderInterface,
+                                  crawl_strategies: List[CrawlStrategy]) -> Optional[List[List[NodeTransport]]]:
+    """
+    Crawl another instance of the service with the charlotte crawl strategies.  It runs within the scheduler slot of
+    the node being crawled, so --crawl-concurrency still bounds the services crawled at once, and connections are
+    opened through the provider (and so bounded by its own limits, e.g. --ssh-concurrency).
+
+    :return: the results of each crawl strategy, or None if the instance could not be crawled
+    """
+    try:
+        async with _connections.get().connection(
+                provider, address, lambda: _call_provider(provider, 'open_connection', address)) as connection:
+            return await asyncio.gather(*[
+                _call_provider(provider, 'crawl_downstream', address, connection, **cs.provider_args)
+                for cs in crawl_strategies
+            ])
+    except Exception as e:
+        logs.logger.debug(f"Exception {e.__class__.__name__}({e}) crawling instance {address} of {service_name}, "
+                          f"it is left out of the sample")
+        return None
+
+
+def _create_children(crawl_results: List[List[NodeTransport]],
+                     crawl_strategies: List[CrawlStrategy]) -> Dict[str, Node]:
     children = {}
     for node_transports, crawl_strategy in [(nts, cs) for nts, cs in zip(crawl_results, crawl_strategies) if nts]:
         for node_transport in node_transports:
@@ -222,33 +506,67 @@ async def _crawl_with_hints(provider_ref: str, node_ref: str, address: str, serv
                 continue
             child_ref, child = _create_node(crawl_strategy, node_transport)
             children[child_ref] = child
-    logs.logger.debug(f"Found {len(children)} children for {service_name}")
-    child_cache[service_name] = children
 
-    return node_ref, children
+    return children
+
+
+def _union_instances_children(instances_children: List[Dict[str, Node]]) -> Dict[str, Node]:
+    """
+    Union the children crawled from each instance of a service, recording on each child how many of the instances
+    reported it.  Where instances disagree on a child (e.g. DEFUNCT on one instance only), the first instance wins.
+    """
+    union = {}
+    for children in instances_children:
+        for child_ref, child in children.items():
+            if child_ref not in union:
+                child.instances_reporting, child.instances_sampled = 0, len(instances_children)
+                union[child_ref] = child
+            union[child_ref].instances_reporting += 1
+
+    return union
+
+
+def _start_in_flight(in_flight: Dict[str, asyncio.Future], key: str, coro: Coroutine) -> asyncio.Future:
+    """
+    Single flight: run `coro` as the one in-flight call for `key`.  Concurrent callers for the same key find it in
+    `in_flight` and await the shared future rather than each making the same provider call.  Callers should await it
+    through asyncio.shield() so that one caller timing out does not cancel it for the others.
+
+    :param in_flight: registry of in-flight futures
+    :param key: e.g. an address or a service name
+    :param coro: the call to make
+    :return: the shared future
+    """
+    future = asyncio.ensure_future(coro)
+    in_flight[key] = future
+    future.add_done_callback(lambda f: _retire_in_flight(in_flight, key, f))
+
+    return future
+
+
+def _retire_in_flight(in_flight: Dict[str, asyncio.Future], key: str, future: asyncio.Future):
+    if in_flight.get(key) is future:
+        del in_flight[key]
+    if not future.cancelled():
+        future.exception()  # mark retrieved, every caller may have given up on it already
 
 
 def _compile_crawl_tasks_and_crawl_strategies(address: str, service_name: str, provider: providers.ProviderInterface,
-                                              connection: type) -> (List[callable], List[CrawlStrategy]):
+                                              connection: type, charlotte_strategies: List[CrawlStrategy]
+                                              ) -> (List[callable], List[CrawlStrategy]):
     tasks = []
     crawl_strategies: List[CrawlStrategy] = []
 
     # charlotte
-    for cs in charlotte.crawl_strategies:
-        if cs.protocol.ref in constants.ARGS.skip_protocols or cs.filter_service_name(service_name) \
-                or provider.ref() not in cs.providers:
-            continue
+    for cs in charlotte_strategies:
         crawl_strategies.append(cs)
-        tasks.append(asyncio.wait_for(
-            provider.crawl_downstream(address, connection, **cs.provider_args),
-            timeout=constants.ARGS.timeout
-        ))
+        tasks.append(_call_provider(provider, 'crawl_downstream', address, connection, **cs.provider_args))
 
     # take hints
     for hint in [hint for hint in charlotte_web.hints(service_name)
                  if hint.instance_provider not in constants.ARGS.disable_providers]:
         hint_provider = providers.get_provider_by_ref(hint.instance_provider)
-        tasks.append(asyncio.wait_for(hint_provider.take_a_hint(hint), timeout=constants.ARGS.timeout))
+        tasks.append(_call_provider(hint_provider, 'take_a_hint', hint))
         crawl_strategies.append(
             replace(
                 charlotte.HINT_CRAWL_STRATEGY,
@@ -260,6 +578,31 @@ def _compile_crawl_tasks_and_crawl_strategies(address: str, service_name: str, p
     return tasks, crawl_strategies
 
 
+def _charlotte_crawl_strategies(service_name: str, provider: providers.ProviderInterface) -> List[CrawlStrategy]:
+    return [cs for cs in charlotte.crawl_strategies
+            if cs.protocol.ref not in constants.ARGS.skip_protocols and not cs.filter_service_name(service_name)
+            and provider.ref() in cs.providers]
+
+
+def _call_provider(provider: providers.ProviderInterface, method: str, *args, **kwargs) -> Awaitable:
+    """Call provider.method(*args, **kwargs) with --timeout applied to each attempt, retrying per the --retry-* args.
+    If the provider implements the batch counterpart of the method, the call is coalesced with others into a batch.
+    Each attempt is recorded if --record is specified"""
+    coalescer = _coalescers.get().get(provider, method) if _coalescers.get() else None
+    item = coalesce.request(method, args, kwargs) if coalescer else None
+
+    def call() -> Awaitable:
+        return coalescer.submit(item) if coalescer else getattr(provider, method)(*args, **kwargs)
+
+    def attempt() -> Awaitable:
+        return asyncio.wait_for(call(), timeout=constants.ARGS.timeout)
+
+    return retry.call(
+        retry.policy_for(provider), f"{provider.ref()}.{method}({args[0]})",
+        lambda: cassette.record(provider, method, args, kwargs, attempt)
+    )
+
+
 def _skip_protocol_mux(mux: str):
     for skip in constants.ARGS.skip_protocol_muxes:
         if skip in mux:
@@ -278,11 +621,12 @@ def _create_node(cs_used: CrawlStrategy, node_transport: NodeTransport) -> (str,
         protocol=cs_used.protocol,
         protocol_mux=node_transport.protocol_mux,
         provider=provider,
-        containerized=providers.get_provider_by_ref(provider).is_container_platform(),
+        containerized=(provider not in constants.ARGS.disable_providers  # not registered, the node is excluded
+                       and providers.get_provider_by_ref(provider).is_container_platform()),
         from_hint=from_hint,
         address=node_transport.address,
         service_name=node_transport.debug_identifier if from_hint else None,
-        metadata=node_transport.metadata
+        metadata=node_transport.metadata or None
     )
 
     # warnings/errors
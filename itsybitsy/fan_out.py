@@ -0,0 +1,77 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Fan-out cap for hub services (e.g. NSQ lookupds, shared proxies) which have hundreds of children.  Per protocol, the
+first N children of a node are crawled normally.  The rest are folded into one aggregate child which records how many
+there are, and a sample of their muxes and addresses - it is not crawled (or rendered child by child) unless the
+service is listed in --expand-fan-out.
+"""
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from . import constants
+from .node import Node
+
+SAMPLE_SIZE = 5
+
+
+def fold(service_name: str, children: Dict[str, Node]) -> Dict[str, Node]:
+    """
+    Fold the children of service `service_name` beyond the fan-out limit of their protocol into aggregate children
+
+    :param service_name: the parent service
+    :param children: {node_ref: Node}
+    :return: the first N children per protocol, plus an aggregate child per protocol over its limit
+    """
+    if service_name in constants.ARGS.expand_fan_out:
+        return children
+
+    kept = {}
+    folded: Dict[str, List[Node]] = defaultdict(list)  # {protocol_ref: [Node]}
+    counts: Dict[str, int] = defaultdict(int)  # {protocol_ref: num children kept}
+    for ref, child in children.items():
+        limit = _protocol_limit(child.protocol.ref)
+        if child.from_hint or not limit or counts[child.protocol.ref] < limit:
+            kept[ref] = child
+            counts[child.protocol.ref] += not child.from_hint  # hints are configured explicitly, never folded
+        else:
+            folded[child.protocol.ref].append(child)
+
+    for protocol_ref, overflow in folded.items():
+        kept[f"{protocol_ref}_FAN_OUT"] = _aggregate(overflow)
+
+    return kept
+
+
+def _aggregate(overflow: List[Node]) -> Node:
+    """An aggregate Node() for the folded children.  It is never crawled: the FAN_OUT warning makes it uncrawlable"""
+    sample = overflow[:SAMPLE_SIZE]
+    aggregate = replace(
+        sample[0],
+        protocol_mux=','.join(child.protocol_mux for child in sample),
+        address=None,
+        service_name=f"{len(overflow)} more",
+        children=None,
+        warnings={},
+        errors={},
+        metadata={
+            'fan_out_count': len(overflow),
+            'fan_out_muxes': [child.protocol_mux for child in sample],
+            'fan_out_addresses': [child.address for child in sample]
+        },
+        instances_reporting=None,
+        instances_sampled=None
+    )
+    aggregate.warnings['FAN_OUT'] = True
+
+    return aggregate
+
+
+def _protocol_limit(protocol_ref: str) -> Optional[int]:
+    for protocol_limit in constants.ARGS.fan_out_protocol_limits:
+        ref, limit = protocol_limit.split('=')
+        if ref == protocol_ref:
+            return int(limit)
+    return constants.ARGS.fan_out_limit
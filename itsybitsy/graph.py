@@ -0,0 +1,85 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Crawl scoped store of the crawled graph: one canonical Vertex per (protocol, service).  The children of a vertex are
+crawled once, and every Node() of that service shares them - i.e. the tree handed to renderers is a cheap projection
+of the graph, in which a popular service's subtree is not materialized once per path to it.
+
+The children are Node()s, which also serve as the edges of the graph: they carry the per-parent attributes (protocol
+mux, DEFUNCT, from_hint, etc).
+"""
+import asyncio
+from collections import defaultdict
+from typing import Container, Dict, Optional, Set, Tuple
+
+from .node import Node
+
+
+class Vertex:
+    def __init__(self, protocol_ref: str, service_name: str, depth: int):
+        """
+        :param protocol_ref:
+        :param service_name:
+        :param depth: depth of the Node() which crawls the children
+        """
+        self.protocol_ref = protocol_ref
+        self.service_name = service_name
+        self.depth = depth
+        # Future[{node_ref: Node}] - cancelled if crawling the children fails
+        self.children: asyncio.Future = asyncio.get_event_loop().create_future()
+
+
+class GraphStore:
+    def __init__(self):
+        # {(protocol_ref, service_name, is_seed): Vertex} - children crawled by seeds are subject to different
+        # --skip-nonblocking-grandchildren rules than those crawled by their descendants, so they are not shared
+        self._vertices: Dict[Tuple[str, str, bool], Vertex] = {}
+        self._downstream: Dict[str, Set[str]] = defaultdict(set)  # {service_name: {child service_name}}
+
+    def add_edge(self, parent: Optional[str], child: str) -> None:
+        """
+        Record that service `parent` calls service `child`
+
+        :param parent: None for seeds
+        :param child:
+        """
+        if parent is not None:
+            self._downstream[parent].add(child)
+
+    def visit(self, node: Node, depth: int, ancestors: Container[str]) -> Tuple[Vertex, bool]:
+        """
+        Find or create the vertex of a named, crawlable Node()
+
+        :param node:
+        :param depth: depth of the node
+        :param ancestors: service names of the ancestors of the node
+        :return: (vertex, canonical) - canonical if the node is to crawl the children of the vertex, otherwise the
+                 node shares the children crawled by another node
+        """
+        key = (node.protocol.ref, node.service_name, 0 == depth)
+        vertex = self._vertices.get(key)
+        # children crawled deeper in the tree may have been cut short by --max-depth, so are not shared
+        if vertex and vertex.depth <= depth and not self._reaches(node.service_name, ancestors):
+            return vertex, False
+
+        new_vertex = Vertex(node.protocol.ref, node.service_name, depth)
+        if vertex is None or depth < vertex.depth:
+            self._vertices[key] = new_vertex  # the shallowest is shared by the most nodes
+        return new_vertex, True
+
+    def _reaches(self, source: str, destinations: Container[str]) -> bool:
+        """Whether `source` calls any of `destinations`, through any path crawled so far.  Sharing the children of
+        `source` with a node whose ancestors it reaches would make a cycle of the tree, so the node crawls instead"""
+        seen = set()
+        pending = [source]
+        while pending:
+            service_name = pending.pop()
+            if service_name in destinations:
+                return True
+            if service_name in seen:
+                continue
+            seen.add(service_name)
+            pending.extend(self._downstream.get(service_name, ()))
+
+        return False
@@ -6,14 +6,19 @@ __version__ = "1.0.1"
 import asyncio
 import getpass
 import logging
+import multiprocessing
 import os
 import signal
 import sys
+import tempfile
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 from termcolor import colored
-from typing import Dict
+from typing import Dict, List, Optional
 
-from . import charlotte, charlotte_web, cli_args, constants, crawl, logs, node, plugin_core, providers, renderers
+from . import cache, cassette, charlotte, charlotte_web, cli_args, constants, crawl, journal, logs, node, plugin_core, \
+    provider_cache, providers, renderers
 from .plugins import render_json, render_ascii
 
 
@@ -28,8 +33,13 @@ if sys.version_info[0] < REQUIRED_PYTHON_VERSION[0] or sys.version_info[1] < REQ
           f"{tuple_join(REQUIRED_PYTHON_VERSION)} available at `/usr/bin/env python3`")
     sys.exit(1)
 
+
+def _exit_on_sigint(*_):
+    sys.exit(0)
+
+
 # catch ctrl-c
-signal.signal(signal.SIGINT, lambda x, y: sys.exit(0))
+signal.signal(signal.SIGINT, _exit_on_sigint)
 
 
 def main():
@@ -99,11 +109,111 @@ class SpiderCommand(Command):
         _initialize_providers()
 
     def _generate_tree(self) -> Dict[str, node.Node]:
-        tree = asyncio.get_event_loop().run_until_complete(_crawl_water_spout())
+        if constants.ARGS.seed_from_inventory:
+            constants.ARGS.seeds = constants.ARGS.seeds + _inventory_seeds(constants.ARGS.seed_from_inventory)
+        if not constants.ARGS.seeds:
+            print(colored('No seeds to crawl!  Please specify --seeds and/or --seed-from-inventory', 'red'))
+            sys.exit(1)
+        seeds = list(dict.fromkeys(constants.ARGS.seeds))  # deduped, in order
+        if constants.ARGS.workers > 1 and len(seeds) > 1:
+            tree = _crawl_shards(seeds)
+        else:
+            tree = _crawl(constants.JOURNAL_FILE)
         render_json.dump(tree, constants.LASTRUN_FILE)
         return tree
 
 
+def _inventory_seeds(provider_ref: str) -> List[str]:
+    """A seed for one instance of every service in the inventory of the provider"""
+    provider = providers.get_provider_by_ref(provider_ref)
+    cassette.init(cassette.INVENTORY_CASSETTE_FILE)
+    try:
+        instances = asyncio.get_event_loop().run_until_complete(
+            cassette.record(provider, 'inventory', (), {}, provider.inventory)
+        )
+    finally:
+        cassette.close()
+    representatives = providers.representative_instances(instances)
+    print(colored(f"Seeding from {provider_ref} inventory: {len(representatives)} services ({len(instances)} "
+                  f"instances)", 'cyan'), file=sys.stderr)
+    seed_provider_ref = constants.ARGS.inventory_seed_provider or provider_ref
+
+    return [f"{seed_provider_ref}:{instance.address}" for instance in representatives]
+
+
+def _crawl(journal_file: str, cassette_file: str = cassette.CASSETTE_FILE,
+           cache_file: str = constants.CRAWL_CACHE_FILE) -> Dict[str, node.Node]:
+    cache.init(cache_file)
+    journal.init(journal_file)
+    cassette.init(cassette_file)
+    crawl.child_cache.set_budget(constants.ARGS.child_cache_mb)
+    try:
+        return asyncio.get_event_loop().run_until_complete(_crawl_water_spout())
+    finally:
+        crawl.child_cache.close()
+        journal.close()
+        cache.close()
+        provider_cache.close()
+        cassette.close()
+        providers.shutdown_executors()
+
+
+def _crawl_shards(seeds: List[str]) -> Dict[str, node.Node]:
+    """
+    Crawl the seeds sharded across --workers processes, each with its own event loop and provider connections, and
+    merge their trees.  The workers share names and children through the crawl cache: the persistent crawl cache with
+    --cache-mode read-write, or with --cache-mode off a crawl cache for this run only.  With --cache-mode read or
+    refresh the workers do not share.  Live rendering is not possible across processes, so the workers crawl quietly.
+    """
+    shards = [seeds[i::constants.ARGS.workers] for i in range(min(constants.ARGS.workers, len(seeds)))]
+    print(colored(f"Crawling {len(seeds)} seeds in {len(shards)} worker processes...", 'cyan'), file=sys.stderr)
+    tree = {}
+    signal.signal(signal.SIGINT, _exit_on_second_sigint)  # the workers are interrupted by the first ctrl-c
+    try:
+        with tempfile.TemporaryDirectory() as run_dir, \
+                ProcessPoolExecutor(len(shards), mp_context=multiprocessing.get_context('spawn')) as pool:
+            run_cache_file = os.path.join(run_dir, os.path.basename(constants.CRAWL_CACHE_FILE)) \
+                if cache.MODE_OFF == constants.ARGS.cache_mode else None
+            futures = [pool.submit(_crawl_shard, constants.ARGS, shard, i, run_cache_file)
+                       for i, shard in enumerate(shards)]
+            for future in futures:
+                tree.update(render_json.loads(future.result()))
+    finally:
+        signal.signal(signal.SIGINT, _exit_on_sigint)
+
+    return tree
+
+
+def _crawl_shard(args: Namespace, seeds: List[str], shard: int, run_cache_file: Optional[str] = None) -> str:
+    """
+    Entry point of a --workers process: crawl a shard of the seeds
+
+    :param args: the parsed CLI args of the coordinator
+    :param seeds: the seeds of the shard
+    :param shard: index of the shard, each shard has its own journal (so --resume requires the same --workers)
+    :param run_cache_file: crawl cache shared by the workers for this run only, in place of the persistent crawl cache
+    :return: the tree, serialized to json (crawled Node()s hold asyncio primitives which do not pickle)
+    """
+    constants.ARGS = args
+    constants.ARGS.seeds = seeds
+    constants.ARGS.quiet = True
+    _set_debug_level()
+    plugin_core.import_plugin_classes()
+    charlotte.init()
+    _register_providers()
+
+    cache_file = constants.CRAWL_CACHE_FILE
+    if run_cache_file:
+        constants.ARGS.cache_mode = cache.MODE_READ_WRITE
+        cache_file = run_cache_file
+
+    return render_json.dumps(_crawl(f"{constants.JOURNAL_FILE}.{shard}", f"cassette.{shard}.jsonl", cache_file))
+
+
+def _exit_on_second_sigint(*_):
+    signal.signal(signal.SIGINT, _exit_on_sigint)
+
+
 def _cli_command() -> Command:
     if cli_args.command_render == constants.ARGS.command:
         return RenderCommand()
@@ -121,12 +231,37 @@ async def _crawl_water_spout():
 
 
 async def _crawl_and_render_to_stderr_unless_quiet_is_specified(tree: Dict[str, node.Node]):
-    outfile = open(os.devnull, 'w') if constants.ARGS.quiet else sys.stderr
-    crawl_tasks = [
-        crawl.crawl(tree, []),
-        render_ascii.render_tree(tree, [], out=outfile, print_slowly_for_humans=True)
-    ]
-    await asyncio.gather(*crawl_tasks)
+    loop = asyncio.get_event_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, _interrupt_crawl_on_sigint)
+    except NotImplementedError:  # windows event loops do not support signal handlers
+        signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(_interrupt_crawl_on_sigint))
+    try:
+        if constants.ARGS.quiet:
+            await crawl.crawl(tree, [])
+            return
+
+        crawl_tasks = [
+            crawl.crawl(tree, []),
+            render_ascii.render_tree(tree, [], out=sys.stderr, print_slowly_for_humans=True)
+        ]
+        await asyncio.gather(*crawl_tasks)
+    finally:
+        _restore_sigint_handler(loop)
+
+
+def _interrupt_crawl_on_sigint():
+    """The first ctrl-c stops the crawl but still outputs the partial graph, a second ctrl-c exits immediately"""
+    _restore_sigint_handler(asyncio.get_event_loop())
+    crawl.interrupt()
+
+
+def _restore_sigint_handler(loop: asyncio.AbstractEventLoop):
+    try:
+        loop.remove_signal_handler(signal.SIGINT)
+    except NotImplementedError:  # windows, the handler was set with signal.signal()
+        pass
+    signal.signal(signal.SIGINT, _exit_on_sigint)
 
 
 def _parse_seed_tree() -> Dict[str, node.Node]:
@@ -156,7 +291,15 @@ def _initialize_renderers(parse_spider_command_args: bool = False):
 def _initialize_providers():
     providers.parse_provider_args(cli_args.spider_subparser)
     constants.ARGS, _ = cli_args.argparser.parse_known_args()
-    providers.register_providers()
+    _register_providers()
+
+
+def _register_providers():
+    """The providers, or with --replay stand ins for the recorded providers"""
+    if constants.ARGS.replay:
+        cassette.register_replay_providers(constants.ARGS.replay)
+    else:
+        providers.register_providers()
 
 
 def _create_outputs_directory_if_absent():
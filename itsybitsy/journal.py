@@ -0,0 +1,113 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Append-only journal of provider results (connection timeouts, service names, children), written during crawling.  If
+a crawl dies part way through, `spider --resume` replays the journal so that only hosts without an entry in it are
+contacted again.
+"""
+import json
+from typing import Dict, Optional, Set, TextIO, Tuple
+
+from . import constants, logs
+from .node import Node
+from .plugins import render_json
+
+ENTRY_TIMEOUT = 'timeout'
+ENTRY_NAME = 'name'
+ENTRY_CHILDREN = 'children'
+
+_journal: Optional[TextIO] = None
+# replayed from the resumed journal
+_timeouts: Set[str] = set()  # {address}
+_names: Dict[str, Optional[str]] = {}  # {address: service_name}
+_children: Dict[str, Dict[str, Node]] = {}  # {service_name: {node_ref: Node}}
+
+
+def init(path: str = constants.JOURNAL_FILE) -> None:
+    """Start a new journal, or replay and then continue the existing journal if --resume is specified"""
+    global _journal
+    if constants.ARGS.resume:
+        _replay(path)
+        _journal = open(path, 'a')
+    else:
+        _journal = open(path, 'w')
+
+
+def close() -> None:
+    global _journal
+    if _journal:
+        _journal.close()
+    _journal = None
+    _timeouts.clear()
+    _names.clear()
+    _children.clear()
+
+
+def record_timeout(address: str) -> None:
+    if address not in _timeouts:  # already journaled by the resumed crawl
+        _append({'type': ENTRY_TIMEOUT, 'address': address})
+
+
+def record_name(address: str, service_name: Optional[str]) -> None:
+    _append({'type': ENTRY_NAME, 'address': address, 'service_name': service_name})
+
+
+def record_children(service_name: str, children: Dict[str, Node]) -> None:
+    _append({'type': ENTRY_CHILDREN, 'service_name': service_name, 'children': children})
+
+
+def timed_out(address: str) -> bool:
+    """Did connecting to the address time out in the replayed journal?"""
+    return address in _timeouts
+
+
+def get_name(address: str) -> Tuple[bool, Optional[str]]:
+    """
+    :param address:
+    :return: (hit, service_name) from the replayed journal
+    """
+    if address in _names:
+        return True, _names[address]
+    return False, None
+
+
+def get_children(service_name: str) -> Tuple[bool, Optional[Dict[str, Node]]]:
+    """
+    :param service_name:
+    :return: (hit, children) from the replayed journal
+    """
+    if service_name in _children:
+        return True, _children[service_name]
+    return False, None
+
+
+def _append(entry: dict) -> None:
+    if not _journal:
+        return
+    _journal.write(render_json.dumps(entry) + '\n')
+    _journal.flush()  # if we crash, everything crawled so far is on disk
+
+
+def _replay(path: str) -> None:
+    try:
+        with open(path, 'r') as journal:
+            lines = journal.readlines()
+    except FileNotFoundError:
+        logs.logger.debug(f"No journal to resume from at: {path}")
+        return
+
+    for line in lines:
+        try:
+            entry = render_json.loads(line)
+        except json.JSONDecodeError:
+            logs.logger.debug(f"Skipping incomplete journal entry: {line}")  # e.g. the last line written in a crash
+            continue
+        if ENTRY_TIMEOUT == entry['type']:
+            _timeouts.add(entry['address'])
+        elif ENTRY_NAME == entry['type']:
+            _names[entry['address']] = entry['service_name']
+        elif ENTRY_CHILDREN == entry['type']:
+            _children[entry['service_name']] = entry['children']
+    logs.logger.debug(f"Replayed journal: {len(_timeouts)} timeouts, {len(_names)} names, "
+                      f"{len(_children)} children entries")
@@ -1,14 +1,143 @@
 # Copyright # Copyright 2020 Life360, Inc
 # SPDX-License-Identifier: Apache-2.0
 
-from typing import Dict, Optional
-from dataclasses import dataclass, field
+import asyncio
+from collections.abc import MutableMapping
+from enum import IntFlag, auto
+from typing import Dict, Iterator, Optional
+from dataclasses import dataclass, field, fields
 
 from . import charlotte, constants, charlotte_web
 
 database_muxes = ['3306', '9160', '5432', '6379', '11211']
 
 
+class Code(IntFlag):
+    """The known error/warning codes of a Node(), stored as bits"""
+    TIMEOUT = auto()
+    NULL_ADDRESS = auto()
+    CYCLE = auto()
+    DEFUNCT = auto()
+    CRAWL_SKIPPED = auto()
+    CONNECT_SKIPPED = auto()
+    NAME_LOOKUP_FAILED = auto()
+    CONNECT_FAILED = auto()
+    CRAWL_FAILED = auto()
+    DEADLINE = auto()
+    AWS_LOOKUP_FAILED = auto()
+    FAN_OUT = auto()
+
+
+_code_bits = {code.name: code.value for code in Code}  # faster than Code[name]
+
+
+class Codes(MutableMapping):
+    """
+    Dict style view, e.g. {'TIMEOUT': True}, of the errors or warnings of a Node().  Known codes set to True are stored
+    as bits of an int (see Code), anything else in an overflow dict which is only allocated when needed.
+    """
+    __slots__ = ('_node', '_bits', '_overflow')
+
+    def __init__(self, node: 'Node', bits: str, overflow: str):
+        """
+        :param node:
+        :param bits: name of the int attribute of the node holding the bits
+        :param overflow: name of the Optional[dict] attribute of the node holding any other codes
+        """
+        self._node = node
+        self._bits = bits
+        self._overflow = overflow
+
+    def __getitem__(self, code: str):
+        bit = _code_bits.get(code)
+        if bit and getattr(self._node, self._bits) & bit:
+            return True
+        overflow = getattr(self._node, self._overflow)
+        if overflow and code in overflow:
+            return overflow[code]
+        raise KeyError(code)
+
+    def __setitem__(self, code: str, value) -> None:
+        bit = _code_bits.get(code)
+        if bit and value is True:
+            self._discard_overflow(code)
+            setattr(self._node, self._bits, getattr(self._node, self._bits) | bit)
+            return
+        if bit:
+            setattr(self._node, self._bits, getattr(self._node, self._bits) & ~bit)
+        if getattr(self._node, self._overflow) is None:
+            setattr(self._node, self._overflow, {})
+        getattr(self._node, self._overflow)[code] = value
+
+    def __delitem__(self, code: str) -> None:
+        if code not in self:
+            raise KeyError(code)
+        bit = _code_bits.get(code, 0)
+        setattr(self._node, self._bits, getattr(self._node, self._bits) & ~bit)
+        self._discard_overflow(code)
+
+    def __iter__(self) -> Iterator[str]:
+        bits = getattr(self._node, self._bits)
+        if bits:
+            yield from (name for name, bit in _code_bits.items() if bits & bit)
+        yield from (getattr(self._node, self._overflow) or ())
+
+    def __len__(self) -> int:
+        return bin(getattr(self._node, self._bits)).count('1') + len(getattr(self._node, self._overflow) or ())
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    def copy(self) -> dict:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        """dataclasses.asdict() (and so json serialization) sees a plain dict"""
+        return dict(self)
+
+    def _discard_overflow(self, code: str) -> None:
+        overflow = getattr(self._node, self._overflow)
+        if overflow and code in overflow:
+            del overflow[code]
+            if not overflow:
+                setattr(self._node, self._overflow, None)
+
+
+def _slotted(cls):
+    """
+    Recreate a dataclass with __slots__ (as @dataclass(slots=True) does from python 3.10), so that instances have no
+    per-instance __dict__.  The `errors` and `warnings` fields are stored as bits (see Codes) behind properties.
+    """
+    coded = ('errors', 'warnings')
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = {k: v for k, v in cls.__dict__.items() if k not in field_names and k not in ('__dict__', '__weakref__')}
+    cls_dict['__slots__'] = tuple(name for name in field_names if name not in coded) \
+        + tuple(f"_{name}{suffix}" for name in coded for suffix in ('', '_overflow')) \
+        + cls.__extra_slots__
+    for name in coded:
+        cls_dict[name] = _codes_property(name)
+
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+def _codes_property(name: str) -> property:
+    bits, overflow = f"_{name}", f"_{name}_overflow"
+
+    def get_codes(node: 'Node') -> Codes:
+        return Codes(node, bits, overflow)
+
+    def set_codes(node: 'Node', value) -> None:
+        """Accepts anything dict-like, or a list of codes"""
+        items = list(value.items() if hasattr(value, 'items') else ((code, True) for code in value))
+        setattr(node, bits, 0)
+        setattr(node, overflow, None)
+        codes = Codes(node, bits, overflow)
+        for code, code_value in items:
+            codes[code] = code_value
+
+    return property(get_codes, set_codes)
+
+
 @dataclass(frozen=True)
 class NodeTransport:
     """Data Transport object for Node.  Forms a binding contract between providers and crawl().
@@ -27,6 +156,7 @@ class NodeTransport:
     metadata: Optional[dict] = field(default_factory=dict)
 
 
+@_slotted
 @dataclass
 class Node:
     crawl_strategy: charlotte.CrawlStrategy
@@ -40,8 +170,19 @@ class Node:
     children: Dict[str, 'Node'] = None
     warnings: dict = field(default_factory=dict)
     errors: dict = field(default_factory=dict)
-    metadata: dict = field(default_factory=dict)
+    metadata: dict = None  # None rather than an empty dict per node, as most nodes have no metadata
+    instances_reporting: int = None  # with --instances-per-service: how many sampled instances of the parent saw us
+    instances_sampled: int = None  # ... out of how many sampled instances of the parent
     __type__: str = 'Node'  # for json serialization/deserialization
+    __extra_slots__ = ('_name_lookup_signalled', '_crawl_signalled', '_name_lookup_event', '_crawl_event')
+
+    def __post_init__(self):
+        # completion signals set by crawl.py, awaited by live renderers.  these are deliberately not dataclass fields
+        # so that they are left out of asdict()/json serialization
+        self._name_lookup_signalled = False
+        self._crawl_signalled = False
+        self._name_lookup_event: Optional[asyncio.Event] = None
+        self._crawl_event: Optional[asyncio.Event] = None
 
     def is_database(self):
         return self.protocol_mux in database_muxes or self.protocol.is_database
@@ -74,6 +215,9 @@ class Node:
         return False
 
     def crawl_complete(self, depth: int) -> bool:
+        if self._crawl_signalled:
+            return True
+
         if not self.is_crawlable(depth):
             return True
 
@@ -91,4 +235,34 @@ class Node:
 
         :return:
         """
-        return bool(self.service_name) or bool(self.errors)
+        return self._name_lookup_signalled or bool(self.service_name) or bool(self.errors)
+
+    def signal_name_lookup_complete(self) -> None:
+        """Announce that crawling has assigned either a service_name or a name lookup error to this Node()"""
+        self._name_lookup_signalled = True
+        if self._name_lookup_event:
+            self._name_lookup_event.set()
+
+    def signal_crawl_complete(self) -> None:
+        """Announce that crawling is finished with this Node(), i.e. children will not be assigned or changed"""
+        self._name_lookup_signalled = True
+        self._crawl_signalled = True
+        for event in (self._name_lookup_event, self._crawl_event):
+            if event:
+                event.set()
+
+    async def wait_for_name_lookup(self) -> None:
+        """Wait (without polling) until name_lookup_complete()"""
+        if self.name_lookup_complete():
+            return
+        if not self._name_lookup_event:
+            self._name_lookup_event = asyncio.Event()
+        await self._name_lookup_event.wait()
+
+    async def wait_for_crawl(self, depth: int) -> None:
+        """Wait (without polling) until crawl_complete()"""
+        if self.crawl_complete(depth):
+            return
+        if not self._crawl_event:
+            self._crawl_event = asyncio.Event()
+        await self._crawl_event.wait()
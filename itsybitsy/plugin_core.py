@@ -80,10 +80,14 @@ class PluginFamilyRegistry:
             plugin.register_cli_args(plugin_argparser)
 
     def register_plugins(self, disabled_classes: Optional[List[str]] = None):
-        for plugin in [c for c in self._cls.__subclasses__() if c not in (disabled_classes or [])]:
-            if plugin.ref() in self._plugin_registry:
-                raise PluginClobberException(f"Provider {plugin.ref()} already registered!")
-            self._plugin_registry[plugin.ref()] = plugin()
+        for plugin in [c for c in self._cls.__subclasses__() if c.ref() not in (disabled_classes or [])]:
+            self.register_plugin(plugin())
+
+    def register_plugin(self, plugin: PluginInterface):
+        """Register an instance of a plugin, e.g. one which is not to be instantiated by register_plugins()"""
+        if plugin.ref() in self._plugin_registry:
+            raise PluginClobberException(f"Provider {plugin.ref()} already registered!")
+        self._plugin_registry[plugin.ref()] = plugin
 
     def get_plugin(self, ref: str) -> PluginInterface:
         try:
@@ -13,16 +13,18 @@ import re
 import sys
 from botocore.exceptions import ClientError
 from termcolor import colored
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from itsybitsy import constants, logs
 from itsybitsy.node import NodeTransport
 from itsybitsy.charlotte_web import Hint
-from itsybitsy.providers import ProviderInterface
+from itsybitsy.provider_cache import cached
+from itsybitsy.providers import ProviderInterface, blocking
 from itsybitsy.plugin_core import PluginArgParser
 
 tag_name_pos = 0
 tag_value_pos = 1
+max_filter_values = 200  # per filter, in an ec2 api call
 
 
 class ProviderAWS(ProviderInterface):
@@ -47,36 +49,67 @@ class ProviderAWS(ProviderInterface):
                                help='Additional AWS tags to filter on or services.  Specified in format: '
                                     '"TAG_NAME=VALUE" pairs')
 
+    @cached(ttl=3600, negative_ttl=600, key=lambda address, _: address)
     async def lookup_name(self, address: str, _: None) -> Optional[str]:
         logs.logger.debug(f"Performing AWS name lookup for {address}")
+        interfaces = await self._describe_network_interfaces([address])
+
+        # parse name from response
+        return _parse_name(interfaces[0]) if interfaces else None
+
+    async def lookup_names(self, requests: List[Tuple[str, None]]) -> List[Optional[str]]:
+        addresses = [address for address, _ in requests if not self.lookup_name.in_cache(address, None)]
+        logs.logger.debug(f"Performing AWS name lookup for {len(addresses)} addresses")
+        interfaces_by_address = {}
+        for i in range(0, len(addresses), max_filter_values):
+            for interface in await self._describe_network_interfaces(addresses[i:i + max_filter_values]):
+                for private_ip in interface.get('PrivateIpAddresses', []):
+                    interfaces_by_address.setdefault(private_ip.get('PrivateIpAddress'), interface)
+        names = {address: _parse_name(interfaces_by_address[address]) if address in interfaces_by_address else None
+                 for address in addresses}
+        for address, name in names.items():
+            self.lookup_name.prime(name, address, None)
+
+        return [names[address] if address in names else await self.lookup_name(address, None)
+                for address, _ in requests]
+
+    @blocking
+    def _describe_network_interfaces(self, addresses: List[str]) -> List[dict]:
         try:
             response = self.ec2_client.describe_network_interfaces(
                 Filters=[{
                     'Name': 'addresses.private-ip-address',
-                    'Values': [address]
+                    'Values': addresses
                 }]
             )
         except ClientError as e:
             _die(e)
 
-        # parse name from response
-        name = None
-        try:
-            description = response['NetworkInterfaces'][0]['Description']
-            if description.startswith('ElastiCache'):
-                name = description.replace(' ', '-').lower()
-                name = re.sub(r'[0-9\-]{2,}', '', name)
-            elif description.startswith('RDSNetworkInterface'):
-                name = f"{description}_{response['NetworkInterfaces'][0]['RequesterId']}"
-        except (KeyError, IndexError):
-            pass
+        return response.get('NetworkInterfaces', [])
 
-        return name
+    async def inventory(self) -> List[NodeTransport]:
+        logs.logger.debug(f"Performing AWS inventory of instances tagged: {constants.ARGS.aws_service_name_tag}")
+        instances = []
+        for instance in await self._describe_all_instances(self._parse_filters(None)):
+            tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
+            instances.append(NodeTransport('seed', instance.get('PrivateIpAddress'),
+                                           tags.get(constants.ARGS.aws_service_name_tag)))
+
+        return instances
 
     async def take_a_hint(self, hint: Hint) -> List[NodeTransport]:
         instance_address = await self._resolve_instance(hint.service_name)
         return [NodeTransport(hint.protocol_mux, instance_address, hint.service_name)]
 
+    async def lookup_instances(self, service_name: str, address: str, count: int) -> List[str]:
+        logs.logger.debug(f"Performing AWS instances lookup for {service_name}")
+        filters = self._parse_filters(service_name)
+        response = await self._describe_instances(filters, count + 1)  # +1 in case `address` is amongst them
+        addresses = [instance['PrivateIpAddress'] for reservation in response.get('Reservations', [])
+                     for instance in reservation.get('Instances', []) if instance.get('PrivateIpAddress')]
+
+        return ([address] + [a for a in addresses if a != address])[:count]
+
     async def _resolve_instance(self, service_name: str) -> str:
         """
         Look up the instance address of this service in aws.  It takes the first ec2 instance which has the service name
@@ -86,16 +119,8 @@ class ProviderAWS(ProviderInterface):
         :return: an IP address associated with the ec2 instance discovered
         """
         logs.logger.debug(f"Performing reverse AWS name lookup for {service_name}")
-        try:
-            ec2 = boto3.client('ec2')
-            filters = self._parse_filters(service_name)
-            response = ec2.describe_instances(
-                Filters=filters,
-                MaxResults=5
-
-            )
-        except ClientError as e:
-            _die(e)
+        filters = self._parse_filters(service_name)
+        response = await self._describe_instances(filters, 5)
 
         # parse name from response
         try:
@@ -109,11 +134,31 @@ class ProviderAWS(ProviderInterface):
 
         return ip
 
-    def _parse_filters(self, service_name: str) -> List[dict]:
+    @cached(ttl=300)
+    @blocking
+    def _describe_instances(self, filters: List[dict], max_results: int) -> dict:
+        try:
+            return self.ec2_client.describe_instances(  # unlike sessions, clients are thread safe
+                Filters=filters,
+                MaxResults=max(5, max_results)  # the minimum allowed by the ec2 api
+            )
+        except ClientError as e:
+            _die(e)
+
+    @blocking
+    def _describe_all_instances(self, filters: List[dict]) -> List[dict]:
+        try:
+            paginator = self.ec2_client.get_paginator('describe_instances')
+            return [instance for page in paginator.paginate(Filters=filters)
+                    for reservation in page['Reservations'] for instance in reservation['Instances']]
+        except ClientError as e:
+            _die(e)
+
+    def _parse_filters(self, service_name: Optional[str]) -> List[dict]:
         """
         Generate AWS filters for the instance from service name and CLI args
 
-        :param service_name: the service name to filter on
+        :param service_name: the service name to filter on, None for instances of any service
         :return:
         """
         filters = [{
@@ -122,6 +167,9 @@ class ProviderAWS(ProviderInterface):
         }, {
             'Name': f"tag:{constants.ARGS.aws_service_name_tag}",
             'Values': [service_name]
+        } if service_name else {
+            'Name': 'tag-key',
+            'Values': [constants.ARGS.aws_service_name_tag]
         }]
         for tag, value in self.tag_filters.items():
             filters.append({
@@ -131,6 +179,22 @@ class ProviderAWS(ProviderInterface):
         return filters
 
 
+def _parse_name(interface: dict) -> Optional[str]:
+    """Parse the service name from a network interface of an ElastiCache or RDS instance"""
+    name = None
+    try:
+        description = interface['Description']
+        if description.startswith('ElastiCache'):
+            name = description.replace(' ', '-').lower()
+            name = re.sub(r'[0-9\-]{2,}', '', name)
+        elif description.startswith('RDSNetworkInterface'):
+            name = f"{description}_{interface['RequesterId']}"
+    except KeyError:
+        pass
+
+    return name
+
+
 def _die(e):
     print(colored('AWS boto3 Authentication Failed!  Please check your aws credentials, have you set AWS_PROFILE?',
                   'red'))
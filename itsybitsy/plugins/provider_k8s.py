@@ -8,25 +8,27 @@ Assumptions
     - Services in kubernetes cluster can be identified by name with a user configured kubernetes label
 """
 
+import asyncio
 import sys
+import threading
 from kubernetes import client, config
 from kubernetes.stream import stream
 from termcolor import colored
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from itsybitsy import constants
 from itsybitsy.charlotte_web import Hint
 from itsybitsy.node import NodeTransport
-from itsybitsy.providers import ProviderInterface, parse_crawl_strategy_response
+from itsybitsy.provider_cache import cached
+from itsybitsy.providers import ProviderInterface, blocking, parse_crawl_strategy_response
 from itsybitsy.plugin_core import PluginArgParser
 
-pod_cache: Dict[str, client.models.V1Pod] = {}
-
 
 class ProviderKubernetes(ProviderInterface):
     def __init__(self):
         config.load_kube_config()
         self.api = client.CoreV1Api()
+        self._exec_apis = threading.local()  # stream() patches the api client it is passed, so one per thread
 
     @staticmethod
     def ref() -> str:
@@ -47,31 +49,37 @@ class ProviderKubernetes(ProviderInterface):
         return True
 
     async def lookup_name(self, address: str, _: Optional[type]) -> Optional[str]:
-        pod = self._get_pod(address)
-        service_name_label = 'app'
-        if service_name_label in pod.metadata.labels:
-            return pod.metadata.labels[service_name_label]
+        return _parse_name(await self._get_pod(address))
+
+    async def prefetch(self, seeds: List[str], hints: List[Hint]) -> None:
+        if not seeds and not hints:
+            return  # listing every pod only pays off if the crawl starts in k8s
+        await asyncio.wait_for(self._cache_pods(), constants.ARGS.timeout)
+
+    async def lookup_names(self, requests: List[Tuple[str, Optional[type]]]) -> List[Optional[str]]:
+        pods = {}
+        if not all(self._get_pod.in_cache(address) for address, _ in requests):
+            pods = await self._cache_pods()
 
-        return None
+        async def lookup_name(address: str) -> Optional[str]:
+            return _parse_name(pods[address]) if address in pods else await self.lookup_name(address, None)
+        return await asyncio.gather(*[lookup_name(address) for address, _ in requests], return_exceptions=True)
 
     async def crawl_downstream(self, address: str, _: Optional[type], **kwargs) -> List[NodeTransport]:
         shell_command = kwargs['shell_command']
         exec_command = ['sh', '-c', shell_command]
-        containers = self._get_pod(address).spec.containers
+        containers = (await self._get_pod(address)).spec.containers
         containers = [c for c in containers if True not in
                       [skip in c.name for skip in constants.ARGS.k8s_skip_containers]]
 
         node_transports = []
         for container in containers:
-            ret = stream(self.api.connect_get_namespaced_pod_exec, address, constants.ARGS.k8s_namespace,
-                         container=container.name, command=exec_command
-                         , stderr=True, stdin=False, stdout=True, tty=False)
+            ret = await self._exec(address, container.name, exec_command)
             node_transports.extend(parse_crawl_strategy_response(ret, address, shell_command))
         return node_transports
 
     async def take_a_hint(self, hint: Hint) -> List[NodeTransport]:
-        ret = self.api.list_namespaced_pod(constants.ARGS.k8s_namespace, limit=1,
-                                           label_selector=_parse_label_selector(hint.service_name))
+        ret = await self._list_pods(limit=1, label_selector=_parse_label_selector(hint.service_name))
         try:
             address = ret.items[0].metadata.name
         except IndexError:
@@ -82,6 +90,21 @@ class ProviderKubernetes(ProviderInterface):
 
         return [NodeTransport(hint.protocol_mux, address, hint.service_name)]
 
+    async def inventory(self) -> List[NodeTransport]:
+        service_name_label = constants.ARGS.k8s_service_name_label or 'app'
+        label_selector = ','.join([service_name_label] + (constants.ARGS.k8s_label_selectors or []))
+        ret = await self._list_pods(label_selector=label_selector)
+        return [NodeTransport('seed', pod.metadata.name, pod.metadata.labels[service_name_label])
+                for pod in ret.items if 'Running' == pod.status.phase]
+
+    async def lookup_instances(self, service_name: str, address: str, count: int) -> List[str]:
+        ret = await self._list_pods(limit=count + 1, label_selector=_parse_label_selector(service_name))
+        pod_names = [pod.metadata.name for pod in ret.items]
+
+        return ([address] + [name for name in pod_names if name != address])[:count]
+
+    @cached(ttl=600)
+    @blocking
     def _get_pod(self, pod_name: str) -> client.models.V1Pod:
         """
         Get the pod from kubernetes API, with caching
@@ -89,13 +112,32 @@ class ProviderKubernetes(ProviderInterface):
         :param pod_name:
         :return:
         """
-        if pod_name in pod_cache:
-            pod = pod_cache[pod_name]
-        else:
-            pod = self.api.read_namespaced_pod(pod_name, constants.ARGS.k8s_namespace)
-            pod_cache[pod_name] = pod
+        return self.api.read_namespaced_pod(pod_name, constants.ARGS.k8s_namespace)
+
+    async def _cache_pods(self) -> Dict[str, client.models.V1Pod]:
+        pods = {pod.metadata.name: pod for pod in (await self._list_pods()).items}  # one call for all the pods
+        for pod_name, pod in pods.items():
+            self._get_pod.prime(pod, pod_name)
+        return pods
+
+    @blocking
+    def _list_pods(self, **kwargs) -> client.models.V1PodList:
+        return self.api.list_namespaced_pod(constants.ARGS.k8s_namespace, **kwargs)
+
+    @blocking
+    def _exec(self, pod_name: str, container_name: str, command: List[str]) -> str:
+        if not hasattr(self._exec_apis, 'api'):
+            self._exec_apis.api = client.CoreV1Api(api_client=client.ApiClient())
+        return stream(self._exec_apis.api.connect_get_namespaced_pod_exec, pod_name, constants.ARGS.k8s_namespace,
+                      container=container_name, command=command, stderr=True, stdin=False, stdout=True, tty=False)
+
+
+def _parse_name(pod: client.models.V1Pod) -> Optional[str]:
+    service_name_label = 'app'
+    if service_name_label in pod.metadata.labels:
+        return pod.metadata.labels[service_name_label]
 
-        return pod
+    return None
 
 
 def _parse_label_selector(service_name: str) -> str:
@@ -0,0 +1,87 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Assumptions:
+    - The crawl strategies of this provider are to be run on the host where itsybitsy runs, e.g. itsybitsy runs in
+      a container or sidecar of the service being crawled.  The commands are passed the address of the node in the
+      environment variable ITSYBITSY_ADDRESS, e.g. to name each node by its address or to look its name up.
+"""
+import asyncio
+import os
+import signal
+from typing import List, Optional
+
+from itsybitsy import constants, logs
+from itsybitsy.node import NodeTransport
+from itsybitsy.providers import ProviderInterface, parse_crawl_strategy_response
+from itsybitsy.plugin_core import PluginArgParser
+
+ADDRESS_ENV_VAR = 'ITSYBITSY_ADDRESS'
+command_semaphore: Optional[asyncio.BoundedSemaphore] = None
+
+
+class LocalCommandException(Exception):
+    """A command run on the local host failed"""
+
+
+class ProviderLocal(ProviderInterface):
+    @staticmethod
+    def ref() -> str:
+        return 'local'
+
+    @staticmethod
+    def register_cli_args(argparser: PluginArgParser):
+        argparser.add_argument('--concurrency', type=int, default=10, metavar='CONCURRENCY',
+                               help='Max number of concurrent commands run on the local host')
+        argparser.add_argument('--name-command', default=f'echo "${ADDRESS_ENV_VAR}"', metavar='COMMAND',
+                               help='Used by Local Provider to determine node name.  The address of the node is '
+                                    f'passed in the environment variable {ADDRESS_ENV_VAR}, e.g. "hostname" names '
+                                    'every node after this host, the default names each node by its address')
+
+    async def lookup_name(self, address: str, _: None) -> str:
+        logs.logger.debug(f"Getting service name for address {address}")
+        node_name = await _run(constants.ARGS.local_name_command, address, check=True)
+        logs.logger.debug(f"Discovered name: {node_name} for address {address}")
+
+        return node_name
+
+    async def crawl_downstream(self, address: str, _: None, **kwargs) -> List[NodeTransport]:
+        command = kwargs['shell_command']
+        stdout = await _run(command, address, check=False)
+        if stdout.startswith('ERROR:'):
+            raise LocalCommandException('CRAWL ERROR: ' + stdout.replace("\n", "\t"))
+        return parse_crawl_strategy_response(stdout, address, command)
+
+
+async def _run(command: str, address: str, check: bool) -> str:
+    """
+    Run a shell command in a subprocess, at most --local-concurrency at a time
+
+    :param command:
+    :param address: of the node, passed to the command in the environment variable ITSYBITSY_ADDRESS
+    :param check: raise LocalCommandException if the command exits non zero
+    :return: stdout of the command, stripped
+    """
+    global command_semaphore
+    if not command_semaphore:  # created lazily, within the event loop of the crawl
+        command_semaphore = asyncio.BoundedSemaphore(constants.ARGS.local_concurrency)
+    async with command_semaphore:
+        process = await asyncio.create_subprocess_shell(command, stdout=asyncio.subprocess.PIPE,
+                                                        stderr=asyncio.subprocess.PIPE,
+                                                        env={**os.environ, ADDRESS_ENV_VAR: address or ''},
+                                                        start_new_session=True)  # its own process group
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:  # e.g. timed out, do not leave the command, nor what it started, running
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+            raise
+    if check and process.returncode:
+        raise LocalCommandException(f"Command exited {process.returncode}: \"{command[:100]}\", "
+                                    f"stderr: {stderr.decode().strip()}")
+
+    return stdout.decode().strip()
@@ -15,9 +15,10 @@ import sys
 
 from asyncssh import ChannelOpenError, SSHClientConnection
 from termcolor import colored
-from typing import List, Optional
+from typing import List, Optional, Tuple, Type
 
 from itsybitsy import constants, logs
+from itsybitsy.charlotte_web import Hint
 from itsybitsy.providers import ProviderInterface, TimeoutException, parse_crawl_strategy_response
 from itsybitsy.plugin_core import PluginArgParser
 from itsybitsy.node import NodeTransport
@@ -49,13 +50,26 @@ class ProviderSSH(ProviderInterface):
         argparser.add_argument('--name-command', required=True, metavar='COMMAND',
                                help='Used by SSH Provider to determine node name')
 
+    @staticmethod
+    def retryable_exceptions() -> Tuple[Type[Exception], ...]:
+        return ChannelOpenError, asyncssh.DisconnectError
+
+    async def prefetch(self, seeds: List[str], hints: List[Hint]) -> None:
+        if seeds and not bastion:
+            await _configure(seeds[0])
+
     async def open_connection(self, address: str) -> SSHClientConnection:
-        if not bastion:
+        if not bastion:  # not prefetched, e.g. there are no ssh seeds
             await _configure(address)
         logs.logger.debug(f"Getting asyncio SSH connection for host {address}")
         async with connection_semaphore:
             return await _get_connection(address)
 
+    async def close_connection(self, connection: SSHClientConnection) -> None:
+        logs.logger.debug(f"Closing asyncio SSH connection {connection}")
+        connection.close()
+        await connection.wait_closed()
+
     async def lookup_name(self, address: str, connection: SSHClientConnection) -> str:
         logs.logger.debug(f"Getting service name for address {address}")
         node_name_command = constants.ARGS.ssh_name_command
@@ -55,8 +55,8 @@ async def render_tree(nodes: Dict[str, Node], parents: List[Ancestor], out=sys.s
     being mutated elsewhere in the execution of this program.  This is how we achieve
     asynchronous crawling, yet synchronous rendering!
 
-    It waits for 'children' to be added to the node before rendering, indicating
-    that requisite stages of the crawling process are complete
+    It waits for crawl.py to signal that the requisite stages of the crawling process are complete for a node
+    (see Node.wait_for_name_lookup() and Node.wait_for_crawl()) before rendering it
 
     :param nodes: - the tree (or subset thereof) of Node() objects to render
     :param parents: - list of ancestors for the tree - used for rendering depth/context
@@ -68,9 +68,9 @@ async def render_tree(nodes: Dict[str, Node], parents: List[Ancestor], out=sys.s
     nodes_merged = _merge_nodes_by_service_name(renderers.merge_hints(nodes))
 
     depth = len(parents)
-    nodes_to_render = nodes_merged.copy()
+    nodes_to_render = dict(sorted(nodes_merged.items()))  # sorted once, insertion order is preserved as we pop
     while len(nodes_to_render) > 0:
-        for node_ref in list(sorted(nodes_to_render)):  # list b/c we cannot mutate a dict as we loop
+        for node_ref in list(nodes_to_render):  # list b/c we cannot mutate a dict as we loop
             node = nodes_merged[node_ref]
             if node.warnings.get('DEFUNCT') and constants.ARGS.hide_defunct:
                 nodes_to_render.pop(node_ref)
@@ -100,15 +100,28 @@ async def render_tree(nodes: Dict[str, Node], parents: List[Ancestor], out=sys.s
                 if len(childrens_ancestors) <= constants.ARGS.max_depth and node.children:
                     await render_tree(node.children, childrens_ancestors, out, print_slowly_for_humans)
 
-        # this sleep prevents CPU hoarding
-        if (len(nodes_to_render)) > 0:
-            await asyncio.sleep(.1)
+        if len(nodes_to_render) > 0:
+            if constants.ARGS.debug:
+                logs.logger.debug(f"Waiting for crawl to complete for {str(len(nodes_to_render))} "
+                                  f"nodes at depth {str(len(parents))}...")
+                logs.logger.debug(nodes_to_render)
+            await _wait_for_any_crawl_complete(list(nodes_to_render.values()), depth)
 
-        if constants.ARGS.debug:
-            logs.logger.debug(f"Waiting for crawl to complete for {str(len(nodes_to_render))} "
-                              f"nodes at depth {str(len(parents))}...")
-            logs.logger.debug(nodes_to_render)
-            await asyncio.sleep(5)
+
+async def _wait_for_any_crawl_complete(nodes: List[Node], depth: int) -> None:
+    """
+    Wait for crawl.py to signal that crawling is complete for at least one of the nodes
+
+    :param nodes:
+    :param depth:
+    :return: None
+    """
+    waiters = [asyncio.ensure_future(node.wait_for_crawl(depth)) for node in nodes]
+    try:
+        await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
 
 
 def _get_sleep_for_humans_seconds() -> float:
@@ -172,6 +185,10 @@ def _render_node(node: Node, depth: int, prefix: str, is_last_sibling: bool, out
     # hint display
     info = colored('{INFO:FROM_HINT} ', 'cyan') if node.from_hint else ''
 
+    # partial instances display (--instances-per-service), i.e. not all instances of the parent talk to the node
+    if node.instances_sampled and node.instances_reporting < node.instances_sampled:
+        info += colored(f"{{INFO:INSTANCES:{node.instances_reporting}/{node.instances_sampled}}} ", 'cyan')
+
     # concise warning display
     concise_warnings = ''
     if not constants.ARGS.render_ascii_verbose and node.warnings:
@@ -206,8 +223,11 @@ def _render_node_errs_warns(node: Node, error_prefix: str, out):
     """
     # errors/warnings
     error_messages = {
+        'CONNECT_FAILED': f"failed to connect to service:'{node.service_name}' at address: '{node.address}'",
         'CONNECT_SKIPPED': f"service detected on {node.protocol.ref}:{node.protocol_mux}, however name discovery"
                            f"and crawling skipped by configuration!",
+        'CRAWL_FAILED': f"failed to crawl service '{node.service_name}' for children, they may be missing!",
+        'NAME_LOOKUP_FAILED': f"name lookup failed for service at address: '{node.address}'",
         'NULL_ADDRESS': f"service '{node.service_name}' detected but an instance address is not available to crawl!",
         'TIMEOUT': f"SSH timeout connecting to service:'{node.service_name}' at address: '{node.address}'",
         'AWS_LOOKUP_FAILED': f"AWS name lookup failed for :'{_synthesize_node_ref(node, 'UNKNOWN')}'"
@@ -216,7 +236,10 @@ def _render_node_errs_warns(node: Node, error_prefix: str, out):
     warning_messages = {
         'CRAWL_SKIPPED': f"service '{node.service_name}' discovered but crawling skipped by configuration",
         'CYCLE': f"service '{node.service_name}' discovered as a parent of itself!",
-        'DEFUNCT': f"service '{node.service_name}' configuration present on parent, but it not in use!"
+        'DEADLINE': f"service '{node.service_name}' crawling interrupted, by --deadline or ctrl-c",
+        'DEFUNCT': f"service '{node.service_name}' configuration present on parent, but it not in use!",
+        'FAN_OUT': f"{node.metadata.get('fan_out_count')} further children folded by --fan-out-limit, addresses "
+                   f"include: {node.metadata.get('fan_out_addresses')}.  Expand with --expand-fan-out"
     }
 
     # warnings verbose display
@@ -240,25 +263,13 @@ async def _wait_for_service_names(nodes: Dict[str, Node], depth: int) -> None:
     :param depth:
     :return: None
     """
-    for _ in range(100):
-        for node in nodes.values():
-            if not node.name_lookup_complete():
-                await asyncio.sleep(1)
-                break
-        else:
-            break
-
-        if constants.ARGS.debug:
-            remaining = _remaining_nodes_for_debugging(nodes)
+    if constants.ARGS.debug:
+        remaining = _remaining_nodes_for_debugging(nodes)
+        if remaining:
             logs.logger.debug(f"Waiting for remaining {str(len(remaining))} service names before rendering ascii "
                               f"at depth {str(depth)}...")
             logs.logger.debug(remaining)
-            await asyncio.sleep(5)
-    else:
-        remaining = _remaining_nodes_for_debugging(nodes)
-        print(colored(f"Infinite wait interrupted waiting for {len(remaining)} services names for: ", 'red'))
-        print(colored(constants.PP.pformat(remaining), 'yellow'))
-        sys.exit(1)
+    await asyncio.gather(*[node.wait_for_name_lookup() for node in nodes.values()])
 
 
 def _remaining_nodes_for_debugging(nodes: Dict[str, Node]) -> dict:
@@ -45,6 +45,26 @@ def _deserialize_object(dct: dict):
     raise Exception(f"Unrecognized __type__: ({dct_type}) encountered during json deserialization")
 
 
+def dumps(obj) -> str:
+    """
+    serialize `obj` to json, where `obj` may contain Node() objects (e.g. a tree or a dict of children)
+
+    :param obj:
+    :return:
+    """
+    return json.dumps(obj, cls=_EnhancedJSONEncoder)
+
+
+def loads(serialized: str):
+    """
+    deserialize json created by dumps()
+
+    :param serialized:
+    :return:
+    """
+    return json.loads(serialized, object_hook=_deserialize_object)
+
+
 def load(file):
     """
     load json rendering of tree from `file`, parse requisite outputs
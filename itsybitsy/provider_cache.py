@@ -0,0 +1,238 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Caching of provider call results, which providers opt into per method with the @cached decorator.  Results are held in
+an LRU cache in memory, per provider method, and with --provider-cache disk also persisted across runs.  Entries expire
+by TTL, empty results (e.g. a name which was not found) have their own TTL (negative caching), and concurrent calls for
+the same key share one call of the provider.  Hits and misses are counted per provider method.
+"""
+import asyncio
+import base64
+import functools
+import json
+import pickle
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Sized
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import constants, logs
+from .cache import DiskStore
+
+MODE_OFF = 'off'
+MODE_MEMORY = 'memory'
+MODE_DISK = 'disk'
+MODES = [MODE_OFF, MODE_MEMORY, MODE_DISK]
+
+_stores: Dict[str, 'MemoryStore'] = {}  # {provider_ref.method: store}
+_stats: Dict[str, Counter] = {}  # {provider_ref.method: Counter(hit=, miss=)}
+_in_flight: Dict[Tuple[str, str], asyncio.Future] = {}  # {(provider_ref.method, key): Future[result]}
+_disk: Optional[DiskStore] = None
+
+
+class MemoryStore:
+    """LRU cache of results with per entry expiry, bounded by number of entries"""
+    def __init__(self, max_entries: int):
+        """
+        :param max_entries: 0 for unbounded
+        """
+        self._max_entries = max_entries
+        self._entries: Dict[str, Tuple[Any, float]] = OrderedDict()  # {key: (result, expires_at)}
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """:return: (hit, result)"""
+        if key not in self._entries:
+            return False, None
+        result, expires_at = self._entries[key]
+        if expires_at < time.time():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, result
+
+    def put(self, key: str, result: Any, ttl: float) -> None:
+        self._entries[key] = (result, time.time() + ttl)
+        self._entries.move_to_end(key)
+        while self._max_entries and len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How the results of a @cached method are cached, see cached()"""
+    ttl: float
+    negative_ttl: float
+    max_entries: int
+    key: Callable[..., str]
+
+
+class CachedMethod:
+    """A provider method wrapped by @cached"""
+    def __init__(self, fn: Callable, policy: CachePolicy):
+        functools.update_wrapper(self, fn)
+        self._fn = fn
+        self._policy = policy
+
+    def __get__(self, provider, owner=None):
+        return self if provider is None else _BoundCachedMethod(self, provider)
+
+    async def __call__(self, provider, *args, **kwargs) -> Any:
+        if MODE_OFF == constants.ARGS.provider_cache:
+            return await self._fn(provider, *args, **kwargs)
+        name = self._name(provider)
+        key = self._policy.key(*args, **kwargs)
+        hit, result = self._get(name, key)
+        if hit:
+            _stats[name]['hit'] += 1
+            return result
+        if (name, key) in _in_flight:  # the same call by another node
+            _stats[name]['hit'] += 1
+            return await asyncio.shield(_in_flight[(name, key)])
+
+        _stats[name]['miss'] += 1
+        future = asyncio.get_event_loop().create_future()
+        _in_flight[(name, key)] = future
+        try:
+            result = await self._fn(provider, *args, **kwargs)
+            self.prime(provider, result, *args, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # failures are not cached, nor necessarily awaited by anyone else
+            raise
+        finally:
+            del _in_flight[(name, key)]
+
+    def prime(self, provider, result: Any, *args, **kwargs) -> None:
+        """Cache the result for the call with `args`, e.g. when it was obtained as part of a bulk call"""
+        if MODE_OFF == constants.ARGS.provider_cache:
+            return
+        name = self._name(provider)
+        key = self._policy.key(*args, **kwargs)
+        ttl = self._result_ttl(name, result)
+        _store(name, self._policy.max_entries).put(key, result, ttl)
+        if MODE_DISK == constants.ARGS.provider_cache:
+            _disk_store().put(f"{name}:{key}", base64.b64encode(pickle.dumps(result)).decode(), ttl)
+
+    def in_cache(self, provider, *args, **kwargs) -> bool:
+        """Whether the result for the call with `args` is cached, e.g. to skip a bulk call"""
+        if MODE_OFF == constants.ARGS.provider_cache:
+            return False
+        return self._get(self._name(provider), self._policy.key(*args, **kwargs))[0]
+
+    def _name(self, provider) -> str:
+        name = f"{provider.ref()}.{self.__name__}"
+        if name not in _stats:
+            _stats[name] = Counter(hit=0, miss=0)
+        return name
+
+    def _get(self, name: str, key: str) -> Tuple[bool, Any]:
+        hit, result = _store(name, self._policy.max_entries).get(key)
+        if hit or MODE_DISK != constants.ARGS.provider_cache:
+            return hit, result
+        value = _disk_store().get(f"{name}:{key}")
+        if value is None:
+            return False, None
+        result = pickle.loads(base64.b64decode(value))
+        _store(name, self._policy.max_entries).put(key, result, self._result_ttl(name, result))
+        return True, result
+
+    def _result_ttl(self, name: str, result: Any) -> float:
+        return self._policy.negative_ttl if _is_negative(result) else _ttl(name, self._policy.ttl)
+
+
+class _BoundCachedMethod:
+    def __init__(self, method: CachedMethod, provider):
+        self._method = method
+        self._provider = provider
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        return await self._method(self._provider, *args, **kwargs)
+
+    def prime(self, result: Any, *args, **kwargs) -> None:
+        self._method.prime(self._provider, result, *args, **kwargs)
+
+    def in_cache(self, *args, **kwargs) -> bool:
+        return self._method.in_cache(self._provider, *args, **kwargs)
+
+
+def cached(ttl: float = 300, negative_ttl: Optional[float] = None, max_entries: int = 10000,
+           key: Optional[Callable[..., str]] = None):
+    """
+    Decorator for provider coroutine methods whose results are worth caching, for example lookups in a provider's
+    inventory.  Stack it above @blocking for blocking methods.  Results are cached per provider and arguments, failed
+    calls (exceptions) are not cached.
+
+        @cached(ttl=600, key=lambda address, _: address)
+        async def lookup_name(self, address, connection):
+            ...
+
+        self.lookup_name.prime('foo', '10.0.0.1', None)  # e.g. from a bulk lookup
+        self.lookup_name.in_cache('10.0.0.1', None)
+
+    :param ttl: seconds to cache a result for, overridable per method with --provider-cache-ttls
+    :param negative_ttl: seconds to cache an empty result (None, [] etc.) for, defaults to `ttl`
+    :param max_entries: max number of results held in memory for the method (0 for unbounded)
+    :param key: computes the cache key from the arguments of the call, defaults to the json of all of the arguments.
+                Pass one for methods which take arguments which do not identify the result, e.g. connections
+    """
+    def decorator(fn: Callable) -> CachedMethod:
+        return CachedMethod(fn, CachePolicy(ttl, ttl if negative_ttl is None else negative_ttl, max_entries,
+                                            key or _default_key))
+    return decorator
+
+
+def stats() -> Dict[str, Counter]:
+    """:return: hits and misses, by provider_ref.method"""
+    return dict(_stats)
+
+
+def close() -> None:
+    """Log the stats and drop the cached results of the crawl"""
+    global _disk
+    for name, counter in sorted(_stats.items()):
+        logs.logger.debug(f"Provider cache {name}: {counter['hit']} hits, {counter['miss']} misses")
+    if _disk:
+        _disk.close()
+    _disk = None
+    _stores.clear()
+    _stats.clear()
+
+
+def _store(name: str, max_entries: int) -> MemoryStore:
+    if name not in _stores:
+        _stores[name] = MemoryStore(max_entries)
+    return _stores[name]
+
+
+def _disk_store() -> DiskStore:
+    global _disk
+    if not _disk:
+        _disk = DiskStore(constants.PROVIDER_CACHE_FILE, 'provider_calls')
+        logs.logger.debug(f"Opened provider cache: {constants.PROVIDER_CACHE_FILE}")
+    return _disk
+
+
+def _ttl(name: str, default: float) -> float:
+    for method_ttl in constants.ARGS.provider_cache_ttls:
+        method, ttl = method_ttl.split('=')
+        if method == name:
+            return float(ttl)
+    return default
+
+
+def _default_key(*args, **kwargs) -> str:
+    return json.dumps([args, kwargs], sort_keys=True, default=repr)
+
+
+def _is_negative(result: Any) -> bool:
+    return result is None or (isinstance(result, Sized) and 0 == len(result))
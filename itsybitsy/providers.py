@@ -1,8 +1,12 @@
 # Copyright # Copyright 2020 Life360, Inc
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import configargparse
-from typing import List, Optional
+import functools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Type, Union
 
 from . import constants, logs
 from .charlotte_web import Hint
@@ -28,6 +32,26 @@ class ProviderInterface(PluginInterface):
         """
         return False
 
+    @staticmethod
+    def retryable_exceptions() -> Tuple[Type[Exception], ...]:
+        """
+        Optionally announce exceptions, raised by this provider, which indicate an intermittent failure.  Calls to the
+        provider which raise them are retried according to the --retry-* arguments.  Timeouts are always retried.
+        :return:
+        """
+        return ()
+
+    async def prefetch(self, seeds: List[str], hints: List[Hint]) -> None:
+        """
+        Optionally warm up before crawling starts, e.g. bulk load an inventory or connect to a bastion, so that the
+        cost is not paid on the critical path of the first nodes crawled.  Called once per crawl, concurrently for all
+        providers, before the seeds are crawled.  Default response when subclassing will be a no-op.
+
+        :param seeds: addresses of the seeds to be crawled in this provider
+        :param hints: the hints which will be taken in this provider
+        """
+        del seeds, hints
+
     async def open_connection(self, address: str) -> Optional[type]:
         """
         Optionally open a connection which can then be passed into lookup_name() and crawl()
@@ -40,6 +64,14 @@ class ProviderInterface(PluginInterface):
         del address
         return None
 
+    async def close_connection(self, connection: type) -> None:
+        """
+        Optionally close a connection opened by open_connection(), once crawling no longer needs it
+
+        :param connection: as returned by open_connection()
+        """
+        del connection
+
     async def lookup_name(self, address: str, connection: Optional[type]) -> Optional[str]:
         """
         Takes and address and lookups up service name in provider.  Default response when subclassing
@@ -56,6 +88,28 @@ class ProviderInterface(PluginInterface):
         del address, connection
         return None
 
+    async def lookup_instances(self, service_name: str, address: str, count: int) -> List[str]:
+        """
+        Optionally look up the addresses of other instances of a service, for --instances-per-service.  Default
+        response when subclassing is just the instance already known.
+
+        :param service_name: the service to look up instances of
+        :param address: address of the instance already known (and crawled)
+        :param count: max number of addresses to return
+        :return: up to `count` addresses, starting with `address`
+        """
+        del service_name, count
+        return [address]
+
+    async def inventory(self) -> List[NodeTransport]:
+        """
+        Optionally enumerate every instance of every service known to the provider, for --seed-from-inventory.  Default
+        response when subclassing will be a no-op.
+
+        :return: a NodeTransport per instance, with the service name as the debug_identifier
+        """
+        return []
+
     async def take_a_hint(self, hint: Hint) -> List[NodeTransport]:
         """
         Takes a hint, looks up an instance of service in the provider, and returns a NodeTransport representing the
@@ -72,7 +126,7 @@ class ProviderInterface(PluginInterface):
         """
         Crawl provider for downstream services using CrawlStrategy.  Default response when subclassing will be a no-op,
         which allows provider subclasses to only implement aspects of this classes functionality a-la-cart style.
-        Please cache your results to improve system performance!
+        Please cache your results to improve system performance!  (See provider_cache.cached)
 
         :param address: address to crawl
         :param connection: optional connection.  for example if an ssh connection was opened during
@@ -84,8 +138,86 @@ class ProviderInterface(PluginInterface):
         del address, kwargs, connection
         return []
 
+    async def lookup_names(self, requests: List[Tuple[str, Optional[type]]]) -> List[Union[Optional[str], Exception]]:
+        """
+        Optionally implement batch name lookup, where the provider can look up many addresses in one call.  Concurrent
+        lookup_name() calls by crawling are then coalesced into lookup_names() calls (see --batch-window/--batch-size).
+        The default implementation calls lookup_name() per request.
+
+        :param requests: (address, connection) for each lookup, as passed to lookup_name()
+        :return: the name, or the exception raised looking it up, for each request - in order
+        """
+        return await asyncio.gather(*[self.lookup_name(address, connection) for address, connection in requests],
+                                    return_exceptions=True)
+
+    async def take_hints(self, hints: List[Hint]) -> List[Union[List[NodeTransport], Exception]]:
+        """
+        Optionally implement batch hint taking, coalesced from take_a_hint() calls as for lookup_names().  The default
+        implementation calls take_a_hint() per hint.
+
+        :param hints:
+        :return: as take_a_hint() would return, or the exception it raised, for each hint - in order
+        """
+        return await asyncio.gather(*[self.take_a_hint(hint) for hint in hints], return_exceptions=True)
+
+    async def crawl_downstream_many(self, requests: List[Tuple[str, Optional[type], dict]]
+                                    ) -> List[Union[List[NodeTransport], Exception]]:
+        """
+        Optionally implement batch crawling, coalesced from crawl_downstream() calls as for lookup_names().  The
+        default implementation calls crawl_downstream() per request.
+
+        :param requests: (address, connection, provider_args) for each crawl, as passed to crawl_downstream()
+        :return: as crawl_downstream() would return, or the exception it raised, for each request - in order
+        """
+        return await asyncio.gather(*[self.crawl_downstream(address, connection, **kwargs)
+                                      for address, connection, kwargs in requests], return_exceptions=True)
+
 
 _provider_registry = PluginFamilyRegistry(ProviderInterface)
+_executors: Dict[str, ThreadPoolExecutor] = {}  # {provider_ref: executor for @blocking calls}
+
+
+def blocking(fn):
+    """
+    Decorator for provider methods which make blocking calls, e.g. to a synchronous SDK.  The decorated method becomes
+    a coroutine which runs `fn` on a thread pool dedicated to the provider (sized by --provider-threads), so that it
+    does not freeze the event loop - and with it all other crawling and live rendering.
+
+        @blocking
+        def _get_pod(self, name):
+            return self.api.read_namespaced_pod(name, namespace)
+
+        async def lookup_name(self, address, connection):
+            pod = await self._get_pod(address)
+    """
+    @functools.wraps(fn)
+    async def run_in_executor(provider: ProviderInterface, *args, **kwargs):
+        return await asyncio.get_event_loop().run_in_executor(_executor(provider.ref()),
+                                                              functools.partial(fn, provider, *args, **kwargs))
+    return run_in_executor
+
+
+def _executor(provider_ref: str) -> ThreadPoolExecutor:
+    if provider_ref not in _executors:
+        threads = constants.ARGS.provider_threads
+        for provider_threads in constants.ARGS.provider_threads_overrides:
+            ref, num = provider_threads.split('=')
+            if ref == provider_ref:
+                threads = int(num)
+        logs.logger.debug(f"Starting {threads} threads for blocking calls of provider: {provider_ref}")
+        _executors[provider_ref] = ThreadPoolExecutor(threads, thread_name_prefix=f"provider-{provider_ref}")
+    return _executors[provider_ref]
+
+
+def shutdown_executors() -> None:
+    """Shut down the thread pools of the providers, without waiting for blocking calls still running, e.g. those which
+    outlived their --timeout"""
+    for executor in _executors.values():
+        if sys.version_info >= (3, 9):
+            executor.shutdown(wait=False, cancel_futures=True)  # pylint: disable=unexpected-keyword-arg
+        else:
+            executor.shutdown(wait=False)
+    _executors.clear()
 
 
 def parse_provider_args(argparser: configargparse.ArgParser):
@@ -96,10 +228,32 @@ def register_providers():
     _provider_registry.register_plugins(constants.ARGS.disable_providers)
 
 
+def register_provider(provider: ProviderInterface):
+    _provider_registry.register_plugin(provider)
+
+
 def get_provider_by_ref(provider_ref: str) -> ProviderInterface:
     return _provider_registry.get_plugin(provider_ref)
 
 
+def get_registered_provider_refs() -> List[str]:
+    return _provider_registry.get_registered_plugin_refs()
+
+
+def representative_instances(instances: List[NodeTransport]) -> List[NodeTransport]:
+    """
+    Pick one instance per service from an inventory() - the lowest address, so that repeated runs pick the same one
+
+    :param instances:
+    :return: an instance per service, ordered by service name
+    """
+    representatives = {}
+    for instance in sorted(instances, key=lambda nt: nt.address or ''):
+        if instance.address and instance.debug_identifier and instance.debug_identifier not in representatives:
+            representatives[instance.debug_identifier] = instance
+    return [representatives[service_name] for service_name in sorted(representatives)]
+
+
 def parse_crawl_strategy_response(response: str, address: str, command: str) -> List[NodeTransport]:
     lines = response.splitlines()
     if len(lines) < 2:
@@ -0,0 +1,78 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Retry, with jittered exponential backoff, of provider calls which fail intermittently (e.g. timeouts).
+"""
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Tuple, Type
+
+from . import constants, logs
+from .providers import ProviderInterface, TimeoutException
+
+# always retryable, for every provider
+RETRYABLE_EXCEPTIONS: Tuple[Type[Exception], ...] = (asyncio.TimeoutError, TimeoutException)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Attributes
+        attempts: max number of attempts, 1 for no retries
+        backoff: base delay in seconds before the first retry, doubled for every subsequent retry
+        backoff_max: cap on the delay in seconds before any retry
+        retryable: exception classes which are retried
+        retryable_names: names of further exception classes which are retried, e.g. from --retry-on
+    """
+    attempts: int
+    backoff: float
+    backoff_max: float
+    retryable: Tuple[Type[Exception], ...] = RETRYABLE_EXCEPTIONS
+    retryable_names: Tuple[str, ...] = ()
+
+    def is_retryable(self, e: Exception) -> bool:
+        if isinstance(e, self.retryable):
+            return True
+        return any(cls.__name__ in self.retryable_names for cls in type(e).__mro__)
+
+    def delay(self, retry: int) -> float:
+        """'Full jitter': a random delay up to the exponential backoff, so that retries of many failed calls are
+        spread out rather than all hitting the provider again at once"""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** (retry - 1)))
+
+
+def policy_for(provider: ProviderInterface) -> RetryPolicy:
+    """The policy configured on the command line, retrying the provider's own retryable exceptions too"""
+    return RetryPolicy(
+        attempts=constants.ARGS.retry_attempts,
+        backoff=constants.ARGS.retry_backoff,
+        backoff_max=constants.ARGS.retry_backoff_max,
+        retryable=RETRYABLE_EXCEPTIONS + tuple(provider.retryable_exceptions()),
+        retryable_names=tuple(constants.ARGS.retry_on)
+    )
+
+
+async def call(policy: RetryPolicy, description: str, attempt: Callable[[], Awaitable]) -> Any:
+    """
+    Await `attempt()`, calling it again if it raises a retryable exception, until it succeeds or the attempts are used
+    up.
+
+    :param policy:
+    :param description: describes the call for debug logs, e.g. "lookup_name(1.2.3.4)"
+    :param attempt: called with no arguments, returns the awaitable to attempt
+    :return: result of the first successful attempt
+    :raises: the exception of the last attempt, or the first non retryable exception
+    """
+    attempts = max(1, policy.attempts)
+    for retry in range(attempts):
+        try:
+            return await attempt()
+        except Exception as e:
+            if retry + 1 >= attempts or not policy.is_retryable(e):
+                raise
+            delay = policy.delay(retry + 1)
+            logs.logger.debug(f"Retrying {description} in {delay:.2f}s after {e.__class__.__name__}({e}), attempt "
+                              f"{retry + 1} of {attempts} failed")
+            await asyncio.sleep(delay)
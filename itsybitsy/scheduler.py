@@ -0,0 +1,137 @@
+# Copyright # Copyright 2020 Life360, Inc
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+A global scheduler for crawl work.  Pending node work is held in a priority queue and executed by a fixed size pool of
+workers.  The order in which work is executed is determined by a pluggable ordering policy, across all of the queued
+work.  The queue itself is unbounded, rather crawling holds back further work (e.g. the children of a node) while the
+queue is full - see wait_for_space().
+"""
+import asyncio
+import heapq
+import itertools
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import logs
+from .charlotte_web import Protocol
+
+ORDER_BFS = 'bfs'
+ORDER_DFS = 'dfs'
+ORDER_BLOCKING_FIRST = 'blocking-first'
+ORDER_SEED_FAIR = 'seed-fair'
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """Describes pending crawl work for the purposes of ordering it.
+
+    Attributes
+        depth: depth of the node in the tree
+        protocol: protocol of the node
+        seed: identifies the seed the node was discovered from, None for the seed nodes themselves
+    """
+    depth: int
+    protocol: Protocol
+    seed: Optional[str] = None
+
+
+class CrawlScheduler:
+    def __init__(self, workers: int, queue_size: int, order: str = ORDER_BFS):
+        """
+        :param workers: max number of work items executed concurrently
+        :param queue_size: max number of work items queued before wait_for_space() holds back submitters (0 for
+                           unbounded)
+        :param order: one of ORDERINGS
+        """
+        self._num_workers = workers
+        self._queue_size = queue_size
+        self._queue: List[tuple] = []  # heap of (priority, sequence, future, work)
+        self._lock = asyncio.Lock()
+        self._not_empty = asyncio.Condition(self._lock)
+        self._not_full = asyncio.Condition(self._lock)
+        self._priority: Callable[[CrawlScheduler, WorkItem], tuple] = ORDERINGS[order]
+        self._sequence = itertools.count()  # FIFO tie breaker, also guarantees queue entries never compare futures
+        self._seed_counts: Dict[Optional[str], int] = defaultdict(int)
+        self._workers: List[asyncio.Task] = []
+        logs.logger.debug(f"Crawl scheduler: {workers} workers, queue size: {queue_size}, order: {order}")
+
+    def start(self) -> None:
+        self._workers = [asyncio.ensure_future(self._work()) for _ in range(self._num_workers)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def run(self, item: WorkItem, work: Callable[[], Awaitable]) -> Any:
+        """
+        Queue `work` and wait for a worker to execute it.
+
+        :param item: describes the work, used to order it
+        :param work: called with no arguments by the worker, returns the awaitable to execute
+        :return: the result of the work
+        """
+        future = asyncio.get_event_loop().create_future()
+        async with self._lock:
+            heapq.heappush(self._queue, (self._priority(self, item), next(self._sequence), future, work))
+            self._not_empty.notify()
+        return await future
+
+    async def wait_for_space(self) -> None:
+        """Wait while the queue is full.  Call before queueing further work, e.g. the children of a node, so that the
+        number of queued work items (and of the nodes they hold) stays around --crawl-queue-size"""
+        if not self._queue_size:
+            return
+        async with self._lock:
+            await self._not_full.wait_for(lambda: len(self._queue) < self._queue_size)
+
+    async def _work(self) -> None:
+        while True:
+            async with self._lock:
+                await self._not_empty.wait_for(lambda: self._queue)
+                _, _, future, work = heapq.heappop(self._queue)
+                self._not_full.notify_all()
+            try:
+                if future.cancelled():  # the submitter has given up on it
+                    continue
+                future.set_result(await work())
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+
+    def seed_turn(self, seed: Optional[str]) -> int:
+        """Count work items seen for the seed - used to round-robin between seeds"""
+        self._seed_counts[seed] += 1
+        return self._seed_counts[seed]
+
+
+def _bfs(_: CrawlScheduler, item: WorkItem) -> tuple:
+    return (item.depth,)
+
+
+def _dfs(_: CrawlScheduler, item: WorkItem) -> tuple:
+    return (-item.depth,)
+
+
+def _blocking_first(_: CrawlScheduler, item: WorkItem) -> tuple:
+    return not item.protocol.blocking, item.depth
+
+
+def _seed_fair(scheduler: CrawlScheduler, item: WorkItem) -> tuple:
+    """round-robin between seeds, so that one large subtree does not starve the others"""
+    return scheduler.seed_turn(item.seed), item.depth
+
+
+# {order: priority function, lower priorities are executed first}
+ORDERINGS: Dict[str, Callable[[CrawlScheduler, WorkItem], tuple]] = {
+    ORDER_BFS: _bfs,
+    ORDER_DFS: _dfs,
+    ORDER_BLOCKING_FIRST: _blocking_first,
+    ORDER_SEED_FAIR: _seed_fair
+}
@@ -105,4 +105,4 @@ def charlotte_d(tmp_path, mocker) -> str:
 
 @pytest.fixture
 def builtin_providers() -> List[str]:
-    return ['ssh', 'k8s', 'aws']
+    return ['ssh', 'k8s', 'aws', 'local']
@@ -0,0 +1,115 @@
+import pytest
+from unittest.mock import MagicMock
+
+from itsybitsy import node, provider_cache
+from itsybitsy.plugins import provider_aws
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.aws_profile = None
+    cli_args_mock.aws_service_name_tag = 'Service'
+    cli_args_mock.aws_tag_filters = ['Env=prod']
+    cli_args_mock.provider_threads = 1
+    cli_args_mock.provider_threads_overrides = []
+    cli_args_mock.provider_cache = provider_cache.MODE_OFF
+
+
+@pytest.fixture
+def ec2_client_mock(mocker) -> MagicMock:
+    return mocker.patch('itsybitsy.plugins.provider_aws.boto3.client').return_value
+
+
+def _instance(address: str, tags: dict) -> dict:
+    return {'PrivateIpAddress': address, 'Tags': [{'Key': key, 'Value': value} for key, value in tags.items()]}
+
+
+@pytest.mark.asyncio
+async def test_inventory_case_paginated(ec2_client_mock):
+    """The instances of every page and reservation are inventoried, named by the --aws-service-name-tag"""
+    # arrange
+    ec2_client_mock.get_paginator.return_value.paginate.return_value = [
+        {'Reservations': [{'Instances': [_instance('1.1.1.1', {'Service': 'foo', 'Env': 'prod'}),
+                                         _instance('2.2.2.2', {'Service': 'bar'})]}]},
+        {'Reservations': [{'Instances': [_instance('3.3.3.3', {'Service': 'foo'})]},
+                          {'Instances': [_instance('4.4.4.4', {'Name': 'baz'})]}]}
+    ]
+
+    # act
+    instances = await provider_aws.ProviderAWS().inventory()
+
+    # assert
+    ec2_client_mock.get_paginator.assert_called_once_with('describe_instances')
+    assert [node.NodeTransport('seed', '1.1.1.1', 'foo'), node.NodeTransport('seed', '2.2.2.2', 'bar'),
+            node.NodeTransport('seed', '3.3.3.3', 'foo'), node.NodeTransport('seed', '4.4.4.4', None)] == instances
+
+
+@pytest.mark.asyncio
+async def test_inventory_case_filters(ec2_client_mock):
+    """Only running instances with the --aws-service-name-tag, and the --aws-tag-filters, are inventoried"""
+    # arrange
+    paginate_mock = ec2_client_mock.get_paginator.return_value.paginate
+    paginate_mock.return_value = []
+
+    # act
+    await provider_aws.ProviderAWS().inventory()
+
+    # assert
+    paginate_mock.assert_called_once_with(Filters=[
+        {'Name': 'instance-state-name', 'Values': ['running']},
+        {'Name': 'tag-key', 'Values': ['Service']},
+        {'Name': 'tag:Env', 'Values': ['prod']}
+    ])
+
+
+@pytest.fixture
+def provider_cache_memory(cli_args_mock):
+    cli_args_mock.provider_cache = provider_cache.MODE_MEMORY
+    cli_args_mock.provider_cache_ttls = []
+    yield
+    provider_cache.close()
+
+
+def _interface(address: str, requester_id: str) -> dict:
+    return {'Description': 'RDSNetworkInterface', 'RequesterId': requester_id,
+            'PrivateIpAddresses': [{'PrivateIpAddress': address}]}
+
+
+@pytest.mark.asyncio
+async def test_lookup_names_case_batched(ec2_client_mock):
+    """Addresses are looked up in batches of the max filter values of the ec2 api, and mapped to their interfaces"""
+    # arrange
+    addresses = [f"10.0.{i // 256}.{i % 256}" for i in range(provider_aws.max_filter_values + 1)]
+    ec2_client_mock.describe_network_interfaces.side_effect = [
+        {'NetworkInterfaces': [_interface(addresses[1], 'bar'), _interface(addresses[0], 'foo')]},
+        {'NetworkInterfaces': []}
+    ]
+
+    # act
+    names = await provider_aws.ProviderAWS().lookup_names([(address, None) for address in addresses])
+
+    # assert
+    assert [len(call.kwargs['Filters'][0]['Values'])
+            for call in ec2_client_mock.describe_network_interfaces.call_args_list] == [200, 1]
+    assert ['RDSNetworkInterface_foo', 'RDSNetworkInterface_bar'] == names[:2]
+    assert [None] * (len(addresses) - 2) == names[2:]
+
+
+@pytest.mark.asyncio
+async def test_lookup_names_case_cache(ec2_client_mock, provider_cache_memory):
+    """Names found by the batch are cached for lookup_name(), addresses already cached are not looked up again"""
+    # arrange
+    provider = provider_aws.ProviderAWS()
+    ec2_client_mock.describe_network_interfaces.return_value = {'NetworkInterfaces': [_interface('1.1.1.1', 'foo')]}
+    await provider.lookup_names([('1.1.1.1', None)])
+    ec2_client_mock.describe_network_interfaces.return_value = {'NetworkInterfaces': []}
+
+    # act
+    names = await provider.lookup_names([('1.1.1.1', None), ('2.2.2.2', None)])
+    name = await provider.lookup_name('1.1.1.1', None)
+
+    # assert
+    assert ['RDSNetworkInterface_foo', None] == names
+    assert 'RDSNetworkInterface_foo' == name
+    calls = ec2_client_mock.describe_network_interfaces.call_args_list
+    assert [['1.1.1.1'], ['2.2.2.2']] == [call.kwargs['Filters'][0]['Values'] for call in calls]
@@ -0,0 +1,144 @@
+import asyncio
+import pytest
+import threading
+from kubernetes import client
+from unittest.mock import MagicMock
+
+from itsybitsy import node, provider_cache
+from itsybitsy.plugins import provider_k8s
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.k8s_namespace = 'default'
+    cli_args_mock.k8s_service_name_label = None
+    cli_args_mock.k8s_label_selectors = []
+    cli_args_mock.provider_threads = 2
+    cli_args_mock.provider_threads_overrides = []
+    cli_args_mock.provider_cache = provider_cache.MODE_OFF
+    cli_args_mock.timeout = 30
+
+
+@pytest.fixture
+def provider(mocker) -> provider_k8s.ProviderKubernetes:
+    """The provider, each CoreV1Api() of which is a new mock"""
+    mocker.patch('itsybitsy.plugins.provider_k8s.config.load_kube_config')
+    mocker.patch('itsybitsy.plugins.provider_k8s.client.ApiClient')
+    mocker.patch('itsybitsy.plugins.provider_k8s.client.CoreV1Api', side_effect=lambda **_: MagicMock())
+    return provider_k8s.ProviderKubernetes()
+
+
+def _pod(name: str, labels: dict, phase: str = 'Running') -> client.V1Pod:
+    return client.V1Pod(metadata=client.V1ObjectMeta(name=name, labels=labels), status=client.V1PodStatus(phase=phase))
+
+
+@pytest.mark.asyncio
+async def test_inventory(provider):
+    """Running pods are inventoried by name, named by their service name label"""
+    # arrange
+    provider.api.list_namespaced_pod.return_value = client.V1PodList(items=[
+        _pod('foo-1', {'app': 'foo'}), _pod('foo-2', {'app': 'foo'}, 'Pending'), _pod('bar-1', {'app': 'bar'})
+    ])
+
+    # act
+    instances = await provider.inventory()
+
+    # assert
+    provider.api.list_namespaced_pod.assert_called_once_with('default', label_selector='app')
+    assert [node.NodeTransport('seed', 'foo-1', 'foo'), node.NodeTransport('seed', 'bar-1', 'bar')] == instances
+
+
+@pytest.mark.asyncio
+async def test_inventory_case_service_name_label(provider, cli_args_mock):
+    """The pods are selected by the --k8s-service-name-label, and the --k8s-label-selectors"""
+    # arrange
+    cli_args_mock.k8s_service_name_label = 'service'
+    cli_args_mock.k8s_label_selectors = ['env=prod']
+    provider.api.list_namespaced_pod.return_value = client.V1PodList(items=[_pod('foo-1', {'service': 'foo'})])
+
+    # act
+    instances = await provider.inventory()
+
+    # assert
+    provider.api.list_namespaced_pod.assert_called_once_with('default', label_selector='service,env=prod')
+    assert [node.NodeTransport('seed', 'foo-1', 'foo')] == instances
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('seeds,hints,expected_listed', [([], [], False), (['foo-1'], [], True),
+                                                         ([], [MagicMock()], True)])
+async def test_prefetch(seeds, hints, expected_listed, provider):
+    """The pods are listed only if seeds are crawled or hints are taken in k8s"""
+    # arrange
+    provider.api.list_namespaced_pod.return_value = client.V1PodList(items=[])
+
+    # act
+    await provider.prefetch(seeds, hints)
+
+    # assert
+    assert expected_listed == provider.api.list_namespaced_pod.called
+
+
+@pytest.mark.asyncio
+async def test_prefetch_case_timeout(provider, cli_args_mock):
+    """Listing the pods is bounded by the --timeout"""
+    # arrange
+    cli_args_mock.timeout = .1
+    provider.api.list_namespaced_pod.side_effect = lambda *_, **__: threading.Event().wait(1)
+
+    # act/assert
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.prefetch(['foo-1'], [])
+
+
+@pytest.mark.asyncio
+async def test_lookup_names(provider):
+    """Names are looked up from one listing of all the pods, pods not in it are got one by one"""
+    # arrange
+    provider.api.list_namespaced_pod.return_value = client.V1PodList(items=[_pod('foo-1', {'app': 'foo'})])
+    provider.api.read_namespaced_pod.return_value = _pod('bar-1', {'app': 'bar'})
+
+    # act
+    names = await provider.lookup_names([('foo-1', None), ('bar-1', None)])
+
+    # assert
+    assert ['foo', 'bar'] == names
+    provider.api.list_namespaced_pod.assert_called_once_with('default')
+    provider.api.read_namespaced_pod.assert_called_once_with('bar-1', 'default')
+
+
+@pytest.mark.asyncio
+async def test_lookup_names_case_cached(provider, cli_args_mock):
+    """The pods are not listed again if all of them are cached"""
+    # arrange
+    cli_args_mock.provider_cache = provider_cache.MODE_MEMORY
+    cli_args_mock.provider_cache_ttls = []
+    provider.api.list_namespaced_pod.return_value = client.V1PodList(items=[_pod('foo-1', {'app': 'foo'})])
+    await provider.lookup_names([('foo-1', None)])
+
+    # act
+    names = await provider.lookup_names([('foo-1', None)])
+    provider_cache.close()
+
+    # assert
+    assert ['foo'] == names
+    provider.api.list_namespaced_pod.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_exec_case_api_per_thread(provider, mocker):
+    """stream() patches the api client it is passed, so concurrent execs do not share one"""
+    # arrange
+    barrier = threading.Barrier(2, timeout=5)  # both execs are in flight at once, on different threads
+
+    def stream(connect_get_namespaced_pod_exec, *_, **__):
+        barrier.wait()
+        return connect_get_namespaced_pod_exec
+    mocker.patch('itsybitsy.plugins.provider_k8s.stream', side_effect=stream)
+
+    # act
+    connects = await asyncio.gather(*[provider._exec('foo-1', 'foo', ['ls']) for _ in range(2)])
+
+    # assert
+    assert connects[0] is not connects[1]
+    assert provider.api.connect_get_namespaced_pod_exec not in connects
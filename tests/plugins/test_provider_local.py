@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+
+from itsybitsy import node
+from itsybitsy.plugins import provider_local
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.local_concurrency = 10
+    cli_args_mock.local_name_command = 'echo foo'
+
+
+@pytest.fixture(autouse=True)
+def reset_semaphore():
+    """The semaphore is bound to the event loop of the test which creates it"""
+    provider_local.command_semaphore = None
+
+
+@pytest.fixture
+def provider() -> provider_local.ProviderLocal:
+    return provider_local.ProviderLocal()
+
+
+@pytest.mark.asyncio
+async def test_lookup_name(provider):
+    # arrange/act/assert
+    assert 'foo' == await provider.lookup_name('localhost', None)
+
+
+@pytest.mark.asyncio
+async def test_lookup_name_case_address(provider, cli_args_mock):
+    """The address of the node is passed to the command"""
+    # arrange
+    cli_args_mock.local_name_command = f'echo "foo-${provider_local.ADDRESS_ENV_VAR}"'
+
+    # act/assert
+    assert 'foo-1.2.3.4' == await provider.lookup_name('1.2.3.4', None)
+
+
+@pytest.mark.asyncio
+async def test_lookup_name_case_command_fails(provider, cli_args_mock):
+    # arrange
+    cli_args_mock.local_name_command = 'echo bar >&2; exit 3'
+
+    # act/assert
+    with pytest.raises(provider_local.LocalCommandException, match='exited 3.*bar'):
+        await provider.lookup_name('localhost', None)
+
+
+@pytest.mark.asyncio
+async def test_crawl_downstream(provider):
+    # arrange
+    shell_command = 'echo "mux address id"; echo "foo 1.2.3.4 bar"'
+
+    # act
+    node_transports = await provider.crawl_downstream('localhost', None, shell_command=shell_command)
+
+    # assert
+    assert [node.NodeTransport('foo', '1.2.3.4', 'bar')] == node_transports
+
+
+@pytest.mark.asyncio
+async def test_crawl_downstream_case_error(provider):
+    # arrange/act/assert
+    with pytest.raises(provider_local.LocalCommandException, match='CRAWL ERROR: ERROR: BOOM'):
+        await provider.crawl_downstream('localhost', None, shell_command='echo "ERROR: BOOM"')
+
+
+@pytest.mark.asyncio
+async def test_crawl_downstream_case_concurrency_limited(provider, cli_args_mock, tmp_path):
+    """No more than --local-concurrency commands run at once"""
+    # arrange
+    cli_args_mock.local_concurrency = 2
+    running = tmp_path / 'running'
+    running.mkdir()
+    shell_command = f'f=$(mktemp -p {running}); sleep .1; echo "mux"; echo "$(ls {running} | wc -l)"; rm $f'
+
+    # act
+    responses = await asyncio.gather(*[provider.crawl_downstream('localhost', None, shell_command=shell_command)
+                                       for _ in range(5)])
+
+    # assert
+    assert max(int(nts[0].protocol_mux) for nts in responses) <= 2
+
+
+@pytest.mark.asyncio
+async def test_crawl_downstream_case_cancelled(provider, tmp_path):
+    """A cancelled command, e.g. by a timeout, is killed - along with the processes it started"""
+    # arrange
+    marker = tmp_path / 'marker'
+    shell_command = f'sh -c "sleep .5; touch {marker}"'
+
+    # act
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(provider.crawl_downstream('localhost', None, shell_command=shell_command), .1)
+    await asyncio.sleep(.6)
+
+    # assert
+    assert not marker.exists()
@@ -57,7 +57,7 @@ async def test_render_tree_case_crawl_not_complete(tree_stubbed, capsys, mocker)
     """Render should not happen for a node unless `crawl_complete()` returns True"""
     # arrange
     seed = tree_stubbed[list(tree_stubbed)[0]]
-    mocker.patch.object(seed, 'crawl_complete', return_value=False)
+    mocker.patch.object(Node, 'crawl_complete', return_value=False)
 
     # act/assert
     with pytest.raises(asyncio.TimeoutError):
@@ -74,10 +74,8 @@ async def test_render_tree_case_children_namelookup_incomplete(tree_stubbed_with
     child = seed.children[list(seed.children)[0]]
     another_child = replace(child, service_name='another_child')
     seed.children['last_child'] = another_child
-    mocker.patch.object(child, 'crawl_complete', return_value=True)
-    mocker.patch.object(another_child, 'crawl_complete', return_value=True)
-    mocker.patch.object(child, 'name_lookup_complete', return_value=True)
-    mocker.patch.object(another_child, 'name_lookup_complete', return_value=False)
+    mocker.patch.object(Node, 'crawl_complete', return_value=True)
+    mocker.patch.object(Node, 'name_lookup_complete', autospec=True, side_effect=lambda node: node is not another_child)
 
     # act/assert
     with pytest.raises(asyncio.TimeoutError):
@@ -88,6 +86,25 @@ async def test_render_tree_case_children_namelookup_incomplete(tree_stubbed_with
     assert another_child.service_name not in captured.out
 
 
+@pytest.mark.asyncio
+async def test_render_tree_case_rendered_when_crawl_signalled(tree_stubbed, capsys, mocker):
+    """Render happens as soon as crawl signals the node is complete, without waiting on any polling interval"""
+    # arrange
+    seed = tree_stubbed[list(tree_stubbed)[0]]
+    mocker.patch.object(Node, 'is_crawlable', return_value=True)
+    render_task = asyncio.ensure_future(_helper_render_tree_with_timeout(tree_stubbed))
+    await asyncio.sleep(0)
+
+    # act
+    seed.children = {}
+    seed.signal_crawl_complete()
+    await render_task
+    captured = capsys.readouterr()
+
+    # assert
+    assert seed.service_name in captured.out
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize('error', ['NULL_ADDRESS', 'TIMEOUT', 'AWS_LOOKUP_FAILED'])
 async def test_render_tree_case_child_errors(error, tree_stubbed_with_child, capsys):
@@ -236,6 +253,22 @@ async def test_render_tree_case_node_hint_merged(tree_named, protocol_fixture, n
     assert f"\x1b[36m{{INFO:FROM_HINT}} \x1b[0m\x1b[31m{{ERR:{error}}} \x1b[0m{service_name}" in captured.out
 
 
+@pytest.mark.asyncio
+async def test_render_tree_case_node_partial_instances(tree_named, node_fixture_factory, capsys):
+    """A child reported by only some of the sampled instances of its parent (--instances-per-service) is shown so"""
+    # arrange
+    child = replace(node_fixture_factory(), service_name='child', instances_reporting=1, instances_sampled=3)
+    child.signal_crawl_complete()
+    list(tree_named.values())[0].children = {'child': child}
+
+    # act
+    await _helper_render_tree_with_timeout(tree_named)
+    captured = capsys.readouterr()
+
+    # assert
+    assert "\x1b[36m{INFO:INSTANCES:1/3} \x1b[0mchild" in captured.out
+
+
 @pytest.mark.asyncio
 async def test_render_tree_case_node_nonhint_not_merged(tree_named, protocol_fixture, node_fixture_factory, capsys):
     """
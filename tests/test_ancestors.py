@@ -0,0 +1,62 @@
+import pytest
+
+from itsybitsy.ancestors import Ancestors
+
+
+def test_push_case_path():
+    """Pushing descends the path, which is available seed first as a sequence"""
+    # act
+    ancestors = Ancestors().push('seed').push('a').push('b')
+
+    # assert
+    assert ['seed', 'a', 'b'] == list(ancestors)
+    assert 3 == len(ancestors)
+    assert ('seed', 'a', 'b') == (ancestors[0], ancestors[1], ancestors[-1])
+    assert ['a', 'b'] == ancestors[1:]
+
+
+def test_push_case_siblings_share_parent():
+    """Siblings descend from one shared parent, without affecting each other"""
+    # arrange
+    parent = Ancestors().push('seed')
+
+    # act
+    a, b = parent.push('a'), parent.push('b')
+
+    # assert
+    assert a.parent is b.parent is parent
+    assert 'b' not in a
+    assert 'a' not in b
+    assert ['seed'] == list(parent)
+
+
+def test_contains():
+    """Membership, for cycle detection"""
+    # arrange
+    ancestors = Ancestors.of(['seed', 'a'])
+
+    # act/assert
+    assert 'seed' in ancestors
+    assert 'a' in ancestors
+    assert 'c' not in ancestors
+
+
+def test_of_case_empty():
+    """The ancestors of seeds are empty, and falsy"""
+    # act
+    ancestors = Ancestors.of([])
+
+    # assert
+    assert not ancestors
+    assert [] == list(ancestors)
+    with pytest.raises(IndexError):
+        _ = ancestors[0]
+
+
+def test_of_case_ancestors():
+    """Ancestors are returned as is"""
+    # arrange
+    ancestors = Ancestors().push('seed')
+
+    # act/assert
+    assert ancestors is Ancestors.of(ancestors)
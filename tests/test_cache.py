@@ -0,0 +1,197 @@
+import os
+import pytest
+
+from itsybitsy import cache
+from itsybitsy.plugins import render_json
+
+
+@pytest.fixture
+def cache_file(tmp_path) -> str:
+    return os.path.join(tmp_path, 'stub.sqlite')
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.cache_mode = cache.MODE_READ_WRITE
+    cli_args_mock.cache_ttl = 60
+    cli_args_mock.cache_negative_ttl = 60
+    cli_args_mock.cache_protocol_ttls = []
+
+
+@pytest.fixture(autouse=True)
+def close_cache():
+    yield
+    cache.close()
+
+
+class TestDiskStore:
+    def test_get_case_miss(self, cache_file):
+        # arrange
+        store = cache.DiskStore(cache_file, 'stub')
+
+        # act/assert
+        assert store.get('foo') is None
+
+    def test_get_case_hit(self, cache_file):
+        # arrange
+        store = cache.DiskStore(cache_file, 'stub')
+        store.put('foo', 'bar', 60)
+
+        # act/assert
+        assert 'bar' == store.get('foo')
+
+    def test_get_case_expired(self, cache_file):
+        # arrange
+        store = cache.DiskStore(cache_file, 'stub')
+        store.put('foo', 'bar', -1)
+
+        # act/assert
+        assert store.get('foo') is None
+
+    def test_get_case_persisted(self, cache_file):
+        """Entries survive across instances, i.e. across runs"""
+        # arrange
+        cache.DiskStore(cache_file, 'stub').put('foo', 'bar', 60)
+
+        # act/assert
+        assert 'bar' == cache.DiskStore(cache_file, 'stub').get('foo')
+
+
+@pytest.mark.parametrize('service_name', ['foo', None])
+def test_get_name_case_hit(service_name, cache_file):
+    """Names, and failed name lookups, are cached"""
+    # arrange
+    cache.init(cache_file)
+    cache.put_name('1.2.3.4', service_name, 'DUM')
+
+    # act/assert
+    assert (True, service_name) == cache.get_name('1.2.3.4')
+
+
+def test_put_name_case_negative_ttl(cli_args_mock, cache_file):
+    """Failed name lookups are cached with the negative TTL"""
+    # arrange
+    cli_args_mock.cache_negative_ttl = -1
+    cache.init(cache_file)
+    cache.put_name('1.2.3.4', None, 'DUM')
+
+    # act/assert
+    assert (False, None) == cache.get_name('1.2.3.4')
+
+
+def test_put_name_case_protocol_ttl(cli_args_mock, cache_file):
+    """Per protocol TTLs override the default TTL"""
+    # arrange
+    cli_args_mock.cache_protocol_ttls = ['FOO=-1']
+    cache.init(cache_file)
+    cache.put_name('1.2.3.4', 'foo', 'FOO')
+    cache.put_name('5.6.7.8', 'bar', 'BAR')
+
+    # act/assert
+    assert (False, None) == cache.get_name('1.2.3.4')
+    assert (True, 'bar') == cache.get_name('5.6.7.8')
+
+
+@pytest.mark.parametrize('mode,expected_hit', [(cache.MODE_OFF, False), (cache.MODE_READ, True),
+                                               (cache.MODE_READ_WRITE, True), (cache.MODE_REFRESH, False)])
+def test_get_name_case_mode_read(mode, expected_hit, cli_args_mock, cache_file):
+    """Cached entries are only read in read and read-write modes"""
+    # arrange
+    cache.init(cache_file)
+    cache.put_name('1.2.3.4', 'foo', 'DUM')
+    cache.close()
+    cli_args_mock.cache_mode = mode
+    cache.init(cache_file)
+
+    # act/assert
+    assert expected_hit == cache.get_name('1.2.3.4')[0]
+
+
+@pytest.mark.parametrize('mode,expected_hit', [(cache.MODE_READ, False), (cache.MODE_READ_WRITE, True),
+                                               (cache.MODE_REFRESH, True)])
+def test_put_name_case_mode_write(mode, expected_hit, cli_args_mock, cache_file):
+    """Entries are only written in read-write and refresh modes"""
+    # arrange
+    cli_args_mock.cache_mode = mode
+    cache.init(cache_file)
+    cache.put_name('1.2.3.4', 'foo', 'DUM')
+    cache.close()
+    cli_args_mock.cache_mode = cache.MODE_READ
+    cache.init(cache_file)
+
+    # act/assert
+    assert expected_hit == cache.get_name('1.2.3.4')[0]
+
+
+def test_get_children_case_hit(cache_file, node_fixture):
+    """Children are serialized and deserialized back into Node()s"""
+    # arrange
+    node_fixture.warnings = {'DEFUNCT': True}
+    cache.init(cache_file)
+    cache.put_children('foo', {'bar': node_fixture})
+
+    # act
+    hit, children = cache.get_children('foo')
+
+    # assert
+    assert hit
+    assert node_fixture == children['bar']
+
+
+class TestChildCache:
+    def test_getitem_case_unbounded(self, node_fixture):
+        # arrange
+        child_cache = cache.ChildCache()
+        children = {'bar': node_fixture}
+
+        # act
+        child_cache['foo'] = children
+
+        # assert
+        assert children is child_cache['foo']
+        assert 'foo' in child_cache and 'baz' not in child_cache
+
+    def test_getitem_case_spilled(self, node_fixture):
+        """Entries beyond the budget spill to disk, and are paged back in when accessed"""
+        # arrange
+        child_cache = cache.ChildCache(1 / 2 ** 20)  # 1 byte, i.e. only the most recent entry is held in memory
+        child_cache['foo'] = {'foo_child': node_fixture}
+
+        # act
+        child_cache['bar'] = {'bar_child': node_fixture}
+
+        # assert
+        assert ['bar'] == list(child_cache._memory)
+        assert {'foo', 'bar'} == set(child_cache)
+        assert {'foo_child': node_fixture} == child_cache['foo']
+        assert ['foo'] == list(child_cache._memory)
+        child_cache.close()
+
+    def test_getitem_case_least_recently_used_spilled(self, node_fixture):
+        # arrange
+        entry_size = len(render_json.dumps({'child': node_fixture}))
+        child_cache = cache.ChildCache(2 * entry_size / 2 ** 20)  # room for 2 entries
+        child_cache['foo'] = {'child': node_fixture}
+        child_cache['bar'] = {'child': node_fixture}
+        _ = child_cache['foo']
+
+        # act
+        child_cache['baz'] = {'child': node_fixture}
+
+        # assert
+        assert ['foo', 'baz'] == list(child_cache._memory)
+        child_cache.close()
+
+    def test_close_case_removes_disk_store(self, node_fixture):
+        # arrange
+        child_cache = cache.ChildCache(1 / 2 ** 20)
+        child_cache['foo'] = {'child': node_fixture}
+        child_cache['bar'] = {'child': node_fixture}
+        spill_path = child_cache._spill_path
+
+        # act
+        child_cache.close()
+
+        # assert
+        assert not os.path.exists(spill_path)
+        assert 'foo' not in child_cache
@@ -0,0 +1,179 @@
+import asyncio
+import pytest
+
+from itsybitsy import cassette, providers
+from itsybitsy.charlotte_web import Hint, Protocol
+from itsybitsy.node import NodeTransport
+
+
+class RecordedProvider:
+    """Not a ProviderInterface, which would register it as a plugin"""
+    @staticmethod
+    def ref() -> str:
+        return 'recorded'
+
+    @staticmethod
+    def is_container_platform() -> bool:
+        return False
+
+    @staticmethod
+    def retryable_exceptions():
+        return KeyError,
+
+
+class FlakyException(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock, tmp_path):
+    cli_args_mock.record = str(tmp_path / 'cassettes')
+    cli_args_mock.replay_latency_scale = 0
+
+
+@pytest.fixture(autouse=True)
+def close_cassette():
+    yield
+    cassette.close()
+
+
+@pytest.fixture
+def replay_provider(cli_args_mock, mocker) -> cassette.ReplayProvider:
+    """Record calls with the test, then replay them with the returned provider"""
+    registered = {}
+    mocker.patch('itsybitsy.cassette.get_registered_provider_refs', return_value=['recorded'])
+    mocker.patch('itsybitsy.cassette.get_provider_by_ref', return_value=RecordedProvider())
+    mocker.patch('itsybitsy.cassette.register_provider', side_effect=lambda p: registered.update({p.ref(): p}))
+    cassette.init()
+
+    def _replay_provider() -> cassette.ReplayProvider:
+        cassette.close()
+        cassette.register_replay_providers(cli_args_mock.record)
+        return registered['recorded']
+    return _replay_provider
+
+
+async def _record(method: str, *args, outcome=None, **kwargs):
+    async def attempt():
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    try:
+        return await cassette.record(RecordedProvider(), method, args, kwargs, attempt)
+    except Exception:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_replay_case_recorded(replay_provider):
+    """Calls are replayed by request, regardless of the connection"""
+    # arrange
+    hint = Hint('foo', Protocol('DUM', 'Dummy', True), 'dummy_mux', 'recorded', 'recorded')
+    node_transports = [NodeTransport('mux', '1.2.3.4', 'bar', 1, {'pet': 'dog'})]
+    await _record('open_connection', '1.2.3.4', outcome=object())
+    await _record('lookup_name', '1.2.3.4', 'connection', outcome='foo')
+    await _record('crawl_downstream', '1.2.3.4', 'connection', outcome=node_transports, shell_command='ls')
+    await _record('take_a_hint', hint, outcome=node_transports)
+    await _record('inventory', outcome=node_transports)
+
+    # act
+    provider = replay_provider()
+
+    # assert
+    assert 'recorded' == provider.ref()
+    assert not provider.is_container_platform()
+    assert await provider.open_connection('1.2.3.4') is None
+    assert 'foo' == await provider.lookup_name('1.2.3.4', None)
+    assert node_transports == await provider.crawl_downstream('1.2.3.4', None, shell_command='ls')
+    assert node_transports == await provider.take_a_hint(hint)
+    assert node_transports == await provider.inventory()
+
+
+@pytest.mark.asyncio
+async def test_replay_case_batched(replay_provider):
+    """The batch calls of ProviderInterface are replayed by their default implementations"""
+    # arrange
+    await _record('lookup_name', '1.2.3.4', None, outcome='foo')
+    await _record('lookup_name', '5.6.7.8', None, outcome='bar')
+    provider = replay_provider()
+
+    # act/assert
+    assert ['foo', 'bar'] == await provider.lookup_names([('1.2.3.4', None), ('5.6.7.8', None)])
+
+
+def test_replay_provider_case_not_discovered():
+    """Not discovered as a provider plugin of its own, e.g. one which would be prefetched by every crawl"""
+    # arrange/act/assert
+    assert cassette.ReplayProvider not in providers.ProviderInterface.__subclasses__()
+
+
+@pytest.mark.asyncio
+async def test_replay_case_not_recorded(replay_provider):
+    # arrange
+    await _record('crawl_downstream', '1.2.3.4', None, outcome=[], shell_command='ls')
+    provider = replay_provider()
+
+    # act/assert
+    with pytest.raises(cassette.CassetteMissException):
+        await provider.crawl_downstream('1.2.3.4', None, shell_command='ps')
+
+
+@pytest.mark.asyncio
+async def test_replay_case_attempts_in_order(replay_provider):
+    """Attempts, e.g. retries, are replayed in the order recorded, the last one repeatedly"""
+    # arrange
+    await _record('lookup_name', '1.2.3.4', None, outcome=asyncio.TimeoutError())
+    await _record('lookup_name', '1.2.3.4', None, outcome='foo')
+    provider = replay_provider()
+
+    # act/assert
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.lookup_name('1.2.3.4', None)
+    assert 'foo' == await provider.lookup_name('1.2.3.4', None)
+    assert 'foo' == await provider.lookup_name('1.2.3.4', None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('exception,retryable', [(FlakyException('BOOM'), False), (KeyError('BOOM'), True)])
+async def test_replay_case_exception(exception, retryable, replay_provider):
+    """Exceptions are replayed with the name and message of the original, retryable if the original was"""
+    # arrange
+    await _record('lookup_name', '1.2.3.4', None, outcome=exception)
+    provider = replay_provider()
+
+    # act
+    with pytest.raises(cassette.ReplayedException) as e_info:
+        await provider.lookup_name('1.2.3.4', None)
+
+    # assert
+    assert exception.__class__.__name__ == e_info.type.__name__
+    assert str(exception) == str(e_info.value)
+    assert retryable == isinstance(e_info.value, provider.retryable_exceptions())
+
+
+@pytest.mark.asyncio
+async def test_replay_case_latency(replay_provider, cli_args_mock, mocker):
+    # arrange
+    await _record('lookup_name', '1.2.3.4', None, outcome='foo')
+    provider = replay_provider()
+    [outcome] = [outcome for outcomes in cassette._recordings.values() for outcome in outcomes]
+    outcome['latency'] = 2
+    cli_args_mock.replay_latency_scale = .5
+    sleep_mock = mocker.patch('itsybitsy.cassette.asyncio.sleep')
+
+    # act
+    await provider.lookup_name('1.2.3.4', None)
+
+    # assert
+    sleep_mock.assert_called_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_record_case_not_recording(cli_args_mock):
+    """Without --record calls are passed through"""
+    # arrange
+    cli_args_mock.record = None
+    cassette.init()
+
+    # act/assert
+    assert 'foo' == await _record('lookup_name', '1.2.3.4', None, outcome='foo')
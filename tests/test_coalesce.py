@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from typing import List
+
+from itsybitsy import coalesce, providers
+from itsybitsy.coalesce import Coalescer, CoalescerRegistry
+
+
+class BatchingProvider(providers.ProviderInterface):
+    def __init__(self):
+        self.batches = []
+
+    @staticmethod
+    def ref() -> str:
+        return 'batching'
+
+    async def lookup_names(self, requests: List[tuple]) -> list:
+        self.batches.append([address for address, _ in requests])
+        return [f"name_{address}" for address, _ in requests]
+
+
+class TestCoalescer:
+    @pytest.mark.asyncio
+    async def test_submit_case_window(self):
+        """Requests submitted within the window are dispatched as one batch, results are returned per request"""
+        # arrange
+        batches = []
+
+        async def dispatch(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+        coalescer = Coalescer(dispatch, .01, 100)
+
+        # act
+        results = await asyncio.gather(*[coalescer.submit(i) for i in range(3)])
+
+        # assert
+        assert [0, 2, 4] == results
+        assert [[0, 1, 2]] == batches
+
+    @pytest.mark.asyncio
+    async def test_submit_case_max_size(self):
+        """A full batch is dispatched without waiting for the window"""
+        # arrange
+        batches = []
+
+        async def dispatch(items):
+            batches.append(items)
+            return items
+        coalescer = Coalescer(dispatch, 10, 2)
+
+        # act
+        results = await asyncio.wait_for(asyncio.gather(*[coalescer.submit(i) for i in range(2)]), 1)
+
+        # assert
+        assert [0, 1] == results
+        assert [[0, 1]] == batches
+
+    @pytest.mark.asyncio
+    async def test_submit_case_exceptions(self):
+        """Exceptions returned per request are raised to that request only, a failed batch is raised to every one"""
+        # arrange
+        async def dispatch(items):
+            if 'fail batch' in items:
+                raise Exception('batch failed')
+            return [Exception('item failed') if 'fail item' == item else item for item in items]
+        coalescer = Coalescer(dispatch, .01, 100)
+
+        # act
+        results = await asyncio.gather(coalescer.submit('ok'), coalescer.submit('fail item'), return_exceptions=True)
+        failed = await asyncio.gather(coalescer.submit('ok'), coalescer.submit('fail batch'), return_exceptions=True)
+
+        # assert
+        assert 'ok' == results[0]
+        assert 'item failed' == str(results[1])
+        assert ['batch failed'] * 2 == [str(e) for e in failed]
+
+
+class TestCoalescerRegistry:
+    @pytest.mark.asyncio
+    async def test_get_case_batching_provider(self):
+        """Calls of a provider which implements the batch method are coalesced"""
+        # arrange
+        provider = BatchingProvider()
+        registry = CoalescerRegistry(.01, 100)
+        coalescer = registry.get(provider, 'lookup_name')
+
+        # act
+        names = await asyncio.gather(*[coalescer.submit(coalesce.request('lookup_name', (address, None), {}))
+                                       for address in ['a', 'b']])
+
+        # assert
+        assert ['name_a', 'name_b'] == names
+        assert [['a', 'b']] == provider.batches
+
+    def test_get_case_not_batching(self):
+        """Calls are not coalesced for providers which do not implement the batch method, for methods without one,
+        or when batching is disabled"""
+        # arrange
+        provider = BatchingProvider()
+
+        # act/assert
+        assert CoalescerRegistry(.01, 100).get(provider, 'crawl_downstream') is None
+        assert CoalescerRegistry(.01, 100).get(provider, 'open_connection') is None
+        assert CoalescerRegistry(.01, 1).get(provider, 'lookup_name') is None
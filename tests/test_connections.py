@@ -0,0 +1,151 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from itsybitsy.connections import ConnectionRegistry
+
+
+@pytest.fixture
+def provider_mock(mocker) -> MagicMock:
+    provider_mock = mocker.patch('itsybitsy.providers.ProviderInterface', autospec=True)
+    provider_mock.ref.return_value = 'mock'
+    return provider_mock
+
+
+class TestConnectionRegistry:
+    @pytest.mark.asyncio
+    async def test_connection_case_shared(self, provider_mock):
+        """Concurrent users of the same address share one connection, closed once after the last of them is done"""
+        # arrange
+        registry = ConnectionRegistry()
+        opened = []
+
+        async def open_connection():
+            opened.append('conn')
+            await asyncio.sleep(.01)
+            return 'conn'
+
+        async def use_connection():
+            async with registry.connection(provider_mock, 'foo', open_connection) as conn:
+                await asyncio.sleep(.01)
+                provider_mock.close_connection.assert_not_called()
+                return conn
+
+        # act
+        connections = await asyncio.gather(*[use_connection() for _ in range(3)])
+
+        # assert
+        assert ['conn'] * 3 == connections
+        assert 1 == len(opened)
+        provider_mock.close_connection.assert_awaited_once_with('conn')
+
+    @pytest.mark.asyncio
+    async def test_connection_case_not_shared_across_addresses(self, provider_mock):
+        # arrange
+        registry = ConnectionRegistry()
+
+        async def open_connection(address):
+            return f"conn_{address}"
+
+        # act
+        async with registry.connection(provider_mock, 'foo', lambda: open_connection('foo')) as foo_conn:
+            async with registry.connection(provider_mock, 'bar', lambda: open_connection('bar')) as bar_conn:
+                pass
+
+        # assert
+        assert ('conn_foo', 'conn_bar') == (foo_conn, bar_conn)
+        assert 2 == provider_mock.close_connection.await_count
+
+    @pytest.mark.asyncio
+    async def test_connection_case_open_failed(self, provider_mock):
+        """Failure to open the connection is raised to the user, and there is nothing to close"""
+        # arrange
+        registry = ConnectionRegistry()
+
+        async def open_connection():
+            raise Exception('BOOM')
+
+        # act/assert
+        with pytest.raises(Exception, match='BOOM'):
+            async with registry.connection(provider_mock, 'foo', open_connection):
+                pass
+        provider_mock.close_connection.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_close_case_in_use(self, provider_mock):
+        """close() closes connections still in use, e.g. when the crawl is interrupted"""
+        # arrange
+        registry = ConnectionRegistry()
+        opened = asyncio.Event()
+
+        async def open_connection():
+            return 'conn'
+
+        async def use_connection():
+            async with registry.connection(provider_mock, 'foo', open_connection):
+                opened.set()
+                await asyncio.sleep(10)
+        user = asyncio.ensure_future(use_connection())
+        await opened.wait()
+
+        # act
+        await registry.close()
+
+        # assert
+        provider_mock.close_connection.assert_awaited_once_with('conn')
+        user.cancel()
+
+    @pytest.mark.asyncio
+    async def test_warm_case_used(self, provider_mock):
+        """A warmed connection is opened in the background, held, then used (not reopened) by the next user"""
+        # arrange
+        registry = ConnectionRegistry(max_warm=1)
+        opened = []
+
+        async def open_connection():
+            opened.append('conn')
+            return 'conn'
+
+        # act
+        warming = registry.warm(provider_mock, 'foo', open_connection)
+        await asyncio.sleep(0)
+        provider_mock.close_connection.assert_not_called()
+        async with registry.connection(provider_mock, 'foo', open_connection) as conn:
+            pass
+
+        # assert
+        assert warming
+        assert 'conn' == conn
+        assert 1 == len(opened)
+        provider_mock.close_connection.assert_awaited_once_with('conn')
+
+    @pytest.mark.asyncio
+    async def test_warm_case_max_warm(self, provider_mock):
+        """No more than max_warm connections are held at once"""
+        # arrange
+        registry = ConnectionRegistry(max_warm=1)
+
+        async def open_connection():
+            return 'conn'
+
+        # act/assert
+        assert registry.warm(provider_mock, 'foo', open_connection)
+        assert not registry.warm(provider_mock, 'bar', open_connection)
+
+    @pytest.mark.asyncio
+    async def test_unwarm(self, provider_mock):
+        """A warmed connection which is not going to be used is closed"""
+        # arrange
+        registry = ConnectionRegistry(max_warm=1)
+
+        async def open_connection():
+            return 'conn'
+        registry.warm(provider_mock, 'foo', open_connection)
+        await asyncio.sleep(0)
+
+        # act
+        await registry.unwarm(provider_mock, 'foo')
+
+        # assert
+        provider_mock.close_connection.assert_awaited_once_with('conn')
+        assert registry.warm(provider_mock, 'bar', open_connection)
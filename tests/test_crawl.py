@@ -10,6 +10,8 @@ from itsybitsy.providers import TimeoutException
 
 import asyncio
 import pytest
+import sys
+from dataclasses import replace
 from unittest.mock import MagicMock
 
 
@@ -18,6 +20,8 @@ def clear_caches():
     """Clear crawl.py caches between tests - otherwise our asserts for function calls may not pass"""
     crawl.service_name_cache = {}
     crawl.child_cache = {}
+    crawl._name_lookups_in_flight = {}
+    crawl._crawls_in_flight = {}
 
 
 @pytest.fixture(autouse=True)
@@ -35,6 +39,7 @@ def provider_mock(mocker, mock_provider_ref) -> MagicMock:
     provider_mock = mocker.patch('itsybitsy.providers.ProviderInterface', autospec=True)
     provider_mock.ref.return_value = mock_provider_ref
     mocker.patch('itsybitsy.providers.get_provider_by_ref', return_value=provider_mock)
+    mocker.patch('itsybitsy.providers.get_registered_provider_refs', return_value=[mock_provider_ref])
 
     return provider_mock
 
@@ -74,6 +79,22 @@ def hint_mock(protocol_fixture, mocker) -> MagicMock:
 @pytest.fixture(autouse=True)
 def set_default_cli_args(cli_args_mock):
     cli_args_mock.obfuscate = False
+    cli_args_mock.crawl_concurrency = 10
+    cli_args_mock.crawl_queue_size = 100
+    cli_args_mock.crawl_order = 'bfs'
+    cli_args_mock.deadline = None
+    cli_args_mock.retry_attempts = 1
+    cli_args_mock.retry_backoff = 0
+    cli_args_mock.retry_backoff_max = 0
+    cli_args_mock.retry_on = []
+    cli_args_mock.instances_per_service = 1
+    cli_args_mock.instances_provider = None
+    cli_args_mock.fan_out_limit = 0
+    cli_args_mock.fan_out_protocol_limits = []
+    cli_args_mock.expand_fan_out = []
+    cli_args_mock.warm_connections = 0
+    cli_args_mock.batch_window = 0
+    cli_args_mock.batch_size = 100
 
 
 # helpers
@@ -160,13 +181,83 @@ async def test_crawl_case_open_connection_handles_timeout(tree, provider_mock, c
 
 @pytest.mark.asyncio
 async def test_crawl_case_open_connection_handles_exceptions(tree, provider_mock, cs_mock):
-    """Handle any other exceptions thrown by ProviderInterface::open_connection by exiting the program"""
+    """Handle any other exceptions thrown by ProviderInterface::open_connection by marking the node"""
     # arrange
     provider_mock.open_connection.side_effect = Exception('BOOM')
 
-    # act/assert
-    with pytest.raises(SystemExit):
-        await crawl.crawl(tree, [])
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'CONNECT_FAILED' in list(tree.values())[0].errors
+    provider_mock.lookup_name.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_open_connection_retried(tree, provider_mock, cs_mock, cli_args_mock):
+    """Retryable exceptions are retried up to --retry-attempts times"""
+    # arrange
+    cli_args_mock.retry_attempts = 3
+    provider_mock.open_connection.side_effect = [TimeoutException, TimeoutException, None]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 3 == provider_mock.open_connection.call_count
+    assert 'TIMEOUT' not in list(tree.values())[0].errors
+    provider_mock.lookup_name.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('retry_on,expected_calls', [([], 1), (['ConnectionError'], 2)])
+async def test_crawl_case_open_connection_retry_on(retry_on, expected_calls, tree, provider_mock, cs_mock,
+                                                   cli_args_mock):
+    """Other exceptions are only retried if configured as retryable"""
+    # arrange
+    cli_args_mock.retry_attempts = 2
+    cli_args_mock.retry_on = retry_on
+    provider_mock.open_connection.side_effect = ConnectionResetError
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert expected_calls == provider_mock.open_connection.call_count
+    assert 'CONNECT_FAILED' in list(tree.values())[0].errors
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_slow_connection_does_not_block_siblings(tree, node_fixture_factory, provider_mock, cs_mock):
+    """Each node is crawled in its own pipeline: a slow connection to one node does not hold up crawl_downstream
+    of its siblings"""
+    # arrange
+    slow_address = 'slow_address'
+    slow_node = node_fixture_factory()
+    slow_node.address = slow_address
+    tree['slow'] = slow_node
+    provider_mock.lookup_name.side_effect = lambda address, _: address
+    cs_mock.providers = [provider_mock.ref()]
+    crawled_addresses = []
+
+    async def open_connection(address):
+        if address == slow_address:
+            await asyncio.sleep(.5)
+
+    async def crawl_downstream(address, _):
+        crawled_addresses.append(address)
+        return []
+    provider_mock.open_connection.side_effect = open_connection
+    provider_mock.crawl_downstream.side_effect = crawl_downstream
+
+    # act
+    crawl_task = asyncio.ensure_future(crawl.crawl(tree, []))
+    await asyncio.sleep(.1)
+
+    # assert
+    assert [list(tree.values())[0].address] == crawled_addresses
+    await crawl_task
+    assert slow_address in crawled_addresses
 
 
 # Calls to ProviderInterface::lookup_name
@@ -187,30 +278,454 @@ async def test_crawl_case_lookup_name_uses_cache(tree, node_fixture_factory, pro
     provider_mock.lookup_name.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_crawl_case_persistent_cache_used(tree, provider_mock, cs_mock, mocker):
+    """Names and children found in the persistent crawl cache are used without opening connections or crawling"""
+    # arrange
+    cached_child = replace(list(tree.values())[0], address=None, errors={'NULL_ADDRESS': True})
+    mocker.patch('itsybitsy.cache.get_name', return_value=(True, 'cached_name'))
+    mocker.patch('itsybitsy.cache.get_children', return_value=(True, {'cached_child': cached_child}))
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.open_connection.assert_not_called()
+    provider_mock.lookup_name.assert_not_called()
+    provider_mock.crawl_downstream.assert_not_called()
+    assert 'cached_name' == list(tree.values())[0].service_name
+    assert ['cached_child'] == list(list(tree.values())[0].children)
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_persistent_cache_written(tree, provider_mock, cs_mock, mocker):
+    """Names and children discovered by crawling are written to the persistent crawl cache"""
+    # arrange
+    put_name = mocker.patch('itsybitsy.cache.put_name')
+    put_children = mocker.patch('itsybitsy.cache.put_children')
+    provider_mock.lookup_name.return_value = 'foo_name'
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    seed = list(tree.values())[0]
+    put_name.assert_called_once_with(seed.address, 'foo_name', seed.protocol.ref)
+    put_children.assert_called_once_with('foo_name', {})
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_resumed_journal_used(tree, provider_mock, cs_mock, mocker):
+    """Names and children replayed from the journal are used without opening connections or crawling"""
+    # arrange
+    mocker.patch('itsybitsy.journal.get_name', return_value=(True, 'journaled_name'))
+    mocker.patch('itsybitsy.journal.get_children', return_value=(True, {}))
+    cache_get_name = mocker.patch('itsybitsy.cache.get_name')
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.open_connection.assert_not_called()
+    provider_mock.crawl_downstream.assert_not_called()
+    cache_get_name.assert_not_called()
+    assert 'journaled_name' == list(tree.values())[0].service_name
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_resumed_journal_timeout(tree, provider_mock, mocker):
+    """Hosts which timed out in the resumed crawl are not contacted again"""
+    # arrange
+    mocker.patch('itsybitsy.journal.timed_out', return_value=True)
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.open_connection.assert_not_called()
+    assert 'TIMEOUT' in list(tree.values())[0].errors
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_journal_written(tree, provider_mock, cs_mock, mocker):
+    """Names, children and connection timeouts discovered by crawling are journaled"""
+    # arrange
+    record_name = mocker.patch('itsybitsy.journal.record_name')
+    record_children = mocker.patch('itsybitsy.journal.record_children')
+    provider_mock.lookup_name.return_value = 'foo_name'
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    seed = list(tree.values())[0]
+    record_name.assert_called_once_with(seed.address, 'foo_name')
+    record_children.assert_called_once_with('foo_name', {})
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_journal_written_timeout(tree, provider_mock, mocker):
+    # arrange
+    record_timeout = mocker.patch('itsybitsy.journal.record_timeout')
+    provider_mock.open_connection.side_effect = asyncio.TimeoutError
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    record_timeout.assert_called_once_with(list(tree.values())[0].address)
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_deadline(tree, provider_mock, cli_args_mock):
+    """When the deadline is reached, in flight work is cancelled and the node is marked"""
+    # arrange
+    cli_args_mock.deadline = .01
+
+    async def slow_open_connection(*_):
+        await asyncio.sleep(10)
+    provider_mock.open_connection.side_effect = slow_open_connection
+
+    # act
+    await asyncio.wait_for(crawl.crawl(tree, []), 1)
+
+    # assert
+    seed = list(tree.values())[0]
+    assert 'DEADLINE' in seed.warnings
+    assert seed.crawl_complete(0)
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_interrupt_partial_tree(tree, provider_mock, cs_mock, node_fixture_factory, mocker):
+    """When interrupted, the partial tree is kept and only the nodes still being crawled are marked"""
+    # arrange
+    child = node_fixture_factory()
+    child.address = 'child_address'
+    mocker.patch('itsybitsy.crawl._create_node', return_value=('child', child))
+    provider_mock.crawl_downstream.return_value = [node.NodeTransport('dummy_mux', 'child_address')]
+    cs_mock.providers = [provider_mock.ref()]
+    cs_mock.protocol = replace(cs_mock.protocol, blocking=True)
+
+    async def open_connection(address):
+        if 'child_address' == address:
+            crawl.interrupt()
+            await asyncio.sleep(10)
+    provider_mock.open_connection.side_effect = open_connection
+
+    # act
+    await asyncio.wait_for(crawl.crawl(tree, []), 1)
+
+    # assert
+    seed = list(tree.values())[0]
+    assert 'DEADLINE' not in seed.warnings
+    assert ['child'] == list(seed.children)
+    assert 'DEADLINE' in seed.children['child'].warnings
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_connection_shared(tree, node_fixture_factory, provider_mock, cs_mock):
+    """Nodes with the same address share one connection, which is closed once all of them are done"""
+    # arrange
+    address = 'shared_address'
+    for i in range(3):
+        sibling = node_fixture_factory()
+        sibling.address = address
+        sibling.protocol_mux = f"mux_{i}"
+        tree[f"sibling_{i}"] = sibling
+
+    async def open_connection(address):
+        await asyncio.sleep(.01)
+        return f"conn_{address}"
+    provider_mock.open_connection.side_effect = open_connection
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert [address] == [c.args[0] for c in provider_mock.open_connection.call_args_list if address == c.args[0]]
+    assert [f"conn_{address}"] == [c.args[0] for c in provider_mock.close_connection.call_args_list
+                                   if f"conn_{address}" == c.args[0]]
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_warm_connections(tree, provider_mock, cs_mock, cli_args_mock, mocker):
+    """With --warm-connections, connections to discovered children are opened before the children are crawled"""
+    # arrange
+    cli_args_mock.warm_connections = 10
+    child_nt = node.NodeTransport('child_mux', 'child_address', 'child')
+    provider_mock.lookup_name.side_effect = lambda address, _: address
+    provider_mock.crawl_downstream.side_effect = lambda address, *_, **__: [child_nt] if '1.2.3.4' == address else []
+    cs_mock.providers = [provider_mock.ref()]
+    warm_spy = mocker.spy(crawl.ConnectionRegistry, 'warm')
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert ['child_address'] == [c.args[2] for c in warm_spy.call_args_list]
+    assert ['1.2.3.4', 'child_address'] == [c.args[0] for c in provider_mock.open_connection.call_args_list]
+    assert 2 == provider_mock.close_connection.await_count
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_batched_name_lookups(tree, node_fixture_factory, provider_mock, cli_args_mock, mocker):
+    """Name lookups of a provider which implements lookup_names() are coalesced into batches"""
+    # arrange
+    cli_args_mock.batch_window = .01
+    for i in range(2):
+        tree[f"seed_{i}"] = replace(node_fixture_factory(), address=f"address_{i}")
+    mocker.patch('itsybitsy.coalesce.implements_batching', side_effect=lambda _, method: 'lookup_names' == method)
+    provider_mock.lookup_names.side_effect = lambda requests: [f"name_{address}" for address, _ in requests]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.lookup_names.assert_called_once()
+    assert {'1.2.3.4', 'address_0', 'address_1'} == {a for a, _ in provider_mock.lookup_names.call_args.args[0]}
+    assert {'name_1.2.3.4', 'name_address_0', 'name_address_1'} == {n.service_name for n in tree.values()}
+    provider_mock.lookup_name.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_prefetch_before_crawling(tree, node_fixture_factory, provider_mock, mock_provider_ref,
+                                                   mocker):
+    """Providers prefetch, with their seeds and the hints they will take, before any seed is crawled"""
+    # arrange
+    tree['other_seed'] = replace(node_fixture_factory(), address='other_address', provider=mock_provider_ref)
+    hint = MagicMock(instance_provider=mock_provider_ref)
+    mocker.patch('itsybitsy.charlotte_web.all_hints', return_value=[hint, MagicMock(instance_provider='other')])
+    calls = []
+    provider_mock.prefetch.side_effect = lambda *_: calls.append('prefetch')
+    provider_mock.lookup_name.side_effect = lambda *_: calls.append('lookup_name')
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.prefetch.assert_called_once_with(['other_address'], [hint])
+    assert ['prefetch', 'lookup_name', 'lookup_name'] == calls
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_prefetch_failure_ignored(tree, provider_mock):
+    """A failed prefetch does not fail the crawl"""
+    # arrange
+    provider_mock.prefetch.side_effect = Exception('BOOM')
+    provider_mock.lookup_name.return_value = 'dummy'
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'dummy' == list(tree.values())[0].service_name
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_shared_subtree_crawled_once(tree, provider_mock, cs_mock):
+    """A service reachable from several parents is crawled once, its subtree is shared by all of the parents"""
+    # arrange
+    parent_nts = [node.NodeTransport(f"mux_{i}", f"parent_address_{i}", f"parent_{i}") for i in range(3)]
+    popular_nt = node.NodeTransport('popular_mux', 'popular_address', 'popular')
+    leaf_nt = node.NodeTransport('leaf_mux', 'leaf_address', 'leaf')
+    names = {'1.2.3.4': 'seed', 'popular_address': 'popular', 'leaf_address': 'leaf',
+             **{f"parent_address_{i}": f"parent_{i}" for i in range(3)}}
+    downstream = {'seed': parent_nts, 'popular': [leaf_nt], 'leaf': [],
+                  **{f"parent_{i}": [popular_nt] for i in range(3)}}
+    provider_mock.lookup_name.side_effect = lambda address, _: names[address]
+    provider_mock.crawl_downstream.side_effect = lambda address, *_, **__: downstream[names[address]]
+    cs_mock.providers = [provider_mock.ref()]
+    cs_mock.protocol = replace(cs_mock.protocol, blocking=True)
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    parents = list(list(tree.values())[0].children.values())
+    popular_children = [list(parent.children.values())[0].children for parent in parents]
+    assert 3 == len(parents)
+    assert all(popular_children[0] is children for children in popular_children)
+    assert ['leaf'] == [child.service_name for child in popular_children[0].values()]
+    assert 1 == [c.args[0] for c in provider_mock.crawl_downstream.call_args_list].count('popular_address')
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_instances_per_service_union(tree, provider_mock, cs_mock, cli_args_mock):
+    """With --instances-per-service, the children of each sampled instance are unioned, and each child records how
+    many of the instances reported it"""
+    # arrange
+    cli_args_mock.instances_per_service = 3
+    cli_args_mock.max_depth = 1
+    provider_mock.lookup_instances.return_value = ['1.2.3.4', 'instance_2', 'instance_3', 'instance_4']
+    everywhere_nt = node.NodeTransport('everywhere_mux', 'everywhere_address', 'everywhere')
+    drifted_nt = node.NodeTransport('drifted_mux', 'drifted_address', 'drifted')
+    downstream = {'1.2.3.4': [everywhere_nt], 'instance_2': [everywhere_nt, drifted_nt], 'instance_3': [everywhere_nt]}
+    provider_mock.crawl_downstream.side_effect = lambda address, *_, **__: downstream[address]
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    children = {child.protocol_mux: child for child in list(tree.values())[0].children.values()}
+    assert (3, 3) == (children['everywhere_mux'].instances_reporting, children['everywhere_mux'].instances_sampled)
+    assert (1, 3) == (children['drifted_mux'].instances_reporting, children['drifted_mux'].instances_sampled)
+    assert ['1.2.3.4', 'instance_2', 'instance_3'] == [c.args[0] for c in provider_mock.crawl_downstream.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_instances_per_service_failed_instance_left_out(tree, provider_mock, cs_mock, cli_args_mock):
+    """An instance which fails to crawl is left out of the sample, rather than failing the node"""
+    # arrange
+    cli_args_mock.instances_per_service = 2
+    cli_args_mock.max_depth = 1
+    provider_mock.lookup_instances.return_value = ['1.2.3.4', 'instance_2']
+    child_nt = node.NodeTransport('child_mux', 'child_address', 'child')
+
+    async def crawl_downstream(address, *_, **__):
+        if 'instance_2' == address:
+            raise Exception('unreachable instance')
+        return [child_nt]
+    provider_mock.crawl_downstream.side_effect = crawl_downstream
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    seed = list(tree.values())[0]
+    child = list(seed.children.values())[0]
+    assert not seed.errors
+    assert (1, 1) == (child.instances_reporting, child.instances_sampled)
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_instances_per_service_default_single_instance(tree, provider_mock, cs_mock):
+    """By default only the one instance is crawled, and instances are not even looked up"""
+    # arrange
+    provider_mock.crawl_downstream.return_value = [node.NodeTransport('child_mux', 'child_address', 'child')]
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    child = list(list(tree.values())[0].children.values())[0]
+    assert child.instances_sampled is None
+    provider_mock.lookup_instances.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_fan_out_folded(tree, provider_mock, cs_mock, cli_args_mock):
+    """Children beyond --fan-out-limit are folded into an aggregate child, which is not crawled"""
+    # arrange
+    cli_args_mock.fan_out_limit = 2
+    child_nts = [node.NodeTransport(f"mux_{i}", f"address_{i}", f"child_{i}") for i in range(10)]
+    provider_mock.lookup_name.side_effect = lambda address, _: 'seed' if '1.2.3.4' == address else address
+    provider_mock.crawl_downstream.side_effect = lambda address, *_, **__: child_nts if '1.2.3.4' == address else []
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    children = list(list(tree.values())[0].children.values())
+    assert 3 == len(children)
+    assert 8 == children[-1].metadata['fan_out_count']
+    assert {'1.2.3.4', 'address_0', 'address_1'} == {c.args[0] for c in provider_mock.lookup_name.call_args_list}
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_shared_subtree_cycle(tree, provider_mock, cs_mock):
+    """A service which reaches its parent (via any path) is marked as a cycle rather than sharing its subtree"""
+    # arrange
+    names = {'1.2.3.4': 'seed', 'a_address': 'a', 'b_address': 'b'}
+    downstream = {'seed': [node.NodeTransport('a_mux', 'a_address', 'a')],
+                  'a': [node.NodeTransport('b_mux', 'b_address', 'b')],
+                  'b': [node.NodeTransport('a_mux', 'a_address', 'a')]}
+    provider_mock.lookup_name.side_effect = lambda address, _: names[address]
+    provider_mock.crawl_downstream.side_effect = lambda address, *_, **__: downstream[names[address]]
+    cs_mock.providers = [provider_mock.ref()]
+    cs_mock.protocol = replace(cs_mock.protocol, blocking=True)
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    a = list(list(tree.values())[0].children.values())[0]
+    b = list(a.children.values())[0]
+    a_again = list(b.children.values())[0]
+    assert 'CYCLE' in a_again.warnings
+    assert not a_again.children
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_lookup_name_single_flight(tree, node_fixture_factory, provider_mock, cs_mock):
+    """Concurrent name lookups for the same address share one in-flight call to lookup_name"""
+    # arrange
+    address = 'shared_address'
+    for i in range(3):
+        sibling = node_fixture_factory()
+        sibling.address = address
+        tree[f"sibling_{i}"] = sibling
+
+    async def slow_lookup_name(*_):
+        await asyncio.sleep(.1)
+        return 'shared_name'
+    provider_mock.lookup_name.side_effect = slow_lookup_name
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 2 == provider_mock.lookup_name.call_count  # 1 for the seed address, 1 shared by all the siblings
+    assert all('shared_name' == tree[f"sibling_{i}"].service_name for i in range(3))
+
+
 @pytest.mark.asyncio
 async def test_crawl_case_lookup_name_handles_timeout(tree, provider_mock, cs_mock, cli_args_mock, mocker):
-    """Timeout is handled during lookup_name and results in a sys.exit"""
+    """Timeout is handled during lookup_name and results in a failed name lookup"""
     # arrange
     cli_args_mock.timeout = .1
 
-    async def slow_lookup_name(address):
+    async def slow_lookup_name(address, connection):
         await asyncio.sleep(1)
     provider_mock.lookup_name = slow_lookup_name
 
-    # act/assert
-    with pytest.raises(SystemExit):
-        await crawl.crawl(tree, [])
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'NAME_LOOKUP_FAILED' in list(tree.values())[0].errors
 
 
 @pytest.mark.asyncio
 async def test_crawl_case_lookup_name_handles_exceptions(tree, provider_mock, cs_mock):
-    """Any exceptions thrown by lookup_name are handled by exiting the program"""
+    """Any exceptions thrown by lookup_name are handled as a failed name lookup"""
     # arrange
     provider_mock.lookup_name.side_effect = Exception('BOOM')
 
-    # act/assert
-    with pytest.raises(SystemExit):
-        await crawl.crawl(tree, [])
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'NAME_LOOKUP_FAILED' in list(tree.values())[0].errors
+    provider_mock.crawl_downstream.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_lookup_name_retried(tree, provider_mock, cs_mock, cli_args_mock):
+    # arrange
+    cli_args_mock.retry_attempts = 2
+    provider_mock.lookup_name.side_effect = [asyncio.TimeoutError, 'foo_name']
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'foo_name' == list(tree.values())[0].service_name
 
 
 # Calls to ProviderInterface::crawl_downstream
@@ -270,9 +785,35 @@ async def test_crawl_case_crawl_downstream_uses_cache(tree, node_fixture_factory
     assert 2 == provider_mock.crawl_downstream.call_count
 
 
+@pytest.mark.asyncio
+async def test_crawl_case_crawl_downstream_single_flight(tree, node_fixture_factory, provider_mock, cs_mock):
+    """Concurrent crawls of the same service share one in-flight crawl_downstream, and the nodes share the children"""
+    # arrange
+    node2 = node_fixture_factory()
+    node2.address = 'different_address_same_service'
+    tree['dummy2'] = node2
+    child_nt = node.NodeTransport('foo_mux')
+    provider_mock.lookup_name.return_value = 'shared_name'
+    cs_mock.providers = [provider_mock.ref()]
+
+    async def slow_crawl_downstream(*_, **__):
+        await asyncio.sleep(.1)
+        return [child_nt]
+    provider_mock.crawl_downstream.side_effect = slow_crawl_downstream
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    provider_mock.crawl_downstream.assert_called_once()
+    seed_children, node2_children = [list(n.children.values()) for n in tree.values()]
+    assert 1 == len(seed_children) == len(node2_children)
+    assert seed_children[0] is node2_children[0]
+
+
 @pytest.mark.asyncio
 async def test_crawl_case_crawl_downstream_handles_timeout(tree, provider_mock, cs_mock, cli_args_mock, mocker):
-    """Timeout is respected during crawl_downstream and results in a sys.exit"""
+    """Timeout is respected during crawl_downstream and results in an error on the node"""
     # arrange
     cli_args_mock.timeout = .1
 
@@ -282,24 +823,43 @@ async def test_crawl_case_crawl_downstream_handles_timeout(tree, provider_mock,
     provider_mock.crawl_downstream.side_effect = slow_crawl_downstream
     cs_mock.providers = [provider_mock.ref()]
 
-    # act/assert
-    with pytest.raises(SystemExit) as e:
-        await crawl.crawl(tree, [])
+    # act
+    await crawl.crawl(tree, [])
 
-    assert True
+    # assert
+    assert 'CRAWL_FAILED' in list(tree.values())[0].errors
 
 
 @pytest.mark.asyncio
 async def test_crawl_case_crawl_downstream_handles_exceptions(tree, provider_mock, cs_mock, cli_args_mock, mocker):
-    """Any exceptions thrown by crawl_downstream are handled by exiting the program"""
+    """Any exceptions thrown by crawl_downstream are handled by an error on the node, the results are not cached"""
     # arrange
-    cli_args_mock.timeout = .1
     provider_mock.lookup_name.return_value = 'dummy'
-    provider_mock.open_connection.side_effect = Exception('BOOM')
+    provider_mock.crawl_downstream.side_effect = Exception('BOOM')
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 'CRAWL_FAILED' in list(tree.values())[0].errors
+    assert 'dummy' not in crawl.child_cache
 
-    # act/assert
-    with pytest.raises(SystemExit):
-        await crawl.crawl(tree, [])
+
+@pytest.mark.asyncio
+async def test_crawl_case_crawl_downstream_retried(tree, provider_mock, cs_mock, cli_args_mock):
+    # arrange
+    cli_args_mock.retry_attempts = 2
+    provider_mock.lookup_name.return_value = 'dummy'
+    provider_mock.crawl_downstream.side_effect = [TimeoutException, []]
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 2 == provider_mock.crawl_downstream.call_count
+    assert {} == list(tree.values())[0].children
 
 
 # handle Cycles
@@ -393,6 +953,48 @@ async def test_crawl_case_children_with_address_crawled(tree, provider_mock, cs_
     assert list(tree.values())[0].service_name == crawl_spy.await_args.args[1][0]
 
 
+@pytest.mark.asyncio
+async def test_crawl_case_returns_when_whole_graph_crawled(tree, provider_mock, cs_mock):
+    """The root crawl() owns all descendant crawls - it only returns once grandchildren have been crawled"""
+    # arrange
+    child_nt = node.NodeTransport('dummy_protocol_mux', 'dummy_address')
+    grandchild_nt = node.NodeTransport('dummy_protocol_mux_gc', 'dummy_address_gc')
+    provider_mock.lookup_name.side_effect = ['seed_name', 'child_name', 'grandchild_name']
+    provider_mock.crawl_downstream.side_effect = [[child_nt], [grandchild_nt], []]
+    cs_mock.providers = [provider_mock.ref()]
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    child = list(list(tree.values())[0].children.values())[0]
+    grandchild = list(child.children.values())[0]
+    assert 'grandchild_name' == grandchild.service_name
+    assert {} == grandchild.children
+
+
+@pytest.mark.asyncio
+async def test_crawl_case_descendant_exceptions_propagate(tree, provider_mock, cs_mock, mocker):
+    """Unexpected exceptions (i.e. not from providers) raised crawling descendants are not lost, they propagate to the
+    root crawl() and exit"""
+    # arrange
+    child_nt = node.NodeTransport('dummy_protocol_mux', 'dummy_address')
+    provider_mock.lookup_name.side_effect = ['seed_name', 'child_name']
+    provider_mock.crawl_downstream.side_effect = [[child_nt], []]
+    cs_mock.providers = [provider_mock.ref()]
+    assign_name = crawl._assign_name_and_detect_cycle
+
+    def assign_name_boom_for_descendants(node_ref, node, service_name, ancestors):
+        if ancestors:
+            raise Exception('BOOM')
+        assign_name(node_ref, node, service_name, ancestors)
+    mocker.patch('itsybitsy.crawl._assign_name_and_detect_cycle', side_effect=assign_name_boom_for_descendants)
+
+    # act/assert
+    with pytest.raises(SystemExit):
+        await crawl.crawl(tree, [])
+
+
 @pytest.mark.asyncio
 async def test_crawl_case_children_without_address_not_crawled(tree, provider_mock, cs_mock, event_loop,
                                                                mocker):
@@ -511,6 +1113,26 @@ async def test_crawl_case_respect_cli_disable_providers(tree, provider_mock, cs_
     assert 1 == crawl_spy.call_count
 
 
+@pytest.mark.asyncio
+async def test_crawl_case_disabled_provider_not_looked_up(tree, provider_mock, cs_mock, cli_args_mock, mocker):
+    """Disabled providers are not registered, children which use them are excluded without looking up the provider -
+    which would exit"""
+    # arrange
+    disable_this_provider = 'foo_provider'
+    cli_args_mock.disable_providers = [disable_this_provider]
+    provider_mock.lookup_name.return_value = 'bar_name'
+    provider_mock.crawl_downstream.return_value = [node.NodeTransport('dummy_mux', 'dummy_address')]
+    cs_mock.determine_child_provider.return_value = disable_this_provider
+    mocker.patch('itsybitsy.providers.get_provider_by_ref',
+                 side_effect=lambda ref: sys.exit(1) if ref == disable_this_provider else provider_mock)
+
+    # act
+    await crawl.crawl(tree, [])
+
+    # assert
+    assert 0 == len(list(tree.values())[0].children)
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize('child_blocking,grandchild_blocking,crawls_expected,downstream_crawls_expected',
                          [(False, False, 2, 1), (True, False, 2, 2)])
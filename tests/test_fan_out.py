@@ -0,0 +1,74 @@
+import pytest
+from dataclasses import replace
+
+from itsybitsy import fan_out
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.fan_out_limit = 2
+    cli_args_mock.fan_out_protocol_limits = []
+    cli_args_mock.expand_fan_out = []
+
+
+@pytest.fixture
+def children(node_fixture_factory) -> dict:
+    return {f"child_{i}": replace(node_fixture_factory(), protocol_mux=f"mux_{i}", address=f"address_{i}")
+            for i in range(5)}
+
+
+def test_fold_case_overflow_aggregated(children, dummy_protocol_ref):
+    """Children beyond the limit are folded into one aggregate child, which records their count and a sample"""
+    # act
+    folded = fan_out.fold('hub', children)
+
+    # assert
+    aggregate = folded[f"{dummy_protocol_ref}_FAN_OUT"]
+    assert ['child_0', 'child_1', f"{dummy_protocol_ref}_FAN_OUT"] == list(folded)
+    assert 3 == aggregate.metadata['fan_out_count']
+    assert ['address_2', 'address_3', 'address_4'] == aggregate.metadata['fan_out_addresses']
+    assert aggregate.address is None
+    assert aggregate.warnings['FAN_OUT']
+    assert not aggregate.is_crawlable(1)
+
+
+def test_fold_case_unlimited(children, cli_args_mock):
+    """A limit of 0 is unlimited"""
+    # arrange
+    cli_args_mock.fan_out_limit = 0
+
+    # act/assert
+    assert children == fan_out.fold('hub', children)
+
+
+def test_fold_case_protocol_limit(children, cli_args_mock, dummy_protocol_ref):
+    """Per protocol limits override --fan-out-limit"""
+    # arrange
+    cli_args_mock.fan_out_protocol_limits = [f"{dummy_protocol_ref}=4"]
+
+    # act
+    folded = fan_out.fold('hub', children)
+
+    # assert
+    assert 1 == folded[f"{dummy_protocol_ref}_FAN_OUT"].metadata['fan_out_count']
+
+
+def test_fold_case_expanded(children, cli_args_mock):
+    """Services listed in --expand-fan-out are never folded"""
+    # arrange
+    cli_args_mock.expand_fan_out = ['hub']
+
+    # act/assert
+    assert children == fan_out.fold('hub', children)
+
+
+def test_fold_case_hints_not_folded(children):
+    """Hints are configured explicitly, so they are neither folded nor counted against the limit"""
+    # arrange
+    children = {'hint': replace(children['child_4'], from_hint=True), **children}
+
+    # act
+    folded = fan_out.fold('hub', children)
+
+    # assert
+    assert ['hint', 'child_0', 'child_1'] == [ref for ref in folded if not ref.endswith('FAN_OUT')]
@@ -0,0 +1,81 @@
+import pytest
+from dataclasses import replace
+
+from itsybitsy.ancestors import Ancestors
+from itsybitsy.graph import GraphStore
+
+
+class TestGraphStore:
+    def test_visit_case_shared(self, node_fixture_factory):
+        """The first node of a (protocol, service) is canonical, subsequent nodes share its vertex"""
+        # arrange
+        graph = GraphStore()
+        first, second = node_fixture_factory(), node_fixture_factory()
+        first.service_name = second.service_name = 'foo'
+
+        # act
+        first_vertex, first_canonical = graph.visit(first, 1, Ancestors())
+        second_vertex, second_canonical = graph.visit(second, 2, Ancestors())
+
+        # assert
+        assert (first_canonical, second_canonical) == (True, False)
+        assert first_vertex is second_vertex
+
+    @pytest.mark.parametrize('first_depth,second_depth', [(2, 1), (0, 1), (1, 0)])
+    def test_visit_case_not_shared(self, first_depth, second_depth, node_fixture_factory):
+        """Children crawled deeper in the tree, or between seeds and descendants, are not shared"""
+        # arrange
+        graph = GraphStore()
+        first, second = node_fixture_factory(), node_fixture_factory()
+        first.service_name = second.service_name = 'foo'
+
+        # act
+        graph.visit(first, first_depth, Ancestors())
+        _, canonical = graph.visit(second, second_depth, Ancestors())
+
+        # assert
+        assert canonical
+
+    def test_visit_case_different_protocols(self, node_fixture_factory, protocol_fixture):
+        # arrange
+        graph = GraphStore()
+        first, second = node_fixture_factory(), node_fixture_factory()
+        first.service_name = second.service_name = 'foo'
+        second.protocol = replace(protocol_fixture, ref='BAR')
+
+        # act
+        graph.visit(first, 1, Ancestors())
+        _, canonical = graph.visit(second, 1, Ancestors())
+
+        # assert
+        assert canonical
+
+    def test_visit_case_shallower_replaces(self, node_fixture_factory):
+        """A shallower node becomes the canonical node of the vertex, shared by nodes at intermediate depths"""
+        # arrange
+        graph = GraphStore()
+        nodes = [node_fixture_factory() for _ in range(4)]
+        for node in nodes:
+            node.service_name = 'foo'
+
+        # act
+        canonicals = [graph.visit(node, depth, Ancestors())[1] for node, depth in zip(nodes, [5, 2, 3, 3])]
+
+        # assert
+        assert [True, True, False, False] == canonicals
+
+    def test_visit_case_sharing_would_cycle(self, node_fixture_factory):
+        """A node does not share the children of a service which calls one of its ancestors, it crawls instead"""
+        # arrange
+        graph = GraphStore()
+        first, second = node_fixture_factory(), node_fixture_factory()
+        first.service_name = second.service_name = 'foo'
+        graph.add_edge('foo', 'bar')
+        graph.add_edge('bar', 'baz')
+        graph.visit(first, 1, Ancestors.of(['seed']))
+
+        # act
+        _, canonical = graph.visit(second, 3, Ancestors.of(['seed', 'baz', 'qux']))
+
+        # assert
+        assert canonical
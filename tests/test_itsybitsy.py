@@ -0,0 +1,184 @@
+import asyncio
+import pytest
+import signal
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, MagicMock
+
+from itsybitsy import cache, cassette, itsybitsy, node
+from itsybitsy.plugins import render_json
+
+
+class InProcessExecutor:
+    """Stands in for the ProcessPoolExecutor of --workers: runs the shards in this process, one after the other"""
+    def __init__(self, *_, **__):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    @staticmethod
+    def submit(fn, *args) -> Future:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock, tmp_path, mocker):
+    cli_args_mock.quiet = True
+    cli_args_mock.debug = False
+    cli_args_mock.replay = None
+    cli_args_mock.record = None
+    cli_args_mock.resume = False
+    cli_args_mock.cache_mode = cache.MODE_OFF
+    cli_args_mock.cache_ttl = 60
+    cli_args_mock.cache_protocol_ttls = []
+    cli_args_mock.child_cache_mb = 0
+    mocker.patch('itsybitsy.itsybitsy.constants.JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+    mocker.patch('itsybitsy.itsybitsy.crawl.child_cache', cache.ChildCache())
+    mocker.patch('itsybitsy.itsybitsy.constants.CRAWL_CACHE_FILE', str(tmp_path / 'crawl_cache.sqlite'))
+
+
+@pytest.fixture(autouse=True)
+def mock_plugins(mocker):
+    """The shards do not import plugins or charlotte, nor register providers"""
+    mocker.patch('itsybitsy.itsybitsy.plugin_core.import_plugin_classes')
+    mocker.patch('itsybitsy.itsybitsy.charlotte.init')
+    mocker.patch('itsybitsy.itsybitsy._register_providers')
+    provider_mock = MagicMock()
+    provider_mock.is_container_platform.return_value = False
+    mocker.patch('itsybitsy.itsybitsy.providers.get_provider_by_ref', return_value=provider_mock)
+
+
+@pytest.fixture
+def crawl_mock(mocker) -> MagicMock:
+    """Names each seed by its address, or by the name of the first seed crawled if it is in the crawl cache"""
+    async def _crawl(tree, _):
+        for seed in tree.values():
+            hit, service_name = cache.get_name('first')
+            seed.service_name = service_name if hit else f"service-{seed.address}"
+            if not hit:
+                cache.put_name('first', seed.service_name, seed.protocol.ref)
+    return mocker.patch('itsybitsy.itsybitsy.crawl.crawl', side_effect=_crawl)
+
+
+@pytest.fixture
+def process_pool_mock(mocker) -> MagicMock:
+    return mocker.patch('itsybitsy.itsybitsy.ProcessPoolExecutor', side_effect=InProcessExecutor)
+
+
+def test_crawl_shard(cli_args_mock, crawl_mock):
+    # arrange
+    seeds = ['dummy:1.2.3.4', 'dummy:5.6.7.8']
+
+    # act
+    tree = render_json.loads(itsybitsy._crawl_shard(cli_args_mock, seeds, 0))
+
+    # assert
+    assert {'SEED:1.2.3.4', 'SEED:5.6.7.8'} == set(tree)
+    assert 'service-1.2.3.4' == tree['SEED:1.2.3.4'].service_name
+    assert cli_args_mock.quiet
+
+
+def test_crawl_shards_case_merged(cli_args_mock, crawl_mock, process_pool_mock):
+    """The seeds are sharded round robin across the --workers, and their trees are merged"""
+    # arrange
+    cli_args_mock.workers = 2
+    seeds = ['dummy:1.1.1.1', 'dummy:2.2.2.2', 'dummy:3.3.3.3']
+
+    # act
+    tree = itsybitsy._crawl_shards(seeds)
+
+    # assert
+    process_pool_mock.assert_called_once()
+    assert [['1.1.1.1', '3.3.3.3'], ['2.2.2.2']] == [[seed.address for seed in call.args[0].values()]
+                                                     for call in crawl_mock.call_args_list]
+    assert {'SEED:1.1.1.1', 'SEED:2.2.2.2', 'SEED:3.3.3.3'} == set(tree)
+
+
+@pytest.mark.parametrize('cache_mode,expected_shared', [(cache.MODE_OFF, True), (cache.MODE_READ_WRITE, True),
+                                                        (cache.MODE_READ, False)])
+def test_crawl_shards_case_cache_shared(cache_mode, expected_shared, cli_args_mock, crawl_mock, process_pool_mock):
+    """A worker uses the names cached by another worker, with --cache-mode off through a cache for the run only"""
+    # arrange
+    cli_args_mock.workers = 2
+    cli_args_mock.cache_mode = cache_mode
+
+    # act
+    tree = itsybitsy._crawl_shards(['dummy:1.1.1.1', 'dummy:2.2.2.2'])
+
+    # assert
+    assert ('service-1.1.1.1' == tree['SEED:2.2.2.2'].service_name) == expected_shared
+
+
+@pytest.mark.parametrize('inventory_seed_provider,expected_provider', [(None, 'aws'), ('ssh', 'ssh')])
+def test_inventory_seeds(inventory_seed_provider, expected_provider, cli_args_mock, mocker):
+    """One seed per service, the instance with the lowest address, crawled with the --inventory-seed-provider"""
+    # arrange
+    cli_args_mock.inventory_seed_provider = inventory_seed_provider
+    provider_mock = MagicMock()
+    provider_mock.inventory = AsyncMock(return_value=[
+        node.NodeTransport('seed', '2.2.2.2', 'foo'), node.NodeTransport('seed', '1.1.1.1', 'foo'),
+        node.NodeTransport('seed', '3.3.3.3', 'bar'), node.NodeTransport('seed', '4.4.4.4', None)
+    ])
+    get_provider_mock = mocker.patch('itsybitsy.itsybitsy.providers.get_provider_by_ref', return_value=provider_mock)
+
+    # act
+    seeds = itsybitsy._inventory_seeds('aws')
+
+    # assert
+    get_provider_mock.assert_called_once_with('aws')
+    assert [f"{expected_provider}:3.3.3.3", f"{expected_provider}:1.1.1.1"] == seeds
+
+
+def test_inventory_seeds_case_replayed(cli_args_mock, tmp_path, mocker):
+    """The inventory is recorded with --record, and replayed with --replay"""
+    # arrange
+    cli_args_mock.inventory_seed_provider = None
+    cli_args_mock.replay_latency_scale = 0
+    provider_mock = MagicMock()
+    provider_mock.ref.return_value = 'aws'
+    provider_mock.is_container_platform.return_value = False
+    provider_mock.retryable_exceptions.return_value = ()
+    provider_mock.inventory = AsyncMock(return_value=[node.NodeTransport('seed', '1.1.1.1', 'foo')])
+    mocker.patch('itsybitsy.cassette.get_registered_provider_refs', return_value=['aws'])
+    mocker.patch('itsybitsy.cassette.get_provider_by_ref', return_value=provider_mock)
+    get_provider_mock = mocker.patch('itsybitsy.itsybitsy.providers.get_provider_by_ref', return_value=provider_mock)
+    register_provider_mock = mocker.patch('itsybitsy.cassette.register_provider')
+    cli_args_mock.record = str(tmp_path)
+    itsybitsy._inventory_seeds('aws')
+    cli_args_mock.record = None
+    cassette.register_replay_providers(str(tmp_path))
+    get_provider_mock.return_value = register_provider_mock.call_args.args[0]
+
+    # act
+    seeds = itsybitsy._inventory_seeds('aws')
+
+    # assert
+    assert ['aws:1.1.1.1'] == seeds
+    provider_mock.inventory.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_crawl_and_render_case_no_signal_handlers(mocker):
+    """Where the event loop does not support signal handlers (windows) ctrl-c still interrupts the crawl"""
+    # arrange
+    loop = asyncio.get_event_loop()
+    mocker.patch.object(loop, 'add_signal_handler', side_effect=NotImplementedError)
+    mocker.patch.object(loop, 'remove_signal_handler', side_effect=NotImplementedError)
+    interrupt_mock = mocker.patch('itsybitsy.itsybitsy.crawl.interrupt')
+
+    async def _crawl(*_):
+        signal.getsignal(signal.SIGINT)(signal.SIGINT, None)
+        await asyncio.sleep(0)
+    mocker.patch('itsybitsy.itsybitsy.crawl.crawl', side_effect=_crawl)
+
+    # act
+    await itsybitsy._crawl_and_render_to_stderr_unless_quiet_is_specified({})
+
+    # assert
+    interrupt_mock.assert_called_once()
+    assert itsybitsy._exit_on_sigint == signal.getsignal(signal.SIGINT)
@@ -0,0 +1,104 @@
+import os
+import pytest
+
+from itsybitsy import journal
+
+
+@pytest.fixture
+def journal_file(tmp_path) -> str:
+    return os.path.join(tmp_path, 'stub.jsonl')
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock):
+    cli_args_mock.resume = False
+
+
+@pytest.fixture(autouse=True)
+def close_journal():
+    yield
+    journal.close()
+
+
+def _record_and_resume(journal_file, cli_args_mock, record) -> None:
+    journal.init(journal_file)
+    record()
+    journal.close()
+    cli_args_mock.resume = True
+    journal.init(journal_file)
+
+
+def test_get_name_case_resumed(journal_file, cli_args_mock):
+    """Names, and failed name lookups, are replayed"""
+    # arrange/act
+    _record_and_resume(journal_file, cli_args_mock,
+                       lambda: (journal.record_name('1.2.3.4', 'foo'), journal.record_name('5.6.7.8', None)))
+
+    # assert
+    assert (True, 'foo') == journal.get_name('1.2.3.4')
+    assert (True, None) == journal.get_name('5.6.7.8')
+    assert (False, None) == journal.get_name('9.9.9.9')
+
+
+def test_get_children_case_resumed(journal_file, cli_args_mock, node_fixture):
+    """Children are replayed as Node()s"""
+    # arrange
+    node_fixture.warnings = {'DEFUNCT': True}
+
+    # act
+    _record_and_resume(journal_file, cli_args_mock, lambda: journal.record_children('foo', {'bar': node_fixture}))
+
+    # assert
+    assert (True, {'bar': node_fixture}) == journal.get_children('foo')
+
+
+def test_timed_out_case_resumed(journal_file, cli_args_mock):
+    # arrange/act
+    _record_and_resume(journal_file, cli_args_mock, lambda: journal.record_timeout('1.2.3.4'))
+
+    # assert
+    assert journal.timed_out('1.2.3.4')
+    assert not journal.timed_out('5.6.7.8')
+
+
+def test_init_case_not_resumed(journal_file, cli_args_mock):
+    """Without --resume, the previous journal is discarded"""
+    # arrange
+    journal.init(journal_file)
+    journal.record_name('1.2.3.4', 'foo')
+    journal.close()
+
+    # act
+    journal.init(journal_file)
+
+    # assert
+    assert (False, None) == journal.get_name('1.2.3.4')
+    assert 0 == os.path.getsize(journal_file)
+
+
+def test_init_case_resumed_incomplete_entry(journal_file, cli_args_mock):
+    """An entry partially written when the crawl crashed is skipped"""
+    # arrange
+    journal.init(journal_file)
+    journal.record_name('1.2.3.4', 'foo')
+    journal.close()
+    with open(journal_file, 'a') as f:
+        f.write('{"type": "name", "addr')
+
+    # act
+    cli_args_mock.resume = True
+    journal.init(journal_file)
+
+    # assert
+    assert (True, 'foo') == journal.get_name('1.2.3.4')
+
+
+def test_init_case_resumed_no_journal(journal_file, cli_args_mock):
+    # arrange
+    cli_args_mock.resume = True
+
+    # act
+    journal.init(journal_file)
+
+    # assert
+    assert (False, None) == journal.get_name('1.2.3.4')
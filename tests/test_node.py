@@ -1,4 +1,8 @@
+import asyncio
 import pytest
+from dataclasses import asdict, replace
+
+from itsybitsy.node import Node
 
 
 class TestNode:
@@ -118,7 +122,7 @@ class TestNode:
         """Crawl is not complete if name lookup is incomplete"""
         # arrange
         cli_args_mock.skip_nonblocking_grandchildren = False
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=False)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=False)
 
         # act/assert
         assert not node_fixture.crawl_complete(depth=0)
@@ -126,7 +130,7 @@ class TestNode:
     def test_crawl_complete_case_max_depth_reached(self, cli_args_mock, node_fixture, mocker):
         """Crawl is complete when max_depth is reached"""
         # arrange
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=True)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=True)
         cli_args_mock.max_depth = 42
 
         # act/assert
@@ -135,7 +139,7 @@ class TestNode:
     def test_crawl_complete_case_skip_service_name(self, node_fixture, mocker):
         """Crawl is complete if the service is configured to not be crawled"""
         # arrange
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=True)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=True)
         node_fixture.service_name = 'stub'
         skip = mocker.patch('itsybitsy.node.charlotte_web.skip_service_name', return_value=True)
 
@@ -147,7 +151,7 @@ class TestNode:
         """Crawl is complete if the service is nonblocking and a grandchild, if respective CLI arg specified"""
         # arrange
         cli_args_mock.skip_nonblocking_grandchildren = True
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=False)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=False)
         node_fixture.protocol = mocker.patch('itsybitsy.charlotte_web.Protocol', autospec=True, blocking=False)
 
         # act/assert
@@ -157,7 +161,7 @@ class TestNode:
     def test_crawl_complete_case_children(self, children, expected, node_fixture, mocker):
         """Crawl is complete when children dict is present.  Here `None` has a different meaning than `{}`"""
         # arrange
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=True)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=True)
         node_fixture.children = children
 
         # act/assert
@@ -167,7 +171,7 @@ class TestNode:
     def test_crawl_complete_case_errors(self, errors, expected, node_fixture, mocker):
         """Crawl is complete if errors have been encountered"""
         # arrange
-        node_fixture.name_lookup_complete = mocker.Mock(return_value=True)
+        mocker.patch.object(Node, 'name_lookup_complete', return_value=True)
         node_fixture.errors = errors
 
         # act/assert
@@ -210,3 +214,119 @@ class TestNode:
 
         # act/assert
         assert node_fixture.name_lookup_complete()
+
+    # completion signals
+    @pytest.mark.asyncio
+    async def test_wait_for_name_lookup_case_signalled(self, node_fixture):
+        """Waiting for name lookup resolves once crawl signals name lookup is complete"""
+        # arrange
+        node_fixture.service_name = None
+        waiter = asyncio.ensure_future(node_fixture.wait_for_name_lookup())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        # act
+        node_fixture.service_name = 'stub'
+        node_fixture.signal_name_lookup_complete()
+
+        # assert
+        await asyncio.wait_for(waiter, .1)
+
+    @pytest.mark.asyncio
+    async def test_wait_for_crawl_case_signalled(self, node_fixture, mocker):
+        """Waiting for crawl resolves once crawl signals it is finished with the node, children or not"""
+        # arrange
+        node_fixture.service_name = 'stub'
+        mocker.patch.object(Node, 'is_crawlable', return_value=True)
+        waiter = asyncio.ensure_future(node_fixture.wait_for_crawl(0))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        # act
+        node_fixture.signal_crawl_complete()
+
+        # assert
+        await asyncio.wait_for(waiter, .1)
+        assert node_fixture.crawl_complete(0)
+
+    # errors/warnings
+    def test_errors_case_dict_access(self, node_fixture):
+        """Known codes (stored as bits) and unknown codes (overflow) behave as a dict"""
+        # arrange/act
+        node_fixture.errors['TIMEOUT'] = True
+        node_fixture.errors['FOO'] = True
+
+        # assert
+        assert {'TIMEOUT': True, 'FOO': True} == node_fixture.errors
+        assert 'TIMEOUT' in node_fixture.errors and 'FOO' in node_fixture.errors
+        assert node_fixture.errors.get('TIMEOUT') and node_fixture.errors.get('CYCLE') is None
+        assert ['TIMEOUT', 'FOO'] == list(node_fixture.errors)
+        assert 2 == len(node_fixture.errors)
+        assert {} == node_fixture.warnings and not node_fixture.warnings
+
+    def test_errors_case_delete(self, node_fixture):
+        # arrange
+        node_fixture.errors = {'TIMEOUT': True, 'FOO': True}
+
+        # act
+        del node_fixture.errors['TIMEOUT']
+        del node_fixture.errors['FOO']
+
+        # assert
+        assert not node_fixture.errors
+        with pytest.raises(KeyError):
+            del node_fixture.errors['TIMEOUT']
+
+    def test_warnings_case_non_true_value(self, node_fixture):
+        """Values other than True are kept as they are"""
+        # arrange
+        node_fixture.warnings['DEFUNCT'] = True
+
+        # act
+        node_fixture.warnings['DEFUNCT'] = 'foo'
+
+        # assert
+        assert {'DEFUNCT': 'foo'} == node_fixture.warnings
+
+    def test_warnings_case_copy_is_independent(self, node_fixture):
+        # arrange
+        node_fixture.warnings['CYCLE'] = True
+
+        # act
+        copied = node_fixture.warnings.copy()
+        node_fixture.warnings['DEFUNCT'] = True
+
+        # assert
+        assert {'CYCLE': True} == copied
+
+    def test_asdict_case_plain_dicts(self, node_fixture):
+        """Serialization sees errors/warnings as plain dicts"""
+        # arrange
+        node_fixture.errors['TIMEOUT'] = True
+
+        # act
+        node_dict = asdict(node_fixture)
+
+        # assert
+        assert {'TIMEOUT': True} == node_dict['errors'] and isinstance(node_dict['errors'], dict)
+        assert {} == node_dict['warnings'] and isinstance(node_dict['warnings'], dict)
+
+    def test_replace_case_codes_copied(self, node_fixture):
+        # arrange
+        node_fixture.errors['TIMEOUT'] = True
+
+        # act
+        copied = replace(node_fixture)
+        copied.errors['CYCLE'] = True
+
+        # assert
+        assert {'TIMEOUT': True} == node_fixture.errors
+        assert {'TIMEOUT': True, 'CYCLE': True} == copied.errors
+
+    def test_node_case_slotted(self, node_fixture):
+        """Nodes have no per instance __dict__, nor a metadata dict unless they have metadata"""
+        # act/assert
+        assert not hasattr(node_fixture, '__dict__')
+        assert node_fixture.metadata is None
+        with pytest.raises(AttributeError):
+            node_fixture.foo = 'bar'
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import pytest
+
+from itsybitsy import provider_cache
+
+
+class StubProvider:
+    """Not a ProviderInterface, which would register it as a plugin"""
+    def __init__(self):
+        self.calls = []
+
+    @staticmethod
+    def ref() -> str:
+        return 'stub'
+
+    @provider_cache.cached(ttl=60, negative_ttl=-1, max_entries=2, key=lambda address, _: address)
+    async def lookup_name(self, address, connection):
+        self.calls.append(address)
+        await asyncio.sleep(0)
+        if 'bad' == address:
+            raise Exception('BOOM')
+        return None if 'unknown' == address else f"name_{address}"
+
+
+@pytest.fixture(autouse=True)
+def set_default_cli_args(cli_args_mock, tmp_path, mocker):
+    cli_args_mock.provider_cache = provider_cache.MODE_MEMORY
+    cli_args_mock.provider_cache_ttls = []
+    mocker.patch('itsybitsy.provider_cache.constants.PROVIDER_CACHE_FILE', os.path.join(tmp_path, 'stub.sqlite'))
+
+
+@pytest.fixture(autouse=True)
+def close_cache():
+    yield
+    provider_cache.close()
+
+
+@pytest.fixture
+def provider() -> StubProvider:
+    return StubProvider()
+
+
+@pytest.mark.asyncio
+async def test_cached_case_hit(provider):
+    """The provider is called once per key, not per connection, and hits/misses are counted"""
+    # arrange/act
+    names = [await provider.lookup_name('foo', connection) for connection in ['conn_1', 'conn_2']]
+
+    # assert
+    assert ['name_foo', 'name_foo'] == names
+    assert ['foo'] == provider.calls
+    assert {'hit': 1, 'miss': 1} == provider_cache.stats()['stub.lookup_name']
+
+
+@pytest.mark.asyncio
+async def test_cached_case_concurrent_calls_share_one_call(provider):
+    # arrange/act
+    names = await asyncio.gather(*[provider.lookup_name('foo', None) for _ in range(3)])
+
+    # assert
+    assert ['name_foo'] * 3 == names
+    assert ['foo'] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_negative_ttl(provider):
+    """Empty results are cached with the negative TTL"""
+    # arrange/act
+    for _ in range(2):
+        assert await provider.lookup_name('unknown', None) is None
+
+    # assert
+    assert ['unknown', 'unknown'] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_exceptions_not_cached(provider):
+    # arrange/act
+    for _ in range(2):
+        with pytest.raises(Exception, match='BOOM'):
+            await provider.lookup_name('bad', None)
+
+    # assert
+    assert ['bad', 'bad'] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_max_entries(provider):
+    """The least recently used entry is evicted beyond max_entries"""
+    # arrange
+    for address in ['foo', 'bar', 'foo', 'baz']:
+        await provider.lookup_name(address, None)
+
+    # act/assert
+    assert provider.lookup_name.in_cache('foo', None)
+    assert not provider.lookup_name.in_cache('bar', None)
+
+
+@pytest.mark.asyncio
+async def test_cached_case_ttl_override(provider, cli_args_mock):
+    # arrange
+    cli_args_mock.provider_cache_ttls = ['other.lookup_name=60', 'stub.lookup_name=-1']
+
+    # act
+    for _ in range(2):
+        await provider.lookup_name('foo', None)
+
+    # assert
+    assert ['foo', 'foo'] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_primed(provider):
+    # arrange
+    provider.lookup_name.prime('primed_name', 'foo', None)
+
+    # act/assert
+    assert provider.lookup_name.in_cache('foo', None)
+    assert 'primed_name' == await provider.lookup_name('foo', None)
+    assert [] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_off(provider, cli_args_mock):
+    # arrange
+    cli_args_mock.provider_cache = provider_cache.MODE_OFF
+
+    # act
+    for _ in range(2):
+        await provider.lookup_name('foo', None)
+
+    # assert
+    assert ['foo', 'foo'] == provider.calls
+
+
+@pytest.mark.asyncio
+async def test_cached_case_disk_persisted(provider, cli_args_mock):
+    """With the disk backend, results survive across runs"""
+    # arrange
+    cli_args_mock.provider_cache = provider_cache.MODE_DISK
+    await provider.lookup_name('foo', None)
+    provider_cache.close()
+    provider = StubProvider()
+
+    # act/assert
+    assert 'name_foo' == await provider.lookup_name('foo', None)
+    assert [] == provider.calls
@@ -1,4 +1,6 @@
 import pytest
+import threading
+from unittest.mock import MagicMock
 
 from itsybitsy import providers, node
 
@@ -14,6 +16,12 @@ def provider_interface():
 
 
 class TestProviderInterface:
+    @pytest.mark.asyncio
+    async def test_prefetch(self, provider_interface):
+        """Default behavior of provider is an acceptable no-op for prefetching.  It is optional"""
+        # arrange/act/assert
+        assert await provider_interface.prefetch(['dummy'], []) is None
+
     @pytest.mark.asyncio
     async def test_open_connection(self, provider_interface):
         """Default behavior of provider is an acceptable return of None for connection.  It is optional"""
@@ -42,6 +50,80 @@ class TestProviderInterface:
         # arrange/act/assert
         assert [] == await provider_interface.crawl_downstream('dummy', None)
 
+    @pytest.mark.asyncio
+    async def test_crawl_downstream_many(self, provider_interface, mocker):
+        """Default behavior of batch methods is to call the per item methods, returning exceptions in place"""
+        # arrange
+        async def crawl_downstream(address, connection, **kwargs):
+            if 'bad' == address:
+                raise Exception('BOOM')
+            return [address, kwargs['foo']]
+        mocker.patch.object(provider_interface, 'crawl_downstream', side_effect=crawl_downstream)
+
+        # act
+        results = await provider_interface.crawl_downstream_many([('good', None, {'foo': 'bar'}), ('bad', None, {})])
+
+        # assert
+        assert ['good', 'bar'] == results[0]
+        assert 'BOOM' == str(results[1])
+
+    @pytest.mark.asyncio
+    async def test_inventory(self, provider_interface):
+        """Default behavior of provider is an acceptable return of [] for inventory.  It is optional"""
+        # arrange/act/assert
+        assert [] == await provider_interface.inventory()
+
+
+def test_representative_instances():
+    """One instance per service is picked, deterministically, skipping instances without an address or a service"""
+    # arrange
+    instances = [node.NodeTransport('seed', '10.0.0.2', 'foo'), node.NodeTransport('seed', '10.0.0.1', 'foo'),
+                 node.NodeTransport('seed', '10.0.0.3', 'bar'), node.NodeTransport('seed', None, 'baz'),
+                 node.NodeTransport('seed', '10.0.0.4', None)]
+
+    # act
+    representatives = providers.representative_instances(instances)
+
+    # assert
+    assert [('bar', '10.0.0.3'), ('foo', '10.0.0.1')] == [(nt.debug_identifier, nt.address) for nt in representatives]
+
+
+@pytest.mark.asyncio
+async def test_blocking_case_runs_off_event_loop_thread(provider_interface, cli_args_mock, mocker):
+    """Blocking methods run on a thread of the provider's pool, sized by the per provider override"""
+    # arrange
+    mocker.patch.dict(providers._executors, clear=True)
+    cli_args_mock.provider_threads = 10
+    cli_args_mock.provider_threads_overrides = ['other=1', 'mock=2']
+    mocker.patch.object(provider_interface, 'ref', return_value='mock')
+
+    @providers.blocking
+    def blocking_call(provider, arg, kwarg=None):
+        return threading.current_thread().name, provider, arg, kwarg
+
+    # act
+    thread_name, provider, arg, kwarg = await blocking_call(provider_interface, 'foo', kwarg='bar')
+    await blocking_call(provider_interface, 'baz')
+
+    # assert
+    assert thread_name.startswith('provider-mock') and threading.current_thread().name != thread_name
+    assert (provider_interface, 'foo', 'bar') == (provider, arg, kwarg)
+    assert ['mock'] == list(providers._executors)
+    assert 2 == providers._executors['mock']._max_workers
+
+
+def test_shutdown_executors(mocker):
+    # arrange
+    executor_mock = MagicMock()
+    mocker.patch.dict(providers._executors, {'mock': executor_mock}, clear=True)
+
+    # act
+    providers.shutdown_executors()
+
+    # assert
+    assert not executor_mock.shutdown.call_args.kwargs['wait']
+    assert {} == providers._executors
+
 
 def test_init_case_builtin_providers_disableable(cli_args_mock, builtin_providers, mocker):
     # arrange
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+
+from itsybitsy import retry
+from itsybitsy.providers import TimeoutException
+from itsybitsy.retry import RetryPolicy
+
+
+def _attempts(*outcomes):
+    """:return: an attempt function raising/returning `outcomes` in order, and the list of calls made to it"""
+    calls = []
+
+    async def attempt():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, type) and issubclass(outcome, Exception):
+            raise outcome()
+        return outcome
+    return attempt, calls
+
+
+@pytest.mark.asyncio
+async def test_call_case_retried_until_success():
+    # arrange
+    attempt, calls = _attempts(TimeoutException, asyncio.TimeoutError, 'foo')
+
+    # act
+    result = await retry.call(RetryPolicy(3, 0, 0), 'stub', attempt)
+
+    # assert
+    assert 'foo' == result
+    assert 3 == len(calls)
+
+
+@pytest.mark.asyncio
+async def test_call_case_attempts_exhausted():
+    # arrange
+    attempt, calls = _attempts(TimeoutException, TimeoutException, 'foo')
+
+    # act/assert
+    with pytest.raises(TimeoutException):
+        await retry.call(RetryPolicy(2, 0, 0), 'stub', attempt)
+    assert 2 == len(calls)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('policy,expected_calls', [
+    (RetryPolicy(3, 0, 0), 1),
+    (RetryPolicy(3, 0, 0, retryable=(KeyError,)), 2),
+    (RetryPolicy(3, 0, 0, retryable_names=('LookupError',)), 2)
+])
+async def test_call_case_retryable(policy, expected_calls):
+    """Only retryable exceptions, by class or by the name of any of their base classes, are retried"""
+    # arrange
+    attempt, calls = _attempts(KeyError, 'foo')
+
+    # act
+    try:
+        await retry.call(policy, 'stub', attempt)
+    except KeyError:
+        pass
+
+    # assert
+    assert expected_calls == len(calls)
+
+
+@pytest.mark.parametrize('retry_num,expected_max', [(1, 1), (2, 2), (3, 4), (10, 5)])
+def test_delay_case_exponential_capped(retry_num, expected_max):
+    # arrange
+    policy = RetryPolicy(10, 1, 5)
+
+    # act
+    delays = [policy.delay(retry_num) for _ in range(100)]
+
+    # assert
+    assert all(0 <= delay <= expected_max for delay in delays)
+    assert max(delays) > expected_max / 2  # jittered, but across the whole range
+
+
+def test_policy_for_case_provider_retryable_exceptions(cli_args_mock, mocker):
+    # arrange
+    provider_mock = mocker.patch('itsybitsy.providers.ProviderInterface', autospec=True)
+    cli_args_mock.retry_attempts, cli_args_mock.retry_backoff, cli_args_mock.retry_backoff_max = 3, 1, 5
+    cli_args_mock.retry_on = ['FooError']
+    provider_mock.retryable_exceptions.return_value = (KeyError,)
+
+    # act
+    policy = retry.policy_for(provider_mock)
+
+    # assert
+    assert RetryPolicy(3, 1, 5, retry.RETRYABLE_EXCEPTIONS + (KeyError,), ('FooError',)) == policy
@@ -0,0 +1,139 @@
+import asyncio
+import pytest
+from dataclasses import replace
+
+from itsybitsy import scheduler
+from itsybitsy.scheduler import CrawlScheduler, WorkItem
+
+
+async def _run_queued_then_start(crawl_scheduler: CrawlScheduler, items: list) -> list:
+    """Queue all `items` before any worker starts, return the order in which they were executed"""
+    executed = []
+
+    async def work(item):
+        executed.append(item)
+
+    runs = [asyncio.ensure_future(crawl_scheduler.run(item, lambda i=item: work(i))) for item in items]
+    await asyncio.sleep(0)
+    crawl_scheduler.start()
+    await asyncio.gather(*runs)
+    await crawl_scheduler.stop()
+
+    return executed
+
+
+class TestCrawlScheduler:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('order,expected_depths', [(scheduler.ORDER_BFS, [0, 1, 2]),
+                                                       (scheduler.ORDER_DFS, [2, 1, 0])])
+    async def test_run_case_depth_orders(self, order, expected_depths, protocol_fixture):
+        """Queued work is executed breadth first or depth first"""
+        # arrange
+        items = [WorkItem(depth, protocol_fixture) for depth in [2, 0, 1]]
+
+        # act
+        executed = await _run_queued_then_start(CrawlScheduler(1, 0, order), items)
+
+        # assert
+        assert expected_depths == [item.depth for item in executed]
+
+    @pytest.mark.asyncio
+    async def test_run_case_blocking_first(self, protocol_fixture):
+        """Work on blocking protocols is executed before nonblocking protocols, regardless of depth"""
+        # arrange
+        nonblocking = WorkItem(0, replace(protocol_fixture, blocking=False))
+        blocking = WorkItem(3, replace(protocol_fixture, blocking=True))
+
+        # act
+        executed = await _run_queued_then_start(CrawlScheduler(1, 0, scheduler.ORDER_BLOCKING_FIRST),
+                                                [nonblocking, blocking])
+
+        # assert
+        assert [blocking, nonblocking] == executed
+
+    @pytest.mark.asyncio
+    async def test_run_case_seed_fair(self, protocol_fixture):
+        """Work is executed round-robin between seeds"""
+        # arrange
+        items = [WorkItem(1, protocol_fixture, seed) for seed in ['foo', 'foo', 'foo', 'bar']]
+
+        # act
+        executed = await _run_queued_then_start(CrawlScheduler(1, 0, scheduler.ORDER_SEED_FAIR), items)
+
+        # assert
+        assert ['foo', 'bar', 'foo', 'foo'] == [item.seed for item in executed]
+
+    @pytest.mark.asyncio
+    async def test_run_case_result_and_exception(self, protocol_fixture):
+        """Results and exceptions of the work are passed back to the submitter"""
+        # arrange
+        crawl_scheduler = CrawlScheduler(1, 0)
+        crawl_scheduler.start()
+
+        async def boom():
+            raise Exception('BOOM')
+
+        async def foo():
+            return 'foo'
+
+        # act/assert
+        with pytest.raises(Exception, match='BOOM'):
+            await crawl_scheduler.run(WorkItem(0, protocol_fixture), boom)
+        assert 'foo' == await crawl_scheduler.run(WorkItem(0, protocol_fixture), foo)
+        await crawl_scheduler.stop()
+
+    @pytest.mark.asyncio
+    async def test_run_case_bounded_concurrency(self, protocol_fixture):
+        """No more than `workers` items are executed at once"""
+        # arrange
+        crawl_scheduler = CrawlScheduler(2, 0)
+        crawl_scheduler.start()
+        running, max_running = 0, 0
+
+        async def work():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(running, max_running)
+            await asyncio.sleep(.01)
+            running -= 1
+
+        # act
+        await asyncio.gather(*[crawl_scheduler.run(WorkItem(0, protocol_fixture), work) for _ in range(5)])
+        await crawl_scheduler.stop()
+
+        # assert
+        assert 2 == max_running
+
+    @pytest.mark.asyncio
+    async def test_run_case_full_queue_ordered(self, protocol_fixture):
+        """Work queued beyond the queue size is still ordered with all of the queued work"""
+        # arrange
+        items = [WorkItem(depth, protocol_fixture) for depth in range(8)]
+
+        # act
+        executed = await _run_queued_then_start(CrawlScheduler(1, 2, scheduler.ORDER_DFS), items)
+
+        # assert
+        assert [7, 6, 5, 4, 3, 2, 1, 0] == [item.depth for item in executed]
+
+    @pytest.mark.asyncio
+    async def test_wait_for_space_case_full_queue(self, protocol_fixture):
+        """Submitters of further work are held back while the queue is full"""
+        # arrange
+        crawl_scheduler = CrawlScheduler(1, 1)
+
+        async def work():
+            pass
+
+        run = asyncio.ensure_future(crawl_scheduler.run(WorkItem(0, protocol_fixture), work))
+        waiting = asyncio.ensure_future(crawl_scheduler.wait_for_space())
+        await asyncio.sleep(0)
+        waited_while_full = not waiting.done()
+
+        # act
+        crawl_scheduler.start()
+        await asyncio.gather(run, waiting)
+        await crawl_scheduler.stop()
+
+        # assert
+        assert waited_while_full